@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""重复照片检测基准：逐级筛选与逐个完整哈希的读取量与耗时对比
+
+生成 N 个随机内容文件 (大小在少数几种取值间分布，模拟同一相机同一设置的照片)，
+其中一部分复制到另一目录作为重复副本。对比:
+    naive     对每个文件求完整哈希
+    finder    DuplicateFinder：大小 -> 首尾块快速哈希 -> 完整哈希
+    repeat    DuplicateFinder，沿用上一次的哈希 (持久化索引命中)
+
+用法:
+    python benchmarks/bench_duplicates.py [文件数量] [文件大小 KiB] [重复比例]
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.duplicates import DuplicateFinder, content_hash
+
+
+def make_files(root: str, count: int, size_kib: int, dup_ratio: float, seed: int = 5) -> list:
+    """返回 [(路径, 字节数)]；约 dup_ratio 的文件在 copies/ 下有一份副本"""
+    rnd = random.Random(seed)
+    sizes = [size_kib * 1024 + delta for delta in (0, 512, 1024, 2048)]
+    os.makedirs(os.path.join(root, "originals"))
+    os.makedirs(os.path.join(root, "copies"))
+    files = []
+    for i in range(count):
+        size = rnd.choice(sizes)
+        path = os.path.join(root, "originals", f"IMG_{i:05d}.jpg")
+        with open(path, "wb") as f:
+            f.write(rnd.randbytes(size))
+        files.append((path, size))
+        if rnd.random() < dup_ratio:
+            copy = os.path.join(root, "copies", f"IMG_{i:05d}.jpg")
+            shutil.copyfile(path, copy)
+            files.append((copy, size))
+    return files
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    size_kib = int(sys.argv[2]) if len(sys.argv) > 2 else 1024
+    dup_ratio = float(sys.argv[3]) if len(sys.argv) > 3 else 0.1
+
+    root = tempfile.mkdtemp(prefix="bench_dupes_")
+    try:
+        files = make_files(root, count, size_kib, dup_ratio)
+        total_bytes = sum(size for _, size in files)
+        print(f"files={len(files)} bytes={total_bytes / 2 ** 20:.0f} MiB")
+        print(f"{'method':>8} {'seconds':>8} {'MiB read':>9} {'groups':>7}")
+
+        start = time.perf_counter()
+        by_hash = {}
+        for path, _ in files:
+            by_hash.setdefault(content_hash(path), []).append(path)
+        naive_groups = sum(len(paths) > 1 for paths in by_hash.values())
+        print(f"{'naive':>8} {time.perf_counter() - start:>8.2f} {total_bytes / 2 ** 20:>9.0f} {naive_groups:>7}")
+
+        finder = DuplicateFinder()
+        start = time.perf_counter()
+        groups = finder.find((path, size, None, None) for path, size in files)
+        print(f"{'finder':>8} {time.perf_counter() - start:>8.2f} "
+              f"{finder.stats['bytes_read'] / 2 ** 20:>9.0f} {len(groups):>7}")
+
+        known = {path: (edge, full) for edge, full, path in finder.computed}
+        repeat = DuplicateFinder()
+        start = time.perf_counter()
+        groups = repeat.find((path, size, *known.get(path, (None, None))) for path, size in files)
+        print(f"{'repeat':>8} {time.perf_counter() - start:>8.2f} "
+              f"{repeat.stats['bytes_read'] / 2 ** 20:>9.0f} {len(groups):>7}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
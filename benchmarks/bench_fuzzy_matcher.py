@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""容错匹配基准：exact 模式 vs fuzzy 模式的吞吐量与命中率
+
+学名由常见拉丁音节与词尾拼成 ('-us'、'-ensis' 等)，三元组分布比随机字母更接近 IOC，
+倒排列表长短不均。文件名分为六类，各占 1/6:
+    clean     2024-05-01_Egretta garzetta_00001.jpg      (原样)
+    separator Egretta_garzetta-00002.JPG                 (下划线/连字符、大小写)
+    typo      egreta_garzetta_00003.jpg                  (学名中一处拼写错误)
+    chinese   小白鹭_00004.jpg
+    camera    DSC_00005.ARW                              (无法匹配)
+    noise     IMG_00006 lake morning final.jpg           (英文描述，不应匹配)
+
+用法:
+    python benchmarks/bench_fuzzy_matcher.py [物种数量] [文件数量]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models.birds import BirdSpecies, DataRegistry
+
+CJK = [chr(c) for c in range(0x4E00, 0x4E00 + 800)]
+SYLLABLES = ["ar", "de", "gar", "zet", "ta", "ci", "lo", "mi", "nor", "pha", "ri", "sa", "te", "ul", "ver",
+             "chro", "lan", "pyc", "no", "ho", "tus", "mel", "an", "leu", "co", "ru", "fi", "cap", "ste", "ol"]
+ENDINGS = ["us", "a", "is", "um", "ensis", "ii", "oides", "ata", "icus", "inus"]
+ENGLISH = ["lake", "morning", "final", "edited", "trip", "garden", "sunset", "beach", "forest", "export",
+           "river", "winter", "summer", "park", "flight", "nest", "copy", "crop", "raw", "print"]
+KINDS = ("clean", "separator", "typo", "chinese", "camera", "noise")
+
+
+def latin_word(rnd: random.Random) -> str:
+    return "".join(rnd.choices(SYLLABLES, k=rnd.randint(2, 3))) + rnd.choice(ENDINGS)
+
+
+def synthetic_registry(n_species: int, seed: int = 0) -> DataRegistry:
+    rnd = random.Random(seed)
+    registry = DataRegistry()
+    seen = set()
+    genera = [latin_word(rnd).capitalize() for _ in range(max(1, n_species // 5))]
+    i = 0
+    while len(registry.species_map) < n_species:
+        latin = f"{rnd.choice(genera)} {latin_word(rnd)}"
+        if latin in seen:
+            continue
+        seen.add(latin)
+        chinese = "".join(rnd.choices(CJK, k=rnd.randint(2, 5))) + str(i)
+        registry.add_species(BirdSpecies(
+            id=latin, order=f"ORDER{i % 40}", family=f"Family{i % 250}",
+            genus=latin.split()[0], scientific_name=latin, chinese_name=chinese,
+            search_keys=[chinese, latin.lower()],
+        ))
+        i += 1
+    return registry
+
+
+def typo(rnd: random.Random, name: str) -> str:
+    """在学名中做一次删除/替换/相邻交换"""
+    chars = list(name)
+    letters = [i for i, c in enumerate(chars) if c.isalpha()]
+    i = rnd.choice(letters[1:-1])
+    op = rnd.randrange(3)
+    if op == 0:
+        del chars[i]
+    elif op == 1:
+        chars[i] = rnd.choice("abcdefghijklmnopqrstuvwxyz")
+    elif chars[i + 1].isalpha():
+        chars[i], chars[i + 1] = chars[i + 1], chars[i]
+    return "".join(chars)
+
+
+def synthetic_names(registry: DataRegistry, n_files: int, seed: int = 1):
+    """返回 [(文件名, 类别, 期望物种 ID)]"""
+    rnd = random.Random(seed)
+    species = list(registry.species_map.values())
+    out = []
+    for i in range(n_files):
+        kind = KINDS[i % len(KINDS)]
+        sp = rnd.choice(species)
+        if kind == "clean":
+            out.append((f"2024-05-01_{sp.scientific_name}_{i:05d}.jpg", kind, sp.id))
+        elif kind == "separator":
+            sep = rnd.choice("_-.")
+            out.append((f"{sp.scientific_name.replace(' ', sep)}{sep}{i:05d}.JPG", kind, sp.id))
+        elif kind == "typo":
+            out.append((f"{typo(rnd, sp.scientific_name.lower()).replace(' ', '_')}_{i:05d}.jpg", kind, sp.id))
+        elif kind == "chinese":
+            out.append((f"{sp.chinese_name}_{i:05d}.jpg", kind, sp.id))
+        elif kind == "camera":
+            out.append((f"DSC_{i:05d}.ARW", kind, None))
+        else:
+            out.append((f"IMG_{i:05d} {' '.join(rnd.sample(ENGLISH, 3))}.jpg", kind, None))
+    return out
+
+
+def run(registry: DataRegistry, samples):
+    start = time.perf_counter()
+    results = [registry.match_file(name) for name, _, _ in samples]
+    elapsed = time.perf_counter() - start
+    correct = {kind: 0 for kind in KINDS}
+    wrong = 0
+    for (_, kind, expected), got in zip(samples, results):
+        if got == expected:
+            correct[kind] += 1
+        elif got is not None:
+            wrong += 1
+    return elapsed, correct, wrong
+
+
+def main():
+    n_species = int(sys.argv[1]) if len(sys.argv) > 1 else 11000
+    n_files = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+
+    registry = synthetic_registry(n_species)
+    samples = synthetic_names(registry, n_files)
+    per_kind = n_files // len(KINDS)
+    print(f"species={n_species} files={n_files}")
+
+    for mode in ("exact", "fuzzy"):
+        registry.match_mode = mode
+        start = time.perf_counter()
+        if mode == "fuzzy":
+            registry.build_fuzzy_matcher()
+        else:
+            registry.build_matcher()
+        build = time.perf_counter() - start
+        elapsed, correct, wrong = run(registry, samples)
+        rate = ", ".join(f"{kind} {correct[kind] * 100 / per_kind:5.1f}%" for kind in KINDS)
+        print(f"{mode:5s}  build {build * 1000:7.1f} ms  {elapsed * 1e6 / n_files:6.1f} us/file  "
+              f"{n_files / elapsed * 60:>10,.0f} files/min")
+        print(f"       correct: {rate}  wrong: {wrong}")
+
+
+if __name__ == "__main__":
+    main()
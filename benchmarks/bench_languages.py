@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""多语言名称索引基准：启用的语言数量对单个文件匹配耗时的影响
+
+每种语言为每个物种生成一个名称 (一半为拉丁字母、一半为假名)，文件名在
+中文名、学名、各语言名称与相机默认命名之间轮换。所有语言的名称共用一个
+匹配自动机，单个文件的耗时应基本不随语言数量变化 (只随文件名长度变化)。
+
+用法:
+    python benchmarks/bench_languages.py [物种数量] [文件数量]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_fuzzy_matcher import synthetic_registry, SYLLABLES
+from src.models.birds import DataRegistry
+
+KANA = [chr(c) for c in range(0x30A2, 0x30F3)]
+LANGUAGE_COUNTS = (0, 1, 4, 8, 16, 32)
+
+
+def language_names(registry: DataRegistry, n_languages: int, seed: int = 3):
+    """每种语言 -> [(名称, 物种 ID)]"""
+    rnd = random.Random(seed)
+    ids = list(registry.species_map)
+    languages = {}
+    for k in range(n_languages):
+        if k % 2:
+            names = ["".join(rnd.choices(KANA, k=rnd.randint(3, 6))) + str(i) for i in range(len(ids))]
+        else:
+            names = [f"{''.join(rnd.choices(SYLLABLES, k=3))}{k} {''.join(rnd.choices(SYLLABLES, k=2))}{i}"
+                     for i in range(len(ids))]
+        languages[f"l{k}"] = list(zip(names, ids))
+    return languages
+
+
+def file_names(registry: DataRegistry, languages, n_files: int, seed: int = 4):
+    rnd = random.Random(seed)
+    species = list(registry.species_map.values())
+    tags = list(languages)
+    names = []
+    for i in range(n_files):
+        sp = species[rnd.randrange(len(species))]
+        kind = i % 4
+        if kind == 0:
+            names.append(f"{sp.chinese_name}_{i:05d}.jpg")
+        elif kind == 1:
+            names.append(f"2024-05-01 {sp.scientific_name} {i:05d}.jpg")
+        elif kind == 2 and tags:
+            name, _ = rnd.choice(languages[rnd.choice(tags)])
+            names.append(f"{name}_{i:05d}.jpg")
+        else:
+            names.append(f"DSC_{i:05d}.ARW")
+    return names
+
+
+def main():
+    n_species = int(sys.argv[1]) if len(sys.argv) > 1 else 11000
+    n_files = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+
+    base = synthetic_registry(n_species)
+    all_languages = language_names(base, max(LANGUAGE_COUNTS))
+    # 文件名固定使用 4 种语言的名称，各组测量的输入完全相同
+    names = file_names(base, dict(list(all_languages.items())[:4]), n_files)
+
+    print(f"species={n_species} files={n_files}")
+    print(f"{'languages':>9} {'keys':>8} {'states':>9} {'build ms':>9} {'exact us':>9} {'fuzzy us':>9} {'matched':>8}")
+    for count in LANGUAGE_COUNTS:
+        registry = base.clone_species()
+        registry.match_lookup = dict(base.match_lookup)
+        registry.key_languages = dict(base.key_languages)
+        registry.languages = list(base.languages)
+        for tag, pairs in list(all_languages.items())[:count]:
+            registry.add_names(tag, pairs)
+
+        start = time.perf_counter()
+        registry.build_matcher()
+        build = time.perf_counter() - start
+
+        timings = {}
+        matched = 0
+        for mode in ("exact", "fuzzy"):
+            registry.match_mode = mode
+            registry.match_file("")
+            start = time.perf_counter()
+            results = [registry.match_file(n) for n in names]
+            timings[mode] = (time.perf_counter() - start) * 1e6 / n_files
+            if mode == "exact":
+                matched = sum(r is not None for r in results)
+        print(f"{count:>9} {len(registry.match_lookup):>8} {len(registry._matcher):>9} {build * 1000:>9.0f} "
+              f"{timings['exact']:>9.2f} {timings['fuzzy']:>9.2f} {matched:>8}")
+
+
+if __name__ == "__main__":
+    main()
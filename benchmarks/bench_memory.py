@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""照片索引内存基准：旧布局 (每张照片一个 dataclass 对象) vs 列式布局
+
+旧布局按原实现复刻：每张照片一个 @dataclass PhotoIndex (file_name 与 absolute_path
+两个完整字符串)，同时被 photo_by_path 字典与物种节点的 photo_indices 列表引用。
+新布局为当前 DataRegistry：目录字符串只存一份，每张照片只保留文件名、
+目录序号 (array 4 字节) 与整数物种序号。
+
+路径模拟真实归档：/Volumes/BirdArchive/<年>/<日期 地点>/<存储卡>/<物种>_<序号>.jpg，
+每个目录约 200 张照片。分类树节点事先建好，tracemalloc 只统计登记照片新增的常驻内存；
+构建耗时在关闭 tracemalloc 时单独测量。
+
+用法:
+    python benchmarks/bench_memory.py [照片数量...]
+"""
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_matcher import synthetic_registry
+from src.models.birds import DataRegistry, PhotoIndex
+
+PLACES = ["湿地公园", "植物园", "海边滩涂", "森林公园", "水库"]
+
+
+@dataclass
+class LegacyPhotoIndex:
+    file_name: str
+    absolute_path: str
+    matched_species_id: Optional[str] = None
+
+
+class LegacyLayout:
+    """旧实现的存储结构：路径字典 + 物种节点上的对象列表"""
+    def __init__(self, species_ids: List[str]):
+        self.photo_by_path: Dict[str, LegacyPhotoIndex] = {}
+        self.leaves: Dict[str, List[LegacyPhotoIndex]] = {species_id: [] for species_id in species_ids}
+
+    def add_photos(self, photos):
+        for photo in photos:
+            self.photo_by_path[photo.absolute_path] = photo
+            self.leaves[photo.matched_species_id].append(photo)
+
+
+def synthetic_photos(species_ids: List[str], n_photos: int, per_dir: int = 200):
+    """生成 (文件名, 绝对路径, 物种 ID)；路径和文件名每次都是新字符串，与扫描时一致"""
+    for i in range(n_photos):
+        d = i // per_dir
+        directory = f"/Volumes/BirdArchive/{2015 + d % 10}/{2015 + d % 10}-{d % 12 + 1:02d}-{d % 28 + 1:02d} " \
+                    f"{PLACES[d % len(PLACES)]}/card{d}"
+        species_id = species_ids[(i * 7919) % len(species_ids)]
+        name = f"{species_id.split()[0]}_{species_id.split()[1]}_{i:07d}.jpg"
+        yield name, f"{directory}/{name}", species_id
+
+
+def measure(setup, fill) -> tuple:
+    """返回 (登记照片后新增的常驻字节, 峰值字节, 登记耗时秒)"""
+    store = setup()
+    start = time.perf_counter()
+    fill(store)
+    elapsed = time.perf_counter() - start
+    del store
+
+    store = setup()
+    gc.collect()
+    tracemalloc.start()
+    fill(store)
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, peak, elapsed
+
+
+def empty_registry(species: DataRegistry) -> DataRegistry:
+    """每个物种挂载再摘除一张照片，使分类树节点与列存储都已创建"""
+    registry = species.clone_species()
+    paths = [f"/warmup/{i}.jpg" for i in range(len(species.species_ids))]
+    registry.add_photos(PhotoIndex(os.path.basename(p), p, s) for p, s in zip(paths, species.species_ids))
+    registry.remove_photos(paths)
+    return registry
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100_000, 500_000]
+    species = synthetic_registry(11000)
+    species.build_matcher()
+    species_ids = list(species.species_map)
+
+    for n in sizes:
+        cases = (
+            ("legacy dataclass", lambda: LegacyLayout(species_ids),
+             lambda layout: layout.add_photos(LegacyPhotoIndex(*row) for row in synthetic_photos(species_ids, n))),
+            ("columnar", lambda: empty_registry(species),
+             lambda registry: registry.add_photos(PhotoIndex(*row) for row in synthetic_photos(species_ids, n))),
+        )
+        print(f"photos={n:,}")
+        for label, setup, fill in cases:
+            current, peak, elapsed = measure(setup, fill)
+            print(f"  {label:17s} {current / 2**20:8.1f} MiB  ({current / n:6.1f} B/photo)  "
+                  f"peak {peak / 2**20:8.1f} MiB  add {elapsed:6.2f} s")
+
+
+if __name__ == "__main__":
+    main()
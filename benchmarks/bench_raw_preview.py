@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""内嵌预览提取基准：extract_preview vs 全量读取/全尺寸解码
+
+生成两类样本：
+    JPEG     6000x4000 主图 + APP1/EXIF IFD1 中 320x213 缩略图
+    TIFF-RAW 与 ARW/NEF 相同的 TIFF 容器：IFD0 放 1616x1080 JPEG 预览，
+             SubIFD 放 ~46 MB 未压缩传感器数据
+
+用法:
+    python benchmarks/bench_raw_preview.py [重复次数]
+"""
+import io
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+from src.utils.raw_preview import extract_preview
+from src.utils.thumbnailer import generate_thumbnail
+
+
+def jpeg_bytes(size, quality=85) -> bytes:
+    img = Image.merge("RGB", [
+        Image.linear_gradient("L").resize(size),
+        Image.effect_noise(size, 32),
+        Image.linear_gradient("L").rotate(90).resize(size),
+    ])
+    buf = io.BytesIO()
+    img.save(buf, "JPEG", quality=quality)
+    return buf.getvalue()
+
+
+def ifd(entries, next_ifd=0) -> bytes:
+    """小端 IFD：entries 为 (tag, type, count, value) 列表"""
+    out = struct.pack("<H", len(entries))
+    for tag, typ, count, value in sorted(entries):
+        out += struct.pack("<HHII", tag, typ, count, value)
+    return out + struct.pack("<I", next_ifd)
+
+
+def make_exif_jpeg(path: str, main: bytes, thumb: bytes):
+    """在 SOI 之后插入携带 IFD1 缩略图的 APP1 段"""
+    ifd0_off = 8
+    ifd1_off = ifd0_off + len(ifd([]))
+    thumb_off = ifd1_off + len(ifd([(0, 0, 0, 0)] * 2))
+    tiff = b"II*\x00" + struct.pack("<I", ifd0_off)
+    tiff += ifd([], next_ifd=ifd1_off)
+    tiff += ifd([(0x0201, 4, 1, thumb_off), (0x0202, 4, 1, len(thumb))])
+    tiff += thumb
+    app1 = b"Exif\x00\x00" + tiff
+    with open(path, "wb") as f:
+        f.write(main[:2] + b"\xff\xe1" + struct.pack(">H", len(app1) + 2) + app1 + main[2:])
+
+
+def make_tiff_raw(path: str, preview: bytes, raw_len: int):
+    """IFD0 指向 JPEG 预览，SubIFD 指向未压缩的传感器数据"""
+    ifd0_off = 8
+    sub_off = ifd0_off + len(ifd([(0, 0, 0, 0)] * 4))
+    preview_off = sub_off + len(ifd([(0, 0, 0, 0)] * 3))
+    raw_off = preview_off + len(preview)
+    with open(path, "wb") as f:
+        f.write(b"II*\x00" + struct.pack("<I", ifd0_off))
+        f.write(ifd([(0x00FE, 4, 1, 1), (0x014A, 4, 1, sub_off),
+                     (0x0201, 4, 1, preview_off), (0x0202, 4, 1, len(preview))]))
+        f.write(ifd([(0x0103, 3, 1, 1), (0x0111, 4, 1, raw_off), (0x0117, 4, 1, raw_len)]))
+        f.write(preview)
+        f.write(os.urandom(raw_len))
+
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    root = tempfile.mkdtemp(prefix="bird_preview_")
+    try:
+        jpg = os.path.join(root, "exif.jpg")
+        make_exif_jpeg(jpg, jpeg_bytes((6000, 4000)), jpeg_bytes((320, 213), quality=70))
+        raw = os.path.join(root, "sample.arw")
+        make_tiff_raw(raw, jpeg_bytes((1616, 1080)), 6000 * 4000 * 2)
+
+        def full_decode(path):
+            with Image.open(path) as img:
+                img.load()
+
+        def read_all(path):
+            with open(path, "rb") as f:
+                while f.read(1 << 20):
+                    pass
+
+        out = os.path.join(root, "thumb.jpg")
+        print(f"JPEG {os.path.getsize(jpg) / 1e6:.1f} MB")
+        print(f"  extract_preview:    {timed(lambda: extract_preview(jpg), repeat):8.2f} ms")
+        print(f"  full decode:        {timed(lambda: full_decode(jpg), repeat):8.2f} ms")
+        print(f"  generate_thumbnail: {timed(lambda: generate_thumbnail(jpg, out), repeat):8.2f} ms")
+        print(f"TIFF-RAW {os.path.getsize(raw) / 1e6:.1f} MB")
+        print(f"  extract_preview:    {timed(lambda: extract_preview(raw, (200, 200)), repeat):8.2f} ms")
+        print(f"  read whole file:    {timed(lambda: read_all(raw), repeat):8.2f} ms")
+        print(f"  generate_thumbnail: {timed(lambda: generate_thumbnail(raw, out), repeat):8.2f} ms")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
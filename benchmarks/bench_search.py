@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""搜索基准：百万张照片规模下 DataRegistry.search 的查询延迟与索引构建开销
+
+照片按 年/日期 地点/存储卡 分目录 (每目录 200 张)，文件名在中文名、学名 (下划线)
+与相机默认命名 (计数器 0001~9999 循环) 之间轮换。测量:
+    build       DataRegistry.build_search_index 耗时与索引常驻内存 (tracemalloc)
+    查询        每个查询取多次运行的中位数，列出命中总数与是否完整
+    increment   已有索引时 add_photos 登记一个新目录 (增量登记) 的耗时
+
+用法:
+    python benchmarks/bench_search.py [照片数量] [物种数量]
+"""
+import gc
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_fuzzy_matcher import synthetic_registry
+from src.models.birds import DataRegistry, PhotoIndex
+
+PLACES = ["湿地公园", "植物园", "海边滩涂", "森林公园", "水库", "Marshes", "Coast"]
+PER_DIR = 200
+REPEAT = 20
+
+
+def synthetic_photos(registry: DataRegistry, n_photos: int, start: int = 0):
+    species = list(registry.species_map.values())
+    for i in range(start, start + n_photos):
+        d = i // PER_DIR
+        directory = f"/Volumes/BirdArchive/{2015 + d % 10}/{2015 + d % 10}-{d % 12 + 1:02d}-{d % 28 + 1:02d} " \
+                    f"{PLACES[d % len(PLACES)]}/card{d}"
+        sp = species[(i * 7919) % len(species)]
+        kind = i % 3
+        if kind == 0:
+            name = f"{sp.chinese_name}_{i % 10000:04d}.jpg"
+        elif kind == 1:
+            name = f"{sp.scientific_name.replace(' ', '_')}_{i % 10000:04d}.NEF"
+        else:
+            name = f"DSC_{i % 10000:04d}.ARW"
+        yield PhotoIndex(name, f"{directory}/{name}", sp.id)
+
+
+def queries(registry: DataRegistry):
+    sp = list(registry.species_map.values())[1234]
+    return [
+        ("zh name", sp.chinese_name),
+        ("zh substring", sp.chinese_name[1:3]),
+        ("latin prefix", sp.scientific_name.split()[1][:4]),
+        ("latin full", sp.scientific_name.replace(" ", "_")),
+        ("genus", sp.genus),
+        ("camera no.", "DSC_0042"),
+        ("digits", "0042"),
+        ("place", "湿地公园"),
+        ("multi word", f"{sp.genus} 2019"),
+        ("broad", "jpg"),
+        ("one char", "a"),
+        ("no hit", "qqqzzz"),
+    ]
+
+
+def main():
+    n_photos = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    n_species = int(sys.argv[2]) if len(sys.argv) > 2 else 11000
+
+    registry = synthetic_registry(n_species)
+    start = time.perf_counter()
+    registry.add_photos(synthetic_photos(registry, n_photos))
+    print(f"photos={n_photos} species={n_species} register={time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    registry.build_search_index()
+    build = time.perf_counter() - start
+    gc.collect()
+    tracemalloc.start()
+    index = registry.build_search_index()
+    gc.collect()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"build={build:.2f}s index={memory / 2 ** 20:.1f} MiB {index.stats()}")
+    # 首次查询编译分类阶元索引并拼接词表文本，不计入
+    registry.search("warmup")
+
+    print(f"{'query':>14} {'text':>24} {'median ms':>10} {'max ms':>8} {'total':>7} {'complete':>8}")
+    for label, text in queries(registry):
+        timings = []
+        for _ in range(REPEAT):
+            start = time.perf_counter()
+            total, complete, _ = registry.search(text, limit=50)
+            timings.append((time.perf_counter() - start) * 1000)
+        print(f"{label:>14} {text:>24} {statistics.median(timings):>10.2f} {max(timings):>8.2f} "
+              f"{total:>7} {str(complete):>8}")
+
+    start = time.perf_counter()
+    registry.add_photos(synthetic_photos(registry, PER_DIR, start=n_photos))
+    increment = time.perf_counter() - start
+    print(f"increment: {PER_DIR} photos in {increment * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""冷缓存缩略图吞吐基准
+
+对比三种方式生成 N 张缩略图的吞吐 (张/秒):
+    inline   旧实现：convert('RGB') 全尺寸解码后 thumbnail()
+    draft    generate_thumbnail：draft() + reduce 降采样，单进程
+    pool     ThumbnailService：进程池并发 + draft
+
+用法:
+    python benchmarks/bench_thumbnails.py [图片数量] [宽] [高]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+from src.utils.thumbnailer import ThumbnailService, generate_thumbnail
+
+
+def make_images(root: str, count: int, size) -> list:
+    """生成带渐变与噪声的相机尺寸 JPEG"""
+    base = Image.merge("RGB", [
+        Image.linear_gradient("L").resize(size),
+        Image.effect_noise(size, 64),
+        Image.linear_gradient("L").rotate(90).resize(size),
+    ])
+    paths = []
+    for i in range(count):
+        path = os.path.join(root, f"IMG_{i:04d}.jpg")
+        base.save(path, "JPEG", quality=90)
+        paths.append(path)
+    return paths
+
+
+def inline_thumbnail(src_path: str, cache_path: str):
+    """旧版 /api/thumbnail 中的内联实现"""
+    with Image.open(src_path) as img:
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+        img.thumbnail((200, 200))
+        img.save(cache_path, "JPEG", quality=85)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    size = (int(sys.argv[2]), int(sys.argv[3])) if len(sys.argv) > 3 else (6000, 4000)
+
+    root = tempfile.mkdtemp(prefix="bird_thumb_")
+    try:
+        sources = make_images(root, count, size)
+        print(f"{count} JPEGs at {size[0]}x{size[1]}")
+
+        def cache_dir(name):
+            path = os.path.join(root, name)
+            os.makedirs(path)
+            return path
+
+        out = cache_dir("inline")
+        start = time.perf_counter()
+        for i, src in enumerate(sources):
+            inline_thumbnail(src, os.path.join(out, f"{i}.jpg"))
+        print(f"inline: {count / (time.perf_counter() - start):7.1f} thumbs/s")
+
+        out = cache_dir("draft")
+        start = time.perf_counter()
+        for i, src in enumerate(sources):
+            generate_thumbnail(src, os.path.join(out, f"{i}.jpg"))
+        print(f"draft:  {count / (time.perf_counter() - start):7.1f} thumbs/s")
+
+        out = cache_dir("pool")
+        service = ThumbnailService()
+        service.submit(sources[0], os.path.join(out, "warmup.jpg")).result()
+        start = time.perf_counter()
+        futures = [service.submit(src, os.path.join(out, f"{i}.jpg")) for i, src in enumerate(sources)]
+        for future in futures:
+            future.result()
+        print(f"pool:   {count / (time.perf_counter() - start):7.1f} thumbs/s "
+              f"(workers={service.max_workers})")
+        service.shutdown()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
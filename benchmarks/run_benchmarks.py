@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""基准套件：在多个规模的合成数据上测量热点路径，结果输出为 JSON
+
+每项只计被测调用本身，物种加载等准备工作不计时。
+测量项 (每项记录 seconds 与 items，per_item_us = seconds / items):
+    load_compile        IOCDataLoader.load_to_registry，无编译产物 (解析 Excel)
+    load_compiled       IOCDataLoader.load_to_registry，读取编译产物
+    build_exact         DataRegistry.build_matcher (items 为物种数)
+    build_fuzzy         DataRegistry.build_fuzzy_matcher (items 为物种数)
+    match_exact         DataRegistry.match_file，exact 模式
+    match_fuzzy         DataRegistry.match_file，fuzzy 模式
+    scan_cold           FileScanner.scan_directory，无持久化索引
+    scan_index_first    FileScanner.scan_directory，首次写入持久化索引
+    scan_index_repeat   FileScanner.scan_directory，索引命中的重复扫描
+    tree_json           DataConverter.to_el_tree_json (整棵树)
+    thumbnail           generate_thumbnail，相机尺寸 JPEG
+
+用法:
+    python benchmarks/run_benchmarks.py [--scales small,medium] [--output result.json]
+                                        [--compare baseline.json] [--threshold 1.2]
+
+--compare 时逐项对比 per_item_us，超过 threshold 倍视为退化并以非零状态退出。
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import species_rows, write_ioc_excel, photo_names, build_photo_tree
+from bench_thumbnails import make_images
+from src.models.birds import DataRegistry
+from src.data.IOC_dataloader import IOCDataLoader
+from src.data.photo_store import PhotoIndexStore
+from src.utils.file_scanner import FileScanner
+from src.utils.data_converter import DataConverter
+from src.utils.thumbnailer import generate_thumbnail
+
+SCALES = {
+    "small": {"species": 1000, "files": 5000, "images": 4, "image_size": (3000, 2000)},
+    "medium": {"species": 11000, "files": 50000, "images": 8, "image_size": (6000, 4000)},
+    "large": {"species": 11000, "files": 200000, "images": 16, "image_size": (6000, 4000)},
+}
+
+
+def timed(fn, items: int, repeat: int = 1, setup=None) -> dict:
+    """取 repeat 次中的最短耗时；setup 的返回值传给 fn 且不计时，被测代码的 print 输出被丢弃"""
+    best = None
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            args = (setup(),) if setup else ()
+            start = time.perf_counter()
+            fn(*args)
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return {"seconds": round(best, 6), "items": items, "per_item_us": round(best * 1e6 / max(items, 1), 3)}
+
+
+def load_registry(excel: str, compiled: str) -> DataRegistry:
+    registry = DataRegistry()
+    with contextlib.redirect_stdout(io.StringIO()):
+        IOCDataLoader(excel, compiled).load_to_registry(registry)
+    return registry
+
+
+def run_scale(name: str, params: dict, workdir: str) -> dict:
+    rows = species_rows(params["species"])
+    names = photo_names(rows, params["files"])
+    excel = os.path.join(workdir, "ioc.xlsx")
+    compiled = os.path.join(workdir, "species.bin")
+    photos = os.path.join(workdir, "photos")
+    write_ioc_excel(excel, rows)
+    n_dirs = build_photo_tree(photos, names)
+    results = {}
+    log = lambda msg: print(f"[{name}] {msg}", file=sys.stderr)
+
+    def load_compile():
+        if os.path.exists(compiled):
+            os.remove(compiled)
+        load_registry(excel, compiled)
+
+    results["load_compile"] = timed(load_compile, len(rows))
+    results["load_compiled"] = timed(lambda: load_registry(excel, compiled), len(rows), repeat=3)
+    log("loader done")
+
+    species = lambda: load_registry(excel, compiled)
+    results["build_exact"] = timed(lambda r: r.build_matcher(), len(rows), setup=species)
+    results["build_fuzzy"] = timed(lambda r: r.build_fuzzy_matcher(), len(rows), setup=species)
+    for mode in ("exact", "fuzzy"):
+        registry = load_registry(excel, compiled)
+        registry.match_mode = mode
+        registry.match_file("")
+        results[f"match_{mode}"] = timed(lambda: [registry.match_file(n) for n in names], len(names))
+    log("matcher done")
+
+    def ready() -> DataRegistry:
+        registry = load_registry(excel, compiled)
+        registry.build_matcher()
+        return registry
+
+    scan = lambda registry, store=None: FileScanner(registry, store=store).scan_directory(photos)
+    results["scan_cold"] = timed(scan, len(names), setup=ready)
+    store = PhotoIndexStore(os.path.join(workdir, "index.db"))
+    results["scan_index_first"] = timed(lambda r: scan(r, store), len(names), setup=ready)
+    results["scan_index_repeat"] = timed(lambda r: scan(r, store), len(names), setup=ready)
+    store.close()
+    log("scanner done")
+
+    registry = ready()
+    with contextlib.redirect_stdout(io.StringIO()):
+        scan(registry)
+    results["tree_json"] = timed(lambda: DataConverter.to_el_tree_json(registry.tree_root),
+                                 registry.photo_count, repeat=3)
+
+    image_dir = os.path.join(workdir, "images")
+    os.makedirs(image_dir)
+    images = make_images(image_dir, params["images"], params["image_size"])
+    thumb = os.path.join(workdir, "thumb.jpg")
+    results["thumbnail"] = timed(lambda: [generate_thumbnail(p, thumb) for p in images], len(images))
+    log("thumbnails done")
+
+    return {
+        "params": dict(params, image_size=list(params["image_size"]), directories=n_dirs),
+        "results": results,
+    }
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """返回退化项 [(规模, 测量项, 基线 us, 当前 us, 倍数)]"""
+    regressions = []
+    for scale, data in current["scales"].items():
+        base = baseline.get("scales", {}).get(scale, {}).get("results", {})
+        for metric, result in data["results"].items():
+            if metric not in base or not base[metric]["per_item_us"]:
+                continue
+            ratio = result["per_item_us"] / base[metric]["per_item_us"]
+            flag = "REGRESSION" if ratio > threshold else ""
+            print(f"{scale:7s} {metric:18s} {base[metric]['per_item_us']:12.3f} -> "
+                  f"{result['per_item_us']:12.3f} us/item  x{ratio:5.2f} {flag}", file=sys.stderr)
+            if ratio > threshold:
+                regressions.append((scale, metric, base[metric]["per_item_us"], result["per_item_us"], ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bird indexer benchmark suite")
+    parser.add_argument("--scales", default="small,medium", help=f"逗号分隔，可选 {', '.join(SCALES)}")
+    parser.add_argument("--output", help="结果 JSON 路径，缺省输出到 stdout")
+    parser.add_argument("--compare", help="基线 JSON，对比 per_item_us")
+    parser.add_argument("--threshold", type=float, default=1.2, help="判定退化的倍数")
+    args = parser.parse_args()
+
+    report = {"environment": environment(), "scales": {}}
+    for name in args.scales.split(","):
+        workdir = tempfile.mkdtemp(prefix=f"bird_bench_{name}_")
+        try:
+            report["scales"][name] = run_scale(name, SCALES[name], workdir)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
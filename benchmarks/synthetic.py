@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""合成数据生成器：IOC 风格物种表 + 深层照片目录树
+
+    species_rows(n)                 生成物种行 (Order/Family/IOC_15.1/Chinese/English)
+    write_ioc_excel(path, rows)     写出与 Multiling IOC 相同结构的 Excel (工作表 List)
+    photo_names(rows, n)            生成文件名：中文名、学名 (各种分隔符)、相机默认命名混合
+    build_photo_tree(root, names)   按 年/月/日/地点/存储卡 生成深层目录与空文件
+
+用法 (单独生成数据集):
+    python benchmarks/synthetic.py <输出目录> [物种数量] [文件数量]
+"""
+import os
+import random
+import sys
+from typing import Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_fuzzy_matcher import CJK, latin_word
+
+PLACES = ["湿地公园", "植物园", "海边滩涂", "森林公园", "水库", "Marshes", "Coast"]
+
+
+def species_rows(n_species: int, seed: int = 0) -> List[Dict[str, str]]:
+    """IOC 风格物种行：约 40 个目、250 个科，每属约 5 种，学名与中文名唯一"""
+    rnd = random.Random(seed)
+    genera = [latin_word(rnd).capitalize() for _ in range(max(1, n_species // 5))]
+    rows, seen = [], set()
+    while len(rows) < n_species:
+        genus_idx = rnd.randrange(len(genera))
+        latin = f"{genera[genus_idx]} {latin_word(rnd)}"
+        if latin in seen:
+            continue
+        seen.add(latin)
+        i = len(rows)
+        # 同属物种归入同一科、目，分类树结构与真实数据一致
+        family = genus_idx % 250
+        rows.append({
+            "Order": f"ORDER{family % 40}FORMES",
+            "Family": f"Family{family}idae",
+            "IOC_15.1": latin,
+            "Chinese": "".join(rnd.choices(CJK, k=rnd.randint(2, 4))) + CJK[i % 97] + str(i),
+            "English": f"Bird {i}",
+        })
+    return rows
+
+
+def write_ioc_excel(path: str, rows: List[Dict[str, str]]):
+    import pandas as pd
+    pd.DataFrame(rows).to_excel(path, sheet_name="List", index=False)
+
+
+def photo_names(rows: List[Dict[str, str]], n_files: int, seed: int = 1) -> List[str]:
+    """约 3/4 的文件名含物种名 (中文 / 学名空格 / 学名下划线)，其余为相机默认命名"""
+    rnd = random.Random(seed)
+    names = []
+    for i in range(n_files):
+        row = rows[rnd.randrange(len(rows))]
+        kind = i % 4
+        if kind == 0:
+            names.append(f"{row['Chinese']}_{i:06d}.jpg")
+        elif kind == 1:
+            names.append(f"2024-05-01 {row['IOC_15.1']} {i:06d}.jpg")
+        elif kind == 2:
+            names.append(f"{row['IOC_15.1'].replace(' ', '_')}_{i:06d}.NEF")
+        else:
+            names.append(f"DSC_{i:06d}.ARW")
+    return names
+
+
+def build_photo_tree(root: str, names: List[str], files_per_dir: int = 100, seed: int = 2) -> int:
+    """按 年/月/日 地点/存储卡 生成 4~5 层目录并写入空文件，返回目录数"""
+    rnd = random.Random(seed)
+    n_dirs = 0
+    for start in range(0, len(names), files_per_dir):
+        d = start // files_per_dir
+        parts = [str(2015 + d % 10), f"{d % 12 + 1:02d}", f"{d % 28 + 1:02d} {PLACES[d % len(PLACES)]}"]
+        if rnd.random() < 0.5:
+            parts.append(f"card{d % 3}")
+        path = os.path.join(root, *parts, f"batch_{d}")
+        os.makedirs(path, exist_ok=True)
+        for name in names[start:start + files_per_dir]:
+            open(os.path.join(path, name), "wb").close()
+        n_dirs += 1
+    return n_dirs
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    out = sys.argv[1]
+    n_species = int(sys.argv[2]) if len(sys.argv) > 2 else 11000
+    n_files = int(sys.argv[3]) if len(sys.argv) > 3 else 50000
+    os.makedirs(out, exist_ok=True)
+    rows = species_rows(n_species)
+    write_ioc_excel(os.path.join(out, "Multiling IOC 15.1_d.xlsx"), rows)
+    n_dirs = build_photo_tree(os.path.join(out, "photos"), photo_names(rows, n_files))
+    print(f"{n_species} species, {n_files} files in {n_dirs} directories -> {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import argparse
+import json
+import logging
+import sys
+from itertools import islice
+from src.models.birds import DataRegistry
+from src.data.IOC_dataloader import IOCDataLoader
+from src.utils.data_converter import DataConverter
+
+# 每批分类的文件名数量
+BATCH_SIZE = 1000
+
+
+def main():
+    """从标准输入逐行读取文件名或路径，按批分类后以 NDJSON 输出到标准输出
+
+    用法: find /photos -type f | python classify.py [--mode fuzzy] [--languages zh,en,de,ja]
+    """
+    parser = argparse.ArgumentParser(description="Classify file names read from stdin (one per line)")
+    parser.add_argument("--excel", default="src/data/Multiling IOC 15.1_d.xlsx", help="Multiling IOC Excel 路径")
+    parser.add_argument("--mode", choices=("exact", "fuzzy"), default="fuzzy", help="文件名匹配模式")
+    parser.add_argument("--languages", default="zh,en,de,ja", help="逗号分隔的语言标签，all 表示全部语言")
+    parser.add_argument("--matched-only", action="store_true", help="只输出匹配到物种的行")
+    args = parser.parse_args()
+    # 日志写到 stderr，stdout 只有结果
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(name)s: %(message)s")
+
+    # 1. 加载物种数据
+    registry = DataRegistry()
+    registry.match_mode = args.mode
+    languages = None if args.languages == "all" else args.languages.split(",")
+    IOCDataLoader(args.excel, languages=languages).load_to_registry(registry)
+
+    # 2. 按批读取、分类并输出
+    lines = (line.rstrip("\r\n") for line in sys.stdin)
+    names = (line for line in lines if line)
+    out = sys.stdout
+    while True:
+        batch = list(islice(names, BATCH_SIZE))
+        if not batch:
+            break
+        items = DataConverter.to_classifications(registry.classify_files(batch))
+        out.writelines(
+            json.dumps(item, ensure_ascii=False) + "\n"
+            for item in items if item["species_id"] or not args.matched_only
+        )
+        out.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,10 @@
+import logging
 from src.models.birds import DataRegistry
 from src.data.IOC_dataloader import IOCDataLoader
 from src.utils.file_scanner import FileScanner
 
 def main():
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
     # 初始化全局数据注册表
     registry = DataRegistry()
 
@@ -1,18 +1,26 @@
+if __name__ == "__main__":
+    # PyInstaller 打包后使用进程池必须最先调用：Windows 下进程池以 spawn 重新启动本程序，
+    # 工作进程在这里接管并退出，不会执行下面的导入与应用初始化
+    import multiprocessing
+    multiprocessing.freeze_support()
+
 from atexit import register
 import platform
 import subprocess
-from fastapi import FastAPI, BackgroundTasks, HTTPException, Query, status
+from fastapi import FastAPI, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 from typing import List, Optional
+import logging
 import os
 import sys
-from PIL import Image
-import hashlib
+import json
+import time
+import asyncio
 from pathlib import Path
-from fastapi.responses import FileResponse, Response
-import io
+from fastapi.responses import FileResponse, Response, StreamingResponse
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 def get_base_path():
@@ -34,15 +42,35 @@ def get_execl_path():
     return BASE_DIR / "src" / "data" / "Multiling IOC 15.1_d.xlsx"
 
 from src.utils.data_converter import DataConverter
-from src.models.birds import DataRegistry
+from src.models.birds import DataRegistry, PhotoIndex, SEARCH_KINDS
 from src.data.IOC_dataloader import IOCDataLoader
-from src.utils.file_scanner import FileScanner
+from src.data.photo_store import PhotoIndexStore
+from src.utils.thumbnailer import ThumbnailService, ThumbnailPrewarmer
+from src.utils.thumbnail_cache import ThumbnailCache
+from src.utils.scan_jobs import ScanJobManager
+from src.utils.file_watcher import FolderWatcher
+from src.utils.metrics import METRICS
+from src.utils.file_response import ConditionalFileResponse
+
+# 日志级别：排查问题时改为 logging.DEBUG
+LOG_LEVEL = logging.INFO
+logging.basicConfig(level=LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Bird Photo Indexer API")
 
-# 配置缓存目录
+# 缩略图缓存目录与字节预算，超出后按 LRU 淘汰
 CACHE_DIR = Path("./.bird_cache/thumbnails")
-CACHE_DIR.mkdir(parents=True, exist_ok=True)
+THUMBNAIL_CACHE_MAX_BYTES = 512 * 1024 * 1024
+# 预览图 ("screen" 尺寸)：与缩略图同样按原图 mtime/size 缓存，长边不超过 SCREEN_SIZE
+PREVIEW_DIR = Path("./.bird_cache/previews")
+SCREEN_SIZE = (2048, 2048)
+PREVIEW_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+# 不超过该大小的浏览器可直接显示的原图直接返回，不再生成预览图
+PREVIEW_PASSTHROUGH_BYTES = 1024 * 1024
+BROWSER_IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp')
+# 持久化照片索引
+INDEX_DB_PATH = Path("./.bird_cache/index.db")
 
 # --- 配置 CORS，允许 Element Plus 跨域访问 ---
 app.add_middleware(
@@ -52,85 +80,408 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# 全局单例
-registry = DataRegistry()
-# 加载分类数据
-loader = IOCDataLoader(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'Multiling IOC 15.1_d.xlsx'))
-loader.load_to_registry(registry)
+# 文件名匹配模式: 'exact' 只认完整子串；'fuzzy' 还能识别分隔符不同或拼错的学名
+MATCH_MODE = "fuzzy"
+# 参与文件名匹配的语言 (Multiling IOC 语言列的标签，见 IOC_dataloader.LANGUAGE_COLUMNS)；
+# None 表示启用表中全部语言。学名与中文名始终参与匹配
+LANGUAGES = ["zh", "en", "de", "ja"]
 
-# 扫描状态记录
-scan_status = {
+# 全局单例，由 startup 创建 (见其说明)
+thumbnail_cache: Optional[ThumbnailCache] = None          # 缩略图缓存索引
+thumbnail_service: Optional[ThumbnailService] = None      # 缩略图生成服务 (进程池，按需启动)
+preview_cache: Optional[ThumbnailCache] = None            # 预览图缓存索引
+preview_service: Optional[ThumbnailService] = None        # 预览图生成服务
+prewarmer: Optional[ThumbnailPrewarmer] = None            # 扫描时的缩略图预热 (低优先级)
+loader: Optional[IOCDataLoader] = None                    # 物种表加载器
+photo_store: Optional[PhotoIndexStore] = None             # 持久化照片索引
+scan_jobs: Optional[ScanJobManager] = None                # 扫描任务调度，scan_jobs.registry 为当前注册中心
+folder_watcher: Optional[FolderWatcher] = None            # 目录监视
+
+# 无任务时的扫描状态
+IDLE_SCAN_STATUS = {
     "status": "idle",
     "scanned": 0,
     "matched": 0,
-    "total": 0
+    "total": 0,                 # 预计总数：上次索引中这些目录下的文件数，未知时为 0
+    "files_per_second": 0.0,
+    "current_dir": "",
+    "eta_seconds": None,        # 仅在 total 已知时估算
 }
 
+@app.on_event("startup")
+def startup():
+    """创建全局单例：缓存与缩略图服务、物种表、持久化索引、扫描调度与目录监视
+
+    不放在模块顶层：Windows 下进程池以 spawn 启动工作进程，会把主模块重新导入为
+    __mp_main__；导入本模块只做定义，工作进程不会重复加载物种表、恢复索引或启动线程
+    (工作进程入口 generate_thumbnail 位于 src.utils.thumbnailer，不导入本模块)。
+    """
+    global thumbnail_cache, thumbnail_service, preview_cache, preview_service, prewarmer
+    global loader, photo_store, scan_jobs, folder_watcher
+
+    thumbnail_cache = ThumbnailCache(CACHE_DIR, THUMBNAIL_CACHE_MAX_BYTES)
+    thumbnail_service = ThumbnailService(cache=thumbnail_cache)
+    preview_cache = ThumbnailCache(PREVIEW_DIR, PREVIEW_CACHE_MAX_BYTES)
+    preview_service = ThumbnailService(max_workers=2, size=SCREEN_SIZE, cache=preview_cache)
+    # 缓存布局与 get_cache_path 一致
+    prewarmer = ThumbnailPrewarmer(thumbnail_service, thumbnail_cache)
+
+    registry = DataRegistry()
+    registry.match_mode = MATCH_MODE
+    # 加载分类数据
+    # 优先使用运行目录下的 Excel；其编译产物在 Excel 变化后自动重建
+    loader = IOCDataLoader(str(get_execl_path()), languages=LANGUAGES)
+    loader.load_to_registry(registry)
+    photo_store = PhotoIndexStore(INDEX_DB_PATH)
+
+    # 扫描任务调度：每个任务在暂存注册中心中构建，完成后整体替换 scan_jobs.registry
+    scan_jobs = ScanJobManager(registry, store=photo_store, max_concurrent=2)
+
+    # 后台从磁盘恢复上次的照片索引 (无需重新扫描即可展示分类树，启动不等待)，
+    # 之后建立照片路径搜索索引 (随扫描与目录监视增量更新)，首次搜索无需等待
+    scan_jobs.start_restore(then=lambda live: live.build_search_index())
+
+    # 目录监视：轮询目录 mtime，防抖后增量更新分类树
+    folder_watcher = FolderWatcher(scan_jobs, store=photo_store)
+
 # --- 辅助函数 ---
 def get_cache_path(origin_path: str):
-    """根据原始路径生成唯一哈希值作为缓存文件名"""
-    file_hash = hashlib.md5(origin_path.encode()).hexdigest()
-    return CACHE_DIR / f"{file_hash}.jpg"
+    """根据原始路径及其 mtime/size 生成唯一哈希值作为缓存文件名"""
+    return thumbnail_cache.path_for_source(origin_path)
+
+# 批量分类：JSON 请求的文件名数量上限 (更大的列表使用 /api/classify/stream)；流式请求每批的文件名数量
+MAX_CLASSIFY_NAMES = 100_000
+CLASSIFY_BATCH_SIZE = 1000
 
 # --- 数据模型 ---
+class ClassifyRequest(BaseModel):
+    names: List[str]
+
+class WatchRequest(BaseModel):
+    paths: List[str]
+
 class ScanRequest(BaseModel):
     paths: List[str] 
+    # 扫描时是否在后台预生成已匹配照片的缩略图
+    prewarm: bool = False
+    # 是否对该扫描任务做采样分析，结果见 /api/scan/jobs/{job_id}/profile
+    profile: bool = False
+    # 扫描后是否对整个照片库做重复检测，结果见 /api/duplicates
+    dedupe: bool = False
+
+def current_scan_status(job_id: Optional[str] = None) -> dict:
+    """指定任务 (缺省为最近提交的任务) 的状态，附带缩略图预热进度"""
+    job = scan_jobs.get(job_id) if job_id else scan_jobs.latest()
+    result = job.to_dict() if job else dict(IDLE_SCAN_STATUS)
+    # 启动时后台恢复持久化索引，完成前分类树与搜索结果可能不完整
+    result["index_ready"] = scan_jobs.ready.is_set()
+    # 该任务的缩略图预热进度 (仅在扫描请求 prewarm=true 时增长)
+    result.update(prewarmer.progress(job.job_id if job else None))
+    return result
+
+def prewarm_photos(job_id: str, photos: List[PhotoIndex]):
+    """扫描任务的照片回调：新登记的照片加入缩略图预热，进度计入该任务"""
+    prewarmer.enqueue((p.absolute_path for p in photos), key=job_id)
 
 # --- 核心接口 ---
 @app.post("/api/scan")
-async def start_scan(request: ScanRequest, background_tasks: BackgroundTasks):
-    """启动扫描任务"""
-    global scan_status
-    print(f"Received scan request for paths: {request.paths}")
-    scan_status["status"] = "scanning"
-    scan_status["scanned"] = 0
-    scan_status["matched"] = 0
-    
-    scanner = FileScanner(registry)
-    
-    def update_progress(scanned, matched):
-        """更新扫描进度的回调函数"""
-        global scan_status
-        scan_status["scanned"] = scanned
-        scan_status["matched"] = matched
-    
-    scanner.set_progress_callback(update_progress)
-    
-    def run_scan():
-        """实际的扫描任务"""
-        total_scanned, total_matched = 0, 0
-        for path in request.paths:
-            scanned, matched = scanner.scan_directory(path)
-            total_scanned += scanned
-            total_matched += matched
-
-        # 更新状态
-        scan_status["scanned"] = total_scanned
-        scan_status["matched"] = total_matched
-        scan_status["status"] = "completed"
-
-    background_tasks.add_task(run_scan)
-    return {"message": "Scan started", "status": scan_status}
+async def start_scan(request: ScanRequest):
+    """提交扫描任务，根目录与进行中任务重复时返回已有任务"""
+    logger.info("Received scan request for paths: %s", request.paths)
+
+    # 预热进度按任务统计，复用已有任务或并发任务不会清掉其他任务的预热队列与计数
+    photo_callback = prewarm_photos if request.prewarm else None
+    job, deduplicated = scan_jobs.submit(request.paths, photo_callback=photo_callback,
+                                         profile=request.profile, dedupe=request.dedupe)
+    message = "Scan already in progress" if deduplicated else "Scan started"
+    return {"message": message, "job_id": job.job_id, "status": current_scan_status(job.job_id)}
+
+@app.get("/api/scan/jobs")
+async def list_scan_jobs():
+    """列出近期扫描任务"""
+    return [job.to_dict() for job in scan_jobs.jobs()]
+
+@app.get("/api/scan/jobs/{job_id}")
+async def get_scan_job(job_id: str):
+    """获取单个扫描任务的状态"""
+    if scan_jobs.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return current_scan_status(job_id)
+
+@app.get("/api/scan/jobs/{job_id}/profile")
+async def get_scan_profile(job_id: str, limit: int = Query(20, ge=1, le=200)):
+    """扫描任务的采样分析结果：自身耗时最多的函数及折叠栈 (可用 flamegraph.pl 生成火焰图)"""
+    job = scan_jobs.get(job_id)
+    if job is None or job.profiler is None:
+        raise HTTPException(status_code=404, detail="No profile for this job")
+    return {
+        "job_id": job_id,
+        "status": job.status,
+        "samples": job.profiler.samples,
+        "top": job.profiler.top(limit),
+        "folded": job.profiler.folded(),
+    }
+
+@app.post("/api/scan/jobs/{job_id}/cancel")
+async def cancel_scan_job(job_id: str):
+    """取消扫描任务，已扫描的部分不会生效到分类树"""
+    job = scan_jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return current_scan_status(job_id)
 
 @app.get("/api/status")
 async def get_scan_status():
-    """获取当前扫描状态"""
-    print(f"Returning scan status: {scan_status}")
-    return scan_status
+    """获取最近一次扫描任务的状态"""
+    return current_scan_status()
+
+@app.get("/api/watch")
+def list_watched():
+    """当前监视的目录"""
+    return {"paths": folder_watcher.watched()}
+
+@app.post("/api/watch")
+def add_watch(request: WatchRequest):
+    """监视目录，新增/删除/重命名的图片会增量更新到分类树
+
+    同步处理函数 (线程池)：检查目录与读取持久化索引的快照涉及磁盘 I/O，不在事件循环中进行。
+    """
+    for path in request.paths:
+        if not os.path.isdir(path):
+            raise HTTPException(status_code=404, detail=f"Directory not found: {path}")
+    for path in request.paths:
+        folder_watcher.watch(path)
+    folder_watcher.start()
+    return {"paths": folder_watcher.watched()}
+
+@app.delete("/api/watch")
+def remove_watch(path: str = Query(..., description="停止监视的目录")):
+    """停止监视目录"""
+    folder_watcher.unwatch(path)
+    return {"paths": folder_watcher.watched()}
+
+# SSE 推送间隔与心跳间隔 (秒)
+SCAN_EVENT_INTERVAL = 0.5
+SCAN_EVENT_KEEPALIVE = 15.0
+
+@app.get("/api/scan/events")
+async def scan_events(job_id: Optional[str] = Query(None, description="任务 ID，缺省为最近提交的任务")):
+    """以 Server-Sent Events 推送扫描进度，替代 /api/status 轮询
+
+    按 SCAN_EVENT_INTERVAL 节流，期间的多次进度更新合并为一条；状态未变化时
+    不推送，只定期发送心跳注释。扫描结束时发送 done 事件后关闭连接。
+    """
+    async def event_stream():
+        last_sent = None
+        last_write = time.monotonic()
+        while True:
+            snapshot = current_scan_status(job_id)
+            finished = snapshot["status"] not in ("queued", "scanning")
+            if snapshot != last_sent:
+                event = "done" if finished else "progress"
+                yield f"event: {event}\ndata: {json.dumps(snapshot, ensure_ascii=False)}\n\n"
+                last_sent = snapshot
+                last_write = time.monotonic()
+            elif time.monotonic() - last_write >= SCAN_EVENT_KEEPALIVE:
+                yield ": keepalive\n\n"
+                last_write = time.monotonic()
+            if finished:
+                return
+            await asyncio.sleep(SCAN_EVENT_INTERVAL)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.post("/api/prewarm/cancel")
+async def cancel_prewarm():
+    """取消尚未开始的缩略图预热任务"""
+    dropped = prewarmer.cancel()
+    return {"message": "Prewarm cancelled", "dropped": dropped, "status": current_scan_status()}
+
+def classify_batch(names: List[str]) -> List[dict]:
+    """在当前生效的注册中心上分类一批文件名，返回可序列化的结果"""
+    with METRICS.timer("bird_classify_batch_seconds"):
+        items = DataConverter.to_classifications(scan_jobs.registry.classify_files(names))
+    METRICS.inc("bird_classify_files_total", len(items))
+    return items
+
+@app.post("/api/classify")
+def classify_files(request: ClassifyRequest):
+    """批量分类文件名或路径，不扫描磁盘、不登记照片
+
+    每项返回物种 ID、分类路径 (目/科/属/种)、分类树节点 ID、命中语言与置信度，顺序与输入一致。
+    """
+    if len(request.names) > MAX_CLASSIFY_NAMES:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_CLASSIFY_NAMES} names per request")
+    items = classify_batch(request.names)
+    return {"total": len(items), "matched": sum(1 for item in items if item["species_id"]), "items": items}
+
+def parse_classify_line(line: bytes) -> Optional[str]:
+    """NDJSON 请求行：JSON 字符串、{"name": ...}/{"path": ...} 或不是 JSON 的纯文本文件名"""
+    text = line.decode("utf-8", errors="replace").strip()
+    if not text:
+        return None
+    try:
+        value = json.loads(text)
+    except ValueError:
+        return text
+    if isinstance(value, str):
+        return value
+    if isinstance(value, dict):
+        return value.get("name") or value.get("path")
+    return None
+
+@app.post("/api/classify/stream")
+async def classify_stream(request: Request):
+    """流式批量分类：请求体为 NDJSON (每行一个文件名)，响应为 NDJSON (每行一个结果)
+
+    不限制总行数。请求体边接收边解析，之后按 CLASSIFY_BATCH_SIZE 分批在线程池中分类并逐批输出；
+    StreamingResponse 会与请求体争用 receive，因此先读完请求体再开始响应。
+    """
+    names: List[str] = []
+    pending = b""
+    async for chunk in request.stream():
+        *lines, pending = (pending + chunk).split(b"\n")
+        names.extend(name for name in map(parse_classify_line, lines) if name)
+    name = parse_classify_line(pending)
+    if name:
+        names.append(name)
+
+    async def results():
+        for start in range(0, len(names), CLASSIFY_BATCH_SIZE):
+            items = await run_in_threadpool(classify_batch, names[start:start + CLASSIFY_BATCH_SIZE])
+            yield "".join(json.dumps(item, ensure_ascii=False) + "\n" for item in items)
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+@app.get("/api/languages")
+async def get_languages():
+    """物种表中可用的语言与当前参与匹配的语言"""
+    return {"available": loader.available_languages, "enabled": scan_jobs.registry.languages}
+
+@app.get("/api/search")
+def search(
+    q: str = Query(..., min_length=1, description="查询词，空格分隔的多个词需同时命中"),
+    kind: Optional[str] = Query(None, description="taxon / directory / photo，缺省为全部"),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+):
+    """搜索物种 (各语言名称)、分类阶元、目录与照片路径，支持中文与拉丁字母的前缀/子串查询
+
+    结果按类别 (阶元、目录、照片) 与匹配等级排序并分页；complete 为 False 表示照片命中过多，
+    只收集了前一部分。首次搜索时若索引尚未建立会先建立索引，因此使用同步处理函数 (线程池)。
+    """
+    if kind is not None and kind not in SEARCH_KINDS:
+        raise HTTPException(status_code=400, detail=f"kind must be one of {', '.join(SEARCH_KINDS)}")
+    with METRICS.timer("bird_search_seconds"):
+        total, complete, hits = scan_jobs.registry.search(q, SEARCH_KINDS if kind is None else (kind,), offset, limit)
+    return {
+        "query": q,
+        "total": total,
+        "complete": complete,
+        "offset": offset,
+        "limit": limit,
+        "items": DataConverter.to_search_hits(hits),
+    }
 
 @app.get("/api/tree")
 async def get_tree():
     """获取分类树结构, 已适配el-tree的格式"""
-    return DataConverter.to_el_tree_json(registry.tree_root)
+    with METRICS.timer("bird_tree_json_seconds"):
+        return DataConverter.to_el_tree_json(scan_jobs.registry.tree_root)
+
+@app.get("/api/tree/children")
+async def get_tree_children(node_id: str = Query("root", description="节点 ID，缺省为根节点")):
+    """懒加载：返回一个节点的直接子节点及照片计数"""
+    node = scan_jobs.registry.node_by_id.get(node_id)
+    if node is None:
+        raise HTTPException(status_code=404, detail="Node not found")
+    return {
+        "node": DataConverter.to_el_tree_node(node),
+        "children": DataConverter.to_el_tree_children(node),
+    }
+
+@app.get("/api/tree/photos")
+async def get_tree_photos(
+    node_id: str = Query(..., description="种级节点 ID"),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """分页返回种级节点下的照片
+
+    total 含重复副本 (副本仍逐张列出，item.duplicate_of 指向保留的照片)，
+    photocount 与分类树节点的照片数一致，不含副本。
+    """
+    live = scan_jobs.registry
+    node = live.node_by_id.get(node_id)
+    if node is None:
+        raise HTTPException(status_code=404, detail="Node not found")
+    return DataConverter.to_photo_page(node, offset, limit, live.duplicate_of)
+
+@app.get("/api/duplicates")
+def get_duplicates(offset: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000)):
+    """分页返回重复照片组 (按保留的照片路径排序)；副本不计入分类树的照片数量
+
+    文件大小取自持久化索引 (扫描时记录)；普通 def 在线程池中运行，
+    没有索引库时退回 stat 也不会阻塞事件循环。
+    """
+    live = scan_jobs.registry
+    groups = sorted(live.duplicate_groups())
+    page = groups[offset:offset + limit]
+    sizes = photo_store.sizes(kept for kept, *_ in page) if photo_store else {}
+    items = []
+    for kept, *copies in page:
+        photo = live.get_photo(kept)
+        size = sizes.get(kept)
+        if size is None:
+            try:
+                size = os.stat(kept).st_size
+            except OSError:
+                pass
+        items.append({
+            "kept": kept,
+            "copies": copies,
+            "species_id": photo.matched_species_id if photo else None,
+            "size": size,
+        })
+    return {"total": len(groups), "copies": live.duplicate_count, "offset": offset, "limit": limit, "items": items}
 
 @app.get("/api/image-proxy")
 # 图片预览接口
-async def image_proxy(path: str = Query(...)):
-    """ 因浏览器无法使用file:// 协议, 此接口用于代理图片请求 """
-    from fastapi.responses import FileResponse
-    if os.path.exists(path):
-        return FileResponse(path)
-    return {"error": "File not found"}
+async def image_proxy(
+    path: str = Query(...),
+    size: str = Query("screen", pattern="^(screen|original)$", description="screen: 缩小的预览图；original: 原图"),
+):
+    """ 因浏览器无法使用file:// 协议, 此接口用于代理图片请求
+
+    默认返回长边不超过 SCREEN_SIZE 的预览图 (RAW 使用内嵌预览)，只有 size=original 才传输原图。
+    两种响应都支持 ETag/Last-Modified 条件请求 (304) 与 Range 请求 (206)。
+    """
+    try:
+        stat_result = os.stat(path)
+    except OSError:
+        raise HTTPException(status_code=404, detail="File not found")
+    # 预览图随原图 mtime/size 换键，浏览器每次都需用 ETag 重新验证
+    headers = {"Cache-Control": "no-cache"}
+
+    small = stat_result.st_size <= PREVIEW_PASSTHROUGH_BYTES and path.lower().endswith(BROWSER_IMAGE_EXTENSIONS)
+    if size == "original" or small:
+        METRICS.inc("bird_image_proxy_requests_total", result="original")
+        return ConditionalFileResponse(path, headers=headers, stat_result=stat_result)
+
+    cache_path, hit = preview_cache.lookup(path)
+    if not hit:
+        try:
+            await preview_service.generate(path, cache_path)
+        except Exception as e:
+            logger.warning("生成预览图失败，返回原图: %s: %s", path, e)
+            METRICS.inc("bird_image_proxy_requests_total", result="failed")
+            return ConditionalFileResponse(path, headers=headers, stat_result=stat_result)
+    METRICS.inc("bird_image_proxy_requests_total", result="screen_hit" if hit else "screen_generated")
+    return ConditionalFileResponse(cache_path, media_type="image/jpeg", headers=headers)
 
 @app.get("/api/locate")
 async def locate_file(path: str = Query(..., description="绝对路径")):
@@ -171,32 +522,54 @@ async def get_thumbnail(path: str = Query(..., description="原始图片路径")
     if not os.path.exists(path):
         return HTTPException(status_code=404, detail="File not found")
 
-    cache_path = get_cache_path(path)
-    
-    # 1. 命中
-    if cache_path.exists():
+    started = time.perf_counter()
+    # 1. 命中 (只查内存索引)
+    cache_path, hit = thumbnail_cache.lookup(path)
+    if hit:
+        METRICS.observe("bird_thumbnail_request_seconds", time.perf_counter() - started, result="hit")
         return FileResponse(cache_path)
 
-    # 2. 未命中
+    # 2. 未命中：交给进程池生成，事件循环不被解码阻塞
     try:
-        # 生成缩略图
-        with Image.open(path) as img:
-            # RGB
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
-            
-            # 缩放200*200
-            img.thumbnail((200, 200))
-            
-            # 保存缓存
-            img.save(cache_path, "JPEG", quality = 85)
-
+        await thumbnail_service.generate(path, cache_path)
+        METRICS.observe("bird_thumbnail_request_seconds", time.perf_counter() - started, result="generated")
         return FileResponse(cache_path)
 
     except Exception as e:
-        print(f"生成缩略图失败: {e}")
+        logger.warning("生成缩略图失败: %s: %s", path, e)
+        METRICS.observe("bird_thumbnail_request_seconds", time.perf_counter() - started, result="failed")
         return FileResponse(path)
 
+@app.get("/api/cache/stats")
+async def get_cache_stats():
+    """缩略图缓存命中/未命中/淘汰统计"""
+    return {
+        "thumbnails": thumbnail_cache.stats(),
+        "generator": thumbnail_service.stats,
+        "previews": preview_cache.stats(),
+        "preview_generator": preview_service.stats,
+    }
+
+@app.get("/api/metrics")
+async def get_metrics():
+    """Prometheus 文本格式的运行指标 (扫描分阶段耗时、匹配器构建、缩略图延迟等)"""
+    live = scan_jobs.registry
+    METRICS.set("bird_photos", live.photo_count)
+    METRICS.set("bird_duplicate_photos", live.duplicate_count)
+    METRICS.set("bird_species", len(live.species_map))
+    METRICS.set("bird_scan_jobs_active", sum(1 for job in scan_jobs.jobs() if job.active))
+    cache_stats = thumbnail_cache.stats()
+    METRICS.set("bird_thumbnail_cache_bytes", cache_stats["bytes"])
+    METRICS.set("bird_thumbnail_cache_entries", cache_stats["entries"])
+    return Response(METRICS.render(), media_type="text/plain; version=0.0.4")
+
+@app.on_event("shutdown")
+def shutdown_thumbnail_service():
+    folder_watcher.stop()
+    prewarmer.cancel()
+    thumbnail_service.shutdown()
+    preview_service.shutdown()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
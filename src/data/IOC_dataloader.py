@@ -1,46 +1,170 @@
-import pandas as pd
-from typing import List
-from src.models.birds import BirdSpecies, DataRegistry
+import json
+import logging
+import marshal
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+from src.models.birds import BirdSpecies, DataRegistry, CHINESE
+from src.utils.metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+# 编译产物格式版本，调整列或结构时递增以使旧产物失效
+COMPILED_FORMAT_VERSION = 2
+# 编译产物默认位置，与缩略图缓存同在 .bird_cache 下
+DEFAULT_COMPILED_PATH = Path("./.bird_cache/species.bin")
+# 编译时保留的分类列：IOC 列 -> 产物中的列名
+COMPILED_COLUMNS = {'Order': 'order', 'Family': 'family', 'IOC_15.1': 'latin'}
+# Multiling IOC 的语言列 -> 语言标签 (产物中的列名)；表中存在的语言列全部编译
+LANGUAGE_COLUMNS = {
+    'Chinese': 'zh', 'Chinese (Traditional)': 'zh-Hant', 'English': 'en', 'German': 'de',
+    'Japanese': 'ja', 'French': 'fr', 'Spanish': 'es', 'Italian': 'it', 'Dutch': 'nl',
+    'Portuguese (Lusophone)': 'pt-BR', 'Portuguese (Portuguese)': 'pt-PT', 'Russian': 'ru',
+    'Polish': 'pl', 'Czech': 'cs', 'Slovak': 'sk', 'Danish': 'da', 'Swedish': 'sv',
+    'Norwegian': 'no', 'Finnish': 'fi', 'Icelandic': 'is', 'Estonian': 'et', 'Latvian': 'lv',
+    'Lithuanian': 'lt', 'Hungarian': 'hu', 'Croatian': 'hr', 'Serbian': 'sr', 'Slovenian': 'sl',
+    'Ukrainian': 'uk', 'Catalan': 'ca', 'Turkish': 'tr', 'Persian': 'fa', 'Thai': 'th',
+    'Indonesian': 'id', 'Northern Sami': 'se',
+}
+# 缺省启用的匹配语言；学名与中文名始终参与匹配
+DEFAULT_LANGUAGES = (CHINESE,)
 
 class IOCDataLoader:
-    def __init__(self, excel_path: str):
+    """IOC 物种表加载器
+
+    成员变量:
+        excel_path: str                         # Multiling IOC Excel 路径
+        compiled_path: Path                     # 编译产物路径
+        languages: Optional[List[str]]          # 启用的匹配语言标签，None 表示表中全部语言
+        available_languages: List[str]          # 最近一次加载时表中存在的语言标签
+    """
+    def __init__(self, excel_path: str, compiled_path: Optional[str] = None,
+                 languages: Optional[Iterable[str]] = DEFAULT_LANGUAGES):
         self.excel_path = excel_path
-        
+        self.compiled_path = Path(compiled_path) if compiled_path else DEFAULT_COMPILED_PATH
+        self.languages = list(languages) if languages is not None else None
+        self.available_languages: List[str] = []
+
     def load_to_registry(self, registry: DataRegistry):
-        """从 Excel 读取并注册到 DataRegistry"""
+        """读取物种数据并注册到 DataRegistry
+
+        优先读取编译产物 (毫秒级)；产物缺失、格式过期或 Excel 有变化时
+        才解析 Excel 并重新编译。产物包含表中全部语言列，切换启用的语言无需重新编译；
+        其他语言的名称按列整体登记 (DataRegistry.add_names)，不逐行处理。
+        """
+        started = time.perf_counter()
+        source = "compiled"
         try:
-            # 加载 Excel 文件
-            df = pd.read_excel(
-                self.excel_path,
-                sheet_name="List",
-                usecols=['Order', 'Family', 'IOC_15.1', 'Chinese']
-            )
-
-            # 遍历每一行，创建 BirdSpecies 对象并实例化
-            for _, row in df.iterrows():
-                # 跳过空行
-                if pd.isna(row['IOC_15.1']) or pd.isna(row['Chinese']):
-                    continue
+            columns = self._read_compiled()
+            if columns is None:
+                source = "excel"
+                columns = self.compile()
 
+            for order, family, latin, chinese in zip(
+                columns['order'], columns['family'], columns['latin'], columns[CHINESE]
+            ):
                 # 提取 genus 信息（IOC 15.1 中属名在第一词）
-                latin = str(row['IOC_15.1'])
                 genus = latin.split()[0]
-                
+
                 # 创建物种信息
                 species = BirdSpecies(
                     id = latin,
-                    order = str(row['Order']).strip(),
-                    family = str(row['Family']).strip(),
+                    order = order,
+                    family = family,
                     genus = genus,
                     scientific_name = latin,
-                    chinese_name = str(row['Chinese']).strip(),
-                    search_keys = [str(row['Chinese']).strip(), latin.lower()]
+                    chinese_name = chinese,
+                    search_keys = [chinese, latin.lower()]
                 )
-                
+
                 # 注册到 DataRegistry
                 registry.add_species(species)
 
-            print(f"Successfully loaded {len(df)} species into registry.")
-                
-        except Exception as e:
-            print(f"Error loading data: {e}")
\ No newline at end of file
+            # 持久化索引据此 (与匹配模式、语言一起) 判断保存的匹配结果是否失效
+            registry.species_source = json.dumps(self._source_key(), sort_keys=True)
+            self.available_languages = [tag for tag in LANGUAGE_COLUMNS.values() if tag in columns]
+            for tag in self.languages if self.languages is not None else self.available_languages:
+                if tag == CHINESE:
+                    continue
+                if tag not in columns:
+                    logger.warning("Language %r is not in %s, skipped", tag, self.excel_path)
+                    continue
+                registry.add_names(tag, zip(columns[tag], columns['latin']))
+
+            # 匹配自动机在首次 match_file 时编译一次，不占用启动时间
+            METRICS.observe("bird_loader_seconds", time.perf_counter() - started, source=source)
+            logger.info("Successfully loaded %d species into registry (languages: %s).",
+                        len(columns['latin']), ", ".join(registry.languages))
+
+        except Exception:
+            logger.exception("Error loading data from %s", self.excel_path)
+
+    def _source_key(self) -> Dict:
+        """Excel 的身份信息，任一字段变化即视为需要重新编译"""
+        stat = os.stat(self.excel_path)
+        return {
+            "format": COMPILED_FORMAT_VERSION,
+            "source": str(Path(self.excel_path).resolve()),
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+        }
+
+    def _read_compiled(self) -> Optional[Dict[str, List[str]]]:
+        """读取编译产物，失效或损坏时返回 None"""
+        try:
+            with open(self.compiled_path, "rb") as f:
+                artifact = marshal.load(f)
+            if artifact.get("key") != self._source_key():
+                return None
+            return artifact["columns"]
+        except FileNotFoundError:
+            return None
+        except (EOFError, ValueError, TypeError, KeyError, AttributeError):
+            logger.warning("Compiled species data is corrupt, rebuilding: %s", self.compiled_path)
+            return None
+
+    def compile(self) -> Dict[str, List[str]]:
+        """解析 Excel 并写出列式编译产物，返回各列数据
+
+        pandas/openpyxl 只在这里导入，正常启动路径不会加载它们。
+        """
+        import pandas as pd
+
+        # 加载 Excel 文件：分类列与表中存在的全部语言列一次读入
+        df = pd.read_excel(
+            self.excel_path,
+            sheet_name="List",
+            usecols=lambda col: col in COMPILED_COLUMNS or col in LANGUAGE_COLUMNS
+        )
+        # 跳过空行
+        df = df.dropna(subset=['IOC_15.1', 'Chinese'])
+
+        columns = {
+            name: df[col].astype(str).str.strip().tolist()
+            for col, name in COMPILED_COLUMNS.items()
+        }
+        # 学名保持原样 (与旧实现一致，不做 strip)
+        columns['latin'] = df['IOC_15.1'].astype(str).tolist()
+        # 语言列按列向量化处理，缺失的名称为空字符串
+        for col, tag in LANGUAGE_COLUMNS.items():
+            if col in df.columns:
+                columns[tag] = df[col].fillna("").astype(str).str.strip().tolist()
+
+        artifact = {"key": self._source_key(), "columns": columns}
+        self.compiled_path.parent.mkdir(parents=True, exist_ok=True)
+        # 先写临时文件再替换，避免并发启动的 worker 读到半个文件
+        tmp_path = self.compiled_path.with_name(f"{self.compiled_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            marshal.dump(artifact, f)
+        os.replace(tmp_path, self.compiled_path)
+        logger.info("Compiled %d species to %s", len(columns['latin']), self.compiled_path)
+        return columns
+
+
+if __name__ == "__main__":
+    # 构建步骤 (在项目根目录执行)：python -m src.data.IOC_dataloader [xlsx 路径] [产物路径]
+    logging.basicConfig(level=logging.INFO)
+    excel = sys.argv[1] if len(sys.argv) > 1 else "src/data/Multiling IOC 15.1_d.xlsx"
+    IOCDataLoader(excel, sys.argv[2] if len(sys.argv) > 2 else None).compile()
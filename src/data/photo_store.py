@@ -0,0 +1,220 @@
+import logging
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from src.models.birds import DataRegistry, PhotoIndex
+
+logger = logging.getLogger(__name__)
+
+# (mtime_ns, size, inode) 三元组，用于判断文件自上次扫描后是否变化
+FileSignature = Tuple[int, int, int]
+# 重复检测的哈希列，旧版索引库缺少时自动补上；文件变化后整行被替换，哈希随之清空
+HASH_COLUMNS = ("edge_hash", "content_hash")
+# 恢复时每批登记到注册中心的照片数量，批间释放注册中心的锁，查询可看到逐步补全的分类树
+RESTORE_BATCH_SIZE = 10000
+# 按路径批量查询时每条语句的参数个数，低于 SQLite 旧版本的 999 上限
+SIZE_QUERY_BATCH = 500
+
+
+class PhotoIndexStore:
+    """持久化照片索引 (SQLite)
+
+    以绝对路径为主键记录每个受支持图片的 mtime/size/inode 及匹配结果，
+    未匹配的文件也会记录，重复扫描时无需重新匹配。重复检测计算过的哈希也保存在
+    同一行，文件未变化时直接沿用。
+
+    匹配结果只在保存时的匹配配置下有效：meta 表记录配置指纹 (DataRegistry.match_fingerprint)，
+    匹配模式、启用的语言或物种表变化后，首次恢复/扫描时重新匹配全部记录 (sync_matches)。
+
+    成员变量:
+        match_fingerprint: Optional[str]        # 已保存匹配结果对应的匹配配置指纹
+
+    方法:
+        snapshot(root_path)                     # 返回 root_path 下已索引文件的签名与匹配结果
+        count(root_path)                        # 返回 root_path 下已索引文件数量
+        sizes(paths)                            # 批量查询已索引文件的字节数
+        upsert(rows)                            # 批量写入/更新文件记录
+        delete(paths)                           # 批量删除文件记录
+        sync_matches(registry)                  # 匹配配置变化时重新匹配全部记录
+        restore(registry)                       # 启动时从磁盘恢复照片索引与分类树
+        duplicate_candidates()                  # 与其他已匹配文件大小相同的已匹配文件及已知哈希
+        save_hashes(rows)                       # 批量写回重复检测计算的哈希
+        duplicate_groups()                      # 按已保存的完整哈希得到的重复组
+    """
+    def __init__(self, db_path: str):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = str(db_path)
+        # 扫描线程与请求线程共用同一连接，由 _lock 串行化
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        # 串行化 sync_matches，同一配置只重新匹配一次
+        self._sync_lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS photos (
+                    path TEXT PRIMARY KEY,
+                    file_name TEXT NOT NULL,
+                    species_id TEXT,
+                    mtime_ns INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    inode INTEGER NOT NULL
+                )"""
+            )
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(photos)")}
+            for column in HASH_COLUMNS:
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE photos ADD COLUMN {column} BLOB")
+            # 重复检测按大小分组，只涉及已匹配的文件
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS photos_matched_size ON photos(size) WHERE species_id IS NOT NULL"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS photos_content_hash ON photos(content_hash) WHERE content_hash IS NOT NULL"
+            )
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self._conn.commit()
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'match_fingerprint'").fetchone()
+        self.match_fingerprint: Optional[str] = row[0] if row else None
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def snapshot(self, root_path: str) -> Dict[str, Tuple[FileSignature, Optional[str]]]:
+        """返回 root_path 下所有已索引文件：路径 -> (签名, 物种 ID)"""
+        prefix = os.path.join(os.path.abspath(root_path), "")
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, mtime_ns, size, inode, species_id FROM photos WHERE path >= ? AND path < ?",
+                (prefix, prefix + "\U0010ffff"),
+            ).fetchall()
+        return {path: ((mtime, size, inode), species_id) for path, mtime, size, inode, species_id in rows}
+
+    def count(self, root_path: str) -> int:
+        """root_path 下已索引的文件数量，可作为重新扫描时的总量估计"""
+        prefix = os.path.join(os.path.abspath(root_path), "")
+        with self._lock:
+            (n,) = self._conn.execute(
+                "SELECT COUNT(*) FROM photos WHERE path >= ? AND path < ?",
+                (prefix, prefix + "\U0010ffff"),
+            ).fetchone()
+        return n
+
+    def sizes(self, paths: Iterable[str]) -> Dict[str, int]:
+        """已索引文件的字节数 (扫描时记录)：路径 -> size，未索引的路径不在结果中"""
+        paths = list(paths)
+        sizes: Dict[str, int] = {}
+        with self._lock:
+            # 分批查询，避免超出 SQLite 的参数个数上限
+            for start in range(0, len(paths), SIZE_QUERY_BATCH):
+                batch = paths[start:start + SIZE_QUERY_BATCH]
+                sizes.update(self._conn.execute(
+                    f"SELECT path, size FROM photos WHERE path IN ({','.join('?' * len(batch))})", batch,
+                ).fetchall())
+        return sizes
+
+    def upsert(self, rows: Iterable[Tuple[str, str, Optional[str], int, int, int]]):
+        """批量写入 (path, file_name, species_id, mtime_ns, size, inode)"""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO photos (path, file_name, species_id, mtime_ns, size, inode) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+    def delete(self, paths: Iterable[str]):
+        """批量删除文件记录"""
+        with self._lock:
+            self._conn.executemany("DELETE FROM photos WHERE path = ?", ((p,) for p in paths))
+            self._conn.commit()
+
+    def duplicate_candidates(self) -> List[Tuple[str, int, Optional[bytes], Optional[bytes]]]:
+        """已匹配且大小与其他已匹配文件相同的记录 [(path, size, edge_hash, content_hash)]"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT path, size, edge_hash, content_hash FROM photos "
+                "WHERE species_id IS NOT NULL AND size > 0 AND size IN ("
+                "  SELECT size FROM photos WHERE species_id IS NOT NULL GROUP BY size HAVING COUNT(*) > 1)"
+            ).fetchall()
+
+    def save_hashes(self, rows: Iterable[Tuple[Optional[bytes], Optional[bytes], str]]):
+        """批量写回 (edge_hash, content_hash, path)"""
+        with self._lock:
+            self._conn.executemany("UPDATE photos SET edge_hash = ?, content_hash = ? WHERE path = ?", rows)
+            self._conn.commit()
+
+    def duplicate_groups(self) -> List[List[str]]:
+        """完整哈希相同的已匹配文件组，只读数据库，不读取照片"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT content_hash, path FROM photos "
+                "WHERE content_hash IS NOT NULL AND species_id IS NOT NULL "
+                "ORDER BY content_hash, path"
+            ).fetchall()
+        groups: Dict[bytes, List[str]] = {}
+        for digest, path in rows:
+            groups.setdefault(digest, []).append(path)
+        return [paths for paths in groups.values() if len(paths) > 1]
+
+    def sync_matches(self, registry: DataRegistry) -> int:
+        """registry 的匹配配置与保存结果时不同时，按文件名重新匹配全部记录，返回结果变化的数量
+
+        只更新物种 ID，签名与已保存的哈希保持不变；同一批中重复的文件名只匹配一次。
+        """
+        fingerprint = registry.match_fingerprint()
+        with self._sync_lock:
+            if self.match_fingerprint == fingerprint:
+                return 0
+            with self._lock:
+                rows = self._conn.execute("SELECT path, file_name, species_id FROM photos").fetchall()
+            matches: Dict[str, Optional[str]] = {}
+            changed = []
+            for path, name, species_id in rows:
+                new = matches.get(name, False)
+                if new is False:
+                    new = matches[name] = registry.match_file(name)
+                if new != species_id:
+                    changed.append((new, path))
+            with self._lock:
+                self._conn.executemany("UPDATE photos SET species_id = ? WHERE path = ?", changed)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('match_fingerprint', ?)", (fingerprint,)
+                )
+                self._conn.commit()
+            self.match_fingerprint = fingerprint
+        if rows:
+            logger.info("Matcher config changed: re-matched %d stored files, %d changed", len(rows), len(changed))
+        return len(changed)
+
+    def restore(self, registry: DataRegistry) -> int:
+        """将已匹配的记录恢复到 DataRegistry，物种表中已不存在的 ID 会被跳过
+
+        匹配配置变化时先重新匹配 (sync_matches)；上次重复检测得到的重复组
+        (按已保存的完整哈希) 一并恢复，不读取照片。
+
+        返回值：
+            int: 恢复的照片数量
+        """
+        self.sync_matches(registry)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, file_name, species_id FROM photos WHERE species_id IS NOT NULL"
+            ).fetchall()
+        species_map = registry.species_map
+        restored = 0
+        for start in range(0, len(rows), RESTORE_BATCH_SIZE):
+            photos: List[PhotoIndex] = [
+                PhotoIndex(file_name=name, absolute_path=path, matched_species_id=species_id)
+                for path, name, species_id in rows[start:start + RESTORE_BATCH_SIZE]
+                if species_id in species_map
+            ]
+            registry.add_photos(photos)
+            restored += len(photos)
+        registry.set_duplicates(self.duplicate_groups())
+        logger.info("Restored %d photos from %s", restored, self.db_path)
+        return restored
@@ -1,5 +1,23 @@
+import hashlib
+import json
+import os
+import threading
+from array import array
 from dataclasses import dataclass, field
-from typing import List, Optional, Dict
+from typing import Callable, Iterable, Iterator, List, Optional, Dict, Set, Tuple
+from src.utils.aho_corasick import AhoCorasickMatcher
+from src.utils.fuzzy_matcher import FuzzyNameMatcher, LATIN
+from src.utils.metrics import METRICS
+from src.utils.search_index import NameSearchIndex, PhotoSearchIndex, MAX_PHOTO_HITS, SEPARATORS, tokenize
+
+# 中文名的语言标签 (学名为 fuzzy_matcher.LATIN)
+CHINESE = "zh"
+# 纯拉丁字母名称的最短长度，更短的名称 ('Ou'、'Emu') 容易误中文件名中的普通单词
+MIN_LATIN_SCRIPT_KEY_LENGTH = 4
+# DataRegistry.search 的结果类别，按此顺序排列
+SEARCH_KINDS = ("taxon", "directory", "photo")
+# 同一匹配等级的分类阶元按照片数量排序，再按级别 (目在前)
+RANK_ORDER = {"Order": 0, "Family": 1, "Genus": 2, "species": 3}
 
 @dataclass
 class BirdSpecies:
@@ -24,18 +42,137 @@ class BirdSpecies:
     search_keys: List[str] = field(default_factory=list)
 
 @dataclass
+class Classification:
+    """单个文件名的分类结果 (DataRegistry.classify_files)
+
+    成员变量:
+        name: str                               # 调用方传入的文件名或路径 (原样返回)
+        species: Optional[BirdSpecies]          # 匹配的物种，未匹配时为 None
+        language: Optional[str]                 # 命中名称的语言标签 ('la' 学名, 'zh' 中文...)
+        confidence: float                       # 置信度 0~1
+    """
+    name: str
+    species: Optional[BirdSpecies] = None
+    language: Optional[str] = None
+    confidence: float = 0.0
+
+@dataclass
+class SearchHit:
+    """搜索结果中的一项 (DataRegistry.search)
+
+    成员变量:
+        kind: str                               # 'taxon' 分类阶元 / 'directory' 目录 / 'photo' 照片
+        name: str                               # 节点名称 / 目录路径 / 文件名
+        tier: int                               # 匹配等级，越小越好
+        rank: Optional[str]                     # 分类级别 (仅 taxon)
+        node_id: Optional[str]                  # 分类树节点 ID (仅 taxon)
+        path: Optional[str]                     # 目录或照片的绝对路径
+        species_id: Optional[str]               # 物种 ID (种级 taxon 与照片)
+        photo_count: int                        # 节点子树 / 目录中的照片数量 (照片为 0)
+    """
+    kind: str
+    name: str
+    tier: int = 0
+    rank: Optional[str] = None
+    node_id: Optional[str] = None
+    path: Optional[str] = None
+    species_id: Optional[str] = None
+    photo_count: int = 0
+
 class PhotoIndex:
     """物理文件索引类
+
+    只用于登记照片和返回查询结果；注册中心与分类树内部按列存储 (见 PhotoColumns)，
+    不为每张照片长期保留对象。使用 __slots__，没有实例字典。
     
     成员变量:
         file_name: str                          # 原始文件名
         absolute_path: str                      # 文件的绝对物理路径，用于一键定位
         matched_species_id: Optional[str]       # 关联的 BirdSpecies.id，未匹配时为 None
     """
-    file_name: str                          # 原始文件名
-    absolute_path: str                      # 物理路径，用于一键定位
-    matched_species_id: Optional[str] = None  # 关联的 BirdSpecies.id
-    # root_dir: str = ""                      # 所属扫描根目录
+    __slots__ = ("file_name", "absolute_path", "matched_species_id")
+
+    def __init__(self, file_name: str, absolute_path: str, matched_species_id: Optional[str] = None):
+        self.file_name = file_name                      # 原始文件名
+        self.absolute_path = absolute_path              # 物理路径，用于一键定位
+        self.matched_species_id = matched_species_id    # 关联的 BirdSpecies.id
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, PhotoIndex):
+            return NotImplemented
+        return (self.file_name, self.absolute_path, self.matched_species_id) == \
+            (other.file_name, other.absolute_path, other.matched_species_id)
+
+    def __repr__(self) -> str:
+        return (f"PhotoIndex(file_name={self.file_name!r}, absolute_path={self.absolute_path!r}, "
+                f"matched_species_id={self.matched_species_id!r})")
+
+
+class PhotoColumns:
+    """物种节点下照片的列式存储
+
+    每张照片只占一个目录序号 (array 中 4 字节) 和一个文件名引用；目录字符串
+    在 DataRegistry.dirs 中只存一份，完整路径在查询时拼接。
+    修改只在持有所属 DataRegistry 的锁时进行 (两列分步更新)，page 在同一把锁下
+    截取两列，不会把新的目录序号与旧的文件名配对。
+
+    成员变量:
+        dirs: List[str]                         # 目录表 (与所属 DataRegistry 共享)
+        lock: RLock                             # 所属 DataRegistry 的锁
+        dir_ids: array                          # 每张照片的目录序号
+        names: List[str]                        # 每张照片的文件名
+
+    方法:
+        append(dir_id, name)                    # 追加照片
+        remove(dir_id, name)                    # 移除照片，返回是否存在
+        remove_many(keys)                       # 一次遍历批量移除 {(目录序号, 文件名)}，返回移除数量
+        page(offset, limit)                     # 返回 [(文件名, 绝对路径)]
+    """
+    __slots__ = ("dirs", "lock", "dir_ids", "names")
+
+    def __init__(self, dirs: List[str], lock: threading.RLock):
+        self.dirs = dirs
+        self.lock = lock
+        self.dir_ids = array("I")
+        self.names: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def append(self, dir_id: int, name: str):
+        self.dir_ids.append(dir_id)
+        self.names.append(name)
+
+    def remove(self, dir_id: int, name: str) -> bool:
+        # list.index 在 C 层按文件名查找，再核对目录
+        i = -1
+        while True:
+            try:
+                i = self.names.index(name, i + 1)
+            except ValueError:
+                return False
+            if self.dir_ids[i] == dir_id:
+                del self.names[i]
+                del self.dir_ids[i]
+                return True
+
+    def remove_many(self, keys: Set[Tuple[int, str]]) -> int:
+        # 逐个 remove 时每次都要线性查找，批量时只过滤一遍并重建两列
+        if len(keys) == 1:
+            return int(self.remove(*next(iter(keys))))
+        kept = [(d, name) for d, name in zip(self.dir_ids, self.names) if (d, name) not in keys]
+        removed = len(self.names) - len(kept)
+        if removed:
+            # 先建好两列再一起替换 (调用方持有 lock，page 不会看到只换了一列的状态)
+            self.dir_ids, self.names = array("I", (d for d, _ in kept)), [name for _, name in kept]
+        return removed
+
+    def page(self, offset: int = 0, limit: Optional[int] = None) -> List[Tuple[str, str]]:
+        with self.lock:
+            end = len(self.names) if limit is None else offset + limit
+            dir_ids, names = self.dir_ids[offset:end], self.names[offset:end]
+        dirs = self.dirs
+        return [(name, os.path.join(dirs[d], name)) for d, name in zip(dir_ids, names)]
 
 @dataclass
 class TaxonNode:
@@ -45,23 +182,45 @@ class TaxonNode:
         rank: str                               # 分类级别: 'Order', 'Family', 'Genus', 或 'Species'
         name: str                               # 节点显示名称
         children: Dict[str, 'TaxonNode']        # 子节点字典，键为子节点名称
-        photo_indices: List[PhotoIndex]         # 该节点直接关联的照片列表
+        photos: Optional[PhotoColumns]          # 该节点直接关联的照片 (仅种节点，首张照片挂载时创建)
+        photo_count: int                        # 当前节点及所有子节点的照片总数 (重复照片只计一次)，由 DataRegistry 增量维护
+        node_id: str                            # 稳定节点 ID，由分类路径生成，重启后不变
     
     属性:
-        total_photos: int                       # 递归计算当前节点及所有子节点的照片总数
+        total_photos: int                       # 当前节点及所有子节点的照片总数 (O(1))
     """
     rank: str                               # 'Order', 'Family', 'Genus', or 'Species'
     name: str                               # 节点显示名称
     children: Dict[str, 'TaxonNode'] = field(default_factory=dict)
-    photo_indices: List[PhotoIndex] = field(default_factory=list)  # 该节点直接关联的照片
+    photos: Optional[PhotoColumns] = None   # 该节点直接关联的照片 (列式存储)
+    photo_count: int = 0                    # 子树照片总数 (不含重复副本)，挂载/摘除照片时沿路径增减
+    node_id: str = ""                       # 稳定节点 ID (见 taxon_node_id)
     
     @property
     def total_photos(self) -> int:
-        """递归计算当前节点及所有子节点的照片总数"""
-        count = len(self.photo_indices)
-        for child in self.children.values():
-            count += child.total_photos
-        return count
+        """当前节点及所有子节点的照片总数"""
+        return self.photo_count
+
+    @property
+    def direct_photos(self) -> int:
+        """该节点直接关联的照片数量"""
+        return len(self.photos) if self.photos is not None else 0
+
+
+def taxon_node_id(path: List[str]) -> str:
+    """由 目/科/属/种 名称路径生成稳定且唯一的节点 ID"""
+    return hashlib.sha1("/".join(path).encode("utf-8")).hexdigest()[:16]
+
+
+def taxonomy_path(species: BirdSpecies) -> List[Tuple[str, str]]:
+    """物种在分类树中的 [(级别, 节点名称)]，目 -> 科 -> 属 -> 种"""
+    return [
+        ("Order", species.order),
+        ("Family", species.family),
+        ("Genus", species.genus),
+        # 种节点名称为 "中文名 学名"
+        ("species", f"{species.chinese_name} {species.scientific_name}"),
+    ]
 
 
 class DataRegistry:
@@ -69,15 +228,48 @@ class DataRegistry:
     
     成员变量:
         species_map: Dict[str, BirdSpecies]     # 核心数据：ID -> 物种对象映射
-        match_lookup: Dict[str, str]            # 快速检索：中文/学名 -> 物种ID映射
-        all_photos: List[PhotoIndex]            # 所有照片索引列表
+        match_lookup: Dict[str, str]            # 快速检索：中文/学名/各语言名称 -> 物种ID映射
+        key_languages: Dict[str, str]           # 匹配键 -> 语言标签 ('la' 学名, 'zh' 中文, 'en'...)
+        languages: List[str]                    # 已登记名称的语言标签
+        species_ids: List[str]                  # 整数物种序号 -> 物种 ID
+        species_index: Dict[str, int]           # 物种 ID -> 整数物种序号
+        dirs: List[str]                         # 目录表：目录序号 -> 目录路径 (每个目录只存一份)
+        dir_ids: Dict[str, int]                 # 目录路径 -> 目录序号
+        all_photos: List[PhotoIndex]            # 所有照片索引列表 (按需生成)
+        photo_count: int                        # 照片总数 (重复照片只计一次)
+        duplicate_count: int                    # 被折叠的重复副本数量
         tree_root: TaxonNode                    # 虚拟分类树的根节点
+        node_by_id: Dict[str, TaxonNode]        # 节点 ID -> 分类树节点，供懒加载接口查询
+        match_mode: str                         # 文件名匹配模式: 'exact' (子串) 或 'fuzzy' (容错)
+        species_source: Optional[str]           # 物种表来源标识 (IOCDataLoader 设置为 Excel 的身份信息)
+        search_index: Optional[PhotoSearchIndex]  # 照片路径搜索索引 (首次搜索或 build_search_index 时建立)
     
     方法:
         add_species(species)                    # 注册 IOC 权威物种并建立匹配索引
+        add_names(language, names)              # 批量登记某一语言的物种名称
+        clone_species()                         # 共享物种数据的空注册中心 (扫描暂存区)
+        build_matcher()                         # 基于 match_lookup 编译多模式匹配自动机
+        build_fuzzy_matcher()                   # 编译容错匹配器 (规范化精确匹配 + 三元组索引)
         match_file(file_name)                   # 根据文件名返回匹配的物种 ID
+        match_file_scored(file_name)            # 返回 (物种 ID, 置信度)
+        match_file_tagged(file_name)            # 返回 (物种 ID, 命中名称的语言标签, 置信度)
+        match_fingerprint()                     # 匹配配置的指纹，变化时已保存的匹配结果失效
+        classify_files(names)                   # 批量分类文件名或路径，不登记照片
         add_photo(photo)                        # 注册照片索引
-        _update_tree(photo)                     # 将照片挂载到分类树节点
+        add_photos(photos)                      # 批量注册照片索引 (单次加锁)
+        merge_photos(other, exclude_roots)      # 从共享物种表的注册中心批量复制照片
+        has_photo(path) / get_photo(path)       # 按路径查询照片
+        iter_photos()                           # 遍历所有照片
+        iter_directories()                      # 遍历 (目录, 文件名列表)
+        directory_names(directory)              # 目录下已登记的文件名
+        remove_photo(absolute_path)             # 按路径注销照片索引
+        remove_photos(paths)                    # 批量注销照片索引
+        set_duplicates(groups)                  # 登记内容相同的照片组，副本不计入分类树计数
+        duplicate_groups()                      # 当前的重复照片组 [[保留的路径, 副本路径...]]
+        duplicate_of(path)                      # 副本对应的保留照片路径，非副本为 None
+        build_search_index()                    # 为全部照片建立路径搜索索引
+        search(query, kinds, offset, limit)     # 搜索分类阶元、目录与照片路径，返回排序后的一页结果
+        _update_tree(dir_id, name, species)     # 将照片挂载到分类树节点
         show_tree()                             # 递归打印分类树
         show_photos(node, indent)               # 递归打印节点照片
     """
@@ -87,63 +279,596 @@ class DataRegistry:
         
         # 快速检索：中文/学名 -> 物种ID
         self.match_lookup: Dict[str, str] = {}
+        self.key_languages: Dict[str, str] = {}
+        # 中文名随 add_species 登记，其他语言由 add_names 追加
+        self.languages: List[str] = [CHINESE]
+
+        # 整数物种序号，照片只记录序号
+        self.species_ids: List[str] = []
+        self.species_index: Dict[str, int] = {}
+
+        # 由 match_lookup 编译的匹配自动机，物种变动后置空，下次匹配时重建
+        self._matcher: Optional[AhoCorasickMatcher] = None
+        self._fuzzy: Optional[FuzzyNameMatcher] = None
+        self.match_mode = "exact"
+        # 物种表来源 (未设置时指纹改用 match_lookup 的摘要，随物种变动置空)
+        self.species_source: Optional[str] = None
+        self._species_digest: Optional[str] = None
+
+        # 分类阶元名称索引 (随物种变动置空) 与其文档 [(级别, 名称, 节点 ID, 物种 ID)]；
+        # 照片路径索引只在在线注册中心上维护，扫描任务替换注册中心时沿用
+        self._taxon_search: Optional[Tuple[NameSearchIndex, List[Tuple[str, str, str, Optional[str]]]]] = None
+        self.search_index: Optional[PhotoSearchIndex] = None
         
-        # 所有的照片索引列表
-        self.all_photos: List[PhotoIndex] = []
+        # 照片索引按目录存储：目录序号 -> {文件名: 物种序号}，保证同一文件只登记一次；
+        # 目录路径只在 dirs 中存一份，文件名字符串与分类树节点共用
+        self.dirs: List[str] = []
+        self.dir_ids: Dict[str, int] = {}
+        self._files: Dict[int, Dict[str, int]] = {}
+
+        # 重复照片：副本路径 -> 保留的路径，保留的路径 -> 副本路径；副本不计入分类树计数
+        self._duplicate_of: Dict[str, str] = {}
+        self._copies: Dict[str, List[str]] = {}
         
         # 虚拟分类树根节点
-        self.tree_root = TaxonNode(rank="Root", name="World Birds")
+        self.tree_root = TaxonNode(rank="Root", name="World Birds", node_id="root")
+        self.node_by_id: Dict[str, TaxonNode] = {"root": self.tree_root}
+
+        # 保护照片列表与分类树的写操作，供多线程扫描使用
+        self._lock = threading.RLock()
 
     def add_species(self, species: BirdSpecies):
         """注册 IOC 权威物种并建立匹配索引"""
         self.species_map[species.id] = species
+        if species.id not in self.species_index:
+            self.species_index[species.id] = len(self.species_ids)
+            self.species_ids.append(species.id)
+        latin = species.scientific_name.lower()
         for key in species.search_keys:
-            self.match_lookup[key.lower()] = species.id
+            key = key.lower()
+            self.match_lookup[key] = species.id
+            self.key_languages[key] = LATIN if key == latin else CHINESE
+        self._matcher = None
+        self._fuzzy = None
+        self._taxon_search = None
+        self._species_digest = None
+
+    def add_names(self, language: str, names: Iterable[Tuple[str, str]]):
+        """批量登记某一语言的物种名称 [(名称, 物种 ID)]
+
+        整列一次性合并到 match_lookup，不逐物种调用 add_species；
+        与已有关键字冲突时保留已有的 (学名与中文名优先，其次是先登记的语言)。
+        过短的拉丁字母名称不参与匹配 (见 MIN_LATIN_SCRIPT_KEY_LENGTH)。
+        """
+        keys: Dict[str, str] = {}
+        for name, species_id in names:
+            key = name.strip().lower()
+            if not key or (key.isascii() and len(key) < MIN_LATIN_SCRIPT_KEY_LENGTH):
+                continue
+            keys.setdefault(key, species_id)
+        for key in keys.keys() & self.match_lookup.keys():
+            del keys[key]
+        self.match_lookup.update(keys)
+        self.key_languages.update(dict.fromkeys(keys, language))
+        if language not in self.languages:
+            self.languages.append(language)
+        self._matcher = None
+        self._fuzzy = None
+        self._taxon_search = None
+        self._species_digest = None
+
+    def clone_species(self) -> "DataRegistry":
+        """创建共享物种表与匹配自动机、但照片与分类树为空的新注册中心
+
+        用作扫描任务的暂存区；物种数据加载完成后只读，因此可以安全共享。
+        """
+        clone = DataRegistry()
+        clone.species_map = self.species_map
+        clone.match_lookup = self.match_lookup
+        clone.key_languages = self.key_languages
+        clone.languages = self.languages
+        clone.species_ids = self.species_ids
+        clone.species_index = self.species_index
+        clone.match_mode = self.match_mode
+        clone.species_source = self.species_source
+        clone._species_digest = self._species_digest
+        clone._taxon_search = self._taxon_search
+        if self.match_mode == "fuzzy":
+            clone._fuzzy = self._fuzzy or self.build_fuzzy_matcher()
+        else:
+            clone._matcher = self._matcher or self.build_matcher()
+        return clone
+
+    def build_matcher(self) -> AhoCorasickMatcher:
+        """基于 match_lookup 编译 Aho-Corasick 自动机，加载完物种后调用一次即可"""
+        with METRICS.timer("bird_matcher_build_seconds", kind="exact"):
+            languages = self.key_languages
+            self._matcher = AhoCorasickMatcher(
+                (key, (species_id, languages.get(key))) for key, species_id in self.match_lookup.items()
+            ).build()
+        return self._matcher
+
+    def build_fuzzy_matcher(self) -> FuzzyNameMatcher:
+        """基于 match_lookup 与学名编译容错匹配器"""
+        with METRICS.timer("bird_matcher_build_seconds", kind="fuzzy"):
+            self._fuzzy = FuzzyNameMatcher(
+                self.match_lookup.items(),
+                ((s.scientific_name, s.id) for s in self.species_map.values()),
+                languages=self.key_languages,
+            )
+        return self._fuzzy
 
     def match_file(self, file_name: str) -> Optional[str]:
-        """根据文件名返回匹配的物种 ID"""
-        # 简单示例：检查文件名中是否包含任何已知的中文名或学名
-        # 实际开发中可以使用更高效的 Aho-Corasick 算法进行批量字符串匹配
+        """根据文件名返回匹配的物种 ID
+
+        单次遍历文件名，命中多个关键字时取最长者 ("小白鹭" 优先于 "白鹭")；
+        fuzzy 模式下还能识别分隔符不同或有拼写错误的学名
+        """
+        if self.match_mode == "fuzzy":
+            return self.match_file_tagged(file_name)[0]
+        matcher = self._matcher
+        if matcher is None:
+            with self._lock:
+                matcher = self._matcher or self.build_matcher()
+        hit = matcher.search(file_name.lower())
+        return hit[0] if hit else None
+
+    def match_file_scored(self, file_name: str) -> Tuple[Optional[str], float]:
+        """返回 (物种 ID, 置信度)；exact 模式下命中即为 1.0"""
+        species_id, _, score = self.match_file_tagged(file_name)
+        return species_id, score
+
+    def match_file_tagged(self, file_name: str) -> Tuple[Optional[str], Optional[str], float]:
+        """返回 (物种 ID, 命中名称的语言标签, 置信度)；未命中时为 (None, None, 0.0)"""
+        return self._tagged_matcher()(file_name)
+
+    def _tagged_matcher(self) -> Callable[[str], Tuple[Optional[str], Optional[str], float]]:
+        """当前匹配模式下的 match_file_tagged 实现，匹配器未编译时先编译"""
+        if self.match_mode == "fuzzy":
+            fuzzy = self._fuzzy
+            if fuzzy is None:
+                with self._lock:
+                    fuzzy = self._fuzzy or self.build_fuzzy_matcher()
+            return fuzzy.match_tagged
+        matcher = self._matcher
+        if matcher is None:
+            with self._lock:
+                matcher = self._matcher or self.build_matcher()
+        search = matcher.search
+
+        def match_tagged(file_name: str) -> Tuple[Optional[str], Optional[str], float]:
+            hit = search(file_name.lower())
+            return (hit[0], hit[1], 1.0) if hit else (None, None, 0.0)
+        return match_tagged
+
+    def match_fingerprint(self) -> str:
+        """匹配配置的指纹：匹配模式、登记名称的语言 (按登记顺序，决定同名冲突) 与物种表来源
+
+        持久化索引保存匹配结果时记下该指纹，不一致时重新匹配 (见 PhotoIndexStore.sync_matches)。
+        未设置 species_source 时以 match_lookup 的摘要代替。
+        """
+        source = self.species_source
+        if source is None:
+            if self._species_digest is None:
+                digest = hashlib.sha1()
+                for key, species_id in sorted(self.match_lookup.items()):
+                    digest.update(f"{key}\t{species_id}\n".encode("utf-8"))
+                self._species_digest = digest.hexdigest()
+            source = self._species_digest
+        config = json.dumps([self.match_mode, self.languages, source], ensure_ascii=False)
+        return hashlib.sha1(config.encode("utf-8")).hexdigest()[:16]
+
+    def classify_files(self, names: Iterable[str]) -> List[Classification]:
+        """批量分类文件名或路径，只读物种数据，不登记照片也不修改分类树
+
+        与扫描一致，只按文件名 (路径最后一段) 匹配。整批只取一次匹配器，
+        同一批中重复的文件名只匹配一次。
+        """
+        match = self._tagged_matcher()
+        species_map = self.species_map
+        cache: Dict[str, Classification] = {}
+        results: List[Classification] = []
+        for name in names:
+            file_name = os.path.basename(name.replace("\\", "/"))
+            hit = cache.get(file_name)
+            if hit is None:
+                species_id, language, confidence = match(file_name)
+                hit = cache[file_name] = Classification(
+                    file_name, species_map.get(species_id) if species_id else None, language, confidence
+                )
+            results.append(hit if hit.name == name else
+                           Classification(name, hit.species, hit.language, hit.confidence))
+        return results
+
+    def _match_file_linear(self, file_name: str) -> Optional[str]:
+        """逐个关键字做子串判断的旧实现，仅保留用于基准对比"""
         fn_lower = file_name.lower()
         for key, species_id in self.match_lookup.items():
             if key in fn_lower:
                 return species_id
         return None
 
+    @property
+    def all_photos(self) -> List[PhotoIndex]:
+        """所有照片索引列表 (按目录生成)"""
+        return list(self.iter_photos())
+
+    @property
+    def photo_count(self) -> int:
+        return self.tree_root.photo_count
+
+    @property
+    def duplicate_count(self) -> int:
+        return len(self._duplicate_of)
+
+    def iter_photos(self) -> Iterator[PhotoIndex]:
+        """逐个生成照片索引，不一次性构造整个列表"""
+        species_ids = self.species_ids
+        for d, files in list(self._files.items()):
+            directory = self.dirs[d]
+            for name, species in list(files.items()):
+                yield PhotoIndex(name, os.path.join(directory, name), species_ids[species])
+
+    def iter_directories(self) -> Iterator[Tuple[str, List[str]]]:
+        """逐个生成 (目录路径, 该目录下已登记的文件名列表)"""
+        for d, files in list(self._files.items()):
+            yield self.dirs[d], list(files)
+
+    def directory_names(self, directory: str) -> List[str]:
+        d = self.dir_ids.get(directory)
+        files = self._files.get(d) if d is not None else None
+        return list(files) if files else []
+
+    def has_photo(self, absolute_path: str) -> bool:
+        directory, name = os.path.split(absolute_path)
+        d = self.dir_ids.get(directory)
+        return d is not None and name in self._files.get(d, ())
+
+    def get_photo(self, absolute_path: str) -> Optional[PhotoIndex]:
+        directory, name = os.path.split(absolute_path)
+        d = self.dir_ids.get(directory)
+        species = self._files.get(d, {}).get(name) if d is not None else None
+        if species is None:
+            return None
+        return PhotoIndex(name, absolute_path, self.species_ids[species])
+
     def add_photo(self, photo: PhotoIndex):
-        """注册照片索引"""
-        self.all_photos.append(photo)
-        # 递归更新分类树节点
-        self._update_tree(photo)
+        """注册照片索引，同一路径重复注册时替换旧记录"""
+        with self._lock:
+            self._attach_photo(photo)
+
+    def add_photos(self, photos: Iterable[PhotoIndex]):
+        """批量注册照片索引，整批只加一次锁"""
+        with self._lock:
+            for photo in photos:
+                self._attach_photo(photo)
+
+    def merge_photos(self, other: "DataRegistry", exclude_roots: Iterable[str] = ()):
+        """按目录批量复制 other 中的照片，跳过 exclude_roots 下的目录
+
+        other 必须与本注册中心共享物种表 (clone_species 所得)，物种序号可直接沿用。
+        """
+        prefixes = tuple(os.path.join(root, "") for root in exclude_roots)
+        with self._lock, other._lock:
+            for d, files in other._files.items():
+                directory = other.dirs[d]
+                if prefixes and os.path.join(directory, "").startswith(prefixes):
+                    continue
+                target = self._dir_id(directory)
+                for name, species in files.items():
+                    self._attach(target, name, species)
+
+    def remove_photo(self, absolute_path: str) -> Optional[PhotoIndex]:
+        """按路径注销照片索引并从分类树摘除，返回被移除的记录"""
+        with self._lock:
+            return self._detach(absolute_path)
+
+    def remove_photos(self, paths: List[str]) -> int:
+        """批量注销照片索引，返回实际移除的数量；每个物种节点只过滤一遍"""
+        with self._lock:
+            pending: Dict[int, Set[Tuple[int, str]]] = {}
+            removed = sum(self._detach(path, pending) is not None for path in paths)
+            for species, keys in pending.items():
+                nodes = self._species_path(self.species_map[self.species_ids[species]], create=False)
+                if nodes and nodes[-1].photos is not None:
+                    count = nodes[-1].photos.remove_many(keys)
+                    for node in nodes:
+                        node.photo_count -= count
+            return removed
 
-    def _update_tree(self, photo: PhotoIndex):
-        """将照片挂载到分类树节点"""
-        species = self.species_map[photo.matched_species_id]
+    def set_duplicates(self, groups: Iterable[List[str]]) -> int:
+        """登记内容相同的照片组 (替换之前的登记)，返回被折叠的副本数量
 
-        # 获取路径
-        path = [
-            ("Order", species.order),
-            ("Family", species.family),
-            ("Genus", species.genus),
+        每组中未注册的路径被忽略；按路径排序后第一张为保留的照片，其余为副本，
+        副本仍可在物种节点下列出，但不计入分类树各级节点的 photo_count。
+        """
+        with self._lock:
+            for path in self._duplicate_of:
+                self._count(path, 1)
+            self._duplicate_of.clear()
+            self._copies.clear()
+            for group in groups:
+                present = sorted(path for path in set(group) if self.has_photo(path))
+                if len(present) < 2:
+                    continue
+                kept, copies = present[0], present[1:]
+                for path in copies:
+                    self._count(path, -1)
+                    self._duplicate_of[path] = kept
+                self._copies[kept] = copies
+            return len(self._duplicate_of)
+
+    def duplicate_groups(self) -> List[List[str]]:
+        """当前的重复照片组，每组第一项为保留 (计数) 的照片"""
+        with self._lock:
+            return [[kept] + copies for kept, copies in self._copies.items()]
+
+    def duplicate_of(self, absolute_path: str) -> Optional[str]:
+        """副本对应的保留照片路径；保留的照片与未登记重复的照片为 None"""
+        return self._duplicate_of.get(absolute_path)
+
+    def build_search_index(self) -> PhotoSearchIndex:
+        """为当前所有照片建立路径搜索索引 (替换已有索引)，之后新登记的照片增量加入"""
+        with METRICS.timer("bird_search_index_build_seconds"), self._lock:
+            index = PhotoSearchIndex()
+            for directory, names in self.iter_directories():
+                index.add(directory, names)
+            self.search_index = index
+        return index
+
+    def search(self, query: str, kinds: Iterable[str] = SEARCH_KINDS,
+               offset: int = 0, limit: int = 50) -> Tuple[int, bool, List[SearchHit]]:
+        """搜索分类阶元、目录与照片路径，返回 (命中总数, 是否完整, 当前页)
+
+        查询按 tokenize 切分，每个词都须是名称或路径的子串 (中文与拉丁字母相同，
+        不区分大小写)。结果依次为分类阶元、目录、照片，各自按匹配等级排序：
+        - 分类阶元：名称完全相同 > 前缀 > 单词前缀 > 子串 > 各词分别命中，同级按照片数量；
+        - 目录：目录名以首个词开头的在前，其余按路径；
+        - 照片：文件名以首个词开头 (0) > 文件名包含全部词 (1) > 部分词只出现在目录路径中 (2)，
+          同级按路径。
+        分类阶元与照片各自最多收集 MAX_TAXON_HITS / MAX_PHOTO_HITS 个，超出时结果不完整，
+        总数只计已收集的部分。
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return 0, True, []
+        kinds = set(kinds)
+        sections = []
+        complete = True
+        if "taxon" in kinds:
+            taxa, complete = self._search_taxa(query)
+            sections.append((taxa, self._taxon_hit))
+        if kinds & {"directory", "photo"}:
+            index = self.search_index
+            if index is None:
+                with self._lock:
+                    index = self.search_index or self.build_search_index()
+            name_dirs, path_dirs, dir_matches = index.lookup(tokens)
+            if "directory" in kinds:
+                sections.append((self._search_directories(tokens, dir_matches), self._directory_hit))
+            if "photo" in kinds:
+                photos, photos_complete = self._search_photos(index, tokens, name_dirs, path_dirs)
+                complete = complete and photos_complete
+                sections.append((photos, self._photo_hit))
+
+        page: List[SearchHit] = []
+        for items, to_hit in sections:
+            if len(page) < limit and offset < len(items):
+                page.extend(to_hit(item) for item in items[offset:offset + limit - len(page)])
+            offset = max(0, offset - len(items))
+        return sum(len(items) for items, _ in sections), complete, page
+
+    def _search_taxa(self, query: str) -> Tuple[List[tuple], bool]:
+        """([(等级, -照片数, 级别顺序, 名称, 文档序号)] 已排序, 是否完整)"""
+        taxon_search = self._taxon_search
+        if taxon_search is None:
+            with self._lock:
+                taxon_search = self._taxon_search or self._build_taxon_search()
+        index, taxa = taxon_search
+        node_by_id = self.node_by_id
+        items = []
+        tiers, complete = index.search(query)
+        for doc, tier in tiers.items():
+            rank, name, node_id, _ = taxa[doc]
+            node = node_by_id.get(node_id)
+            items.append((tier, -(node.photo_count if node else 0), RANK_ORDER[rank], name, doc))
+        items.sort()
+        return items, complete
+
+    def _build_taxon_search(self) -> Tuple[NameSearchIndex, List[Tuple[str, str, str, Optional[str]]]]:
+        """以目/科/属/种节点为文档建立名称索引；种的名称包括中文名、学名与各语言名称"""
+        names_by_species: Dict[str, List[str]] = {}
+        for key, species_id in self.match_lookup.items():
+            names_by_species.setdefault(species_id, []).append(key)
+        taxa: Dict[str, Tuple[str, str, str, Optional[str]]] = {}
+        docs: Dict[str, List[str]] = {}
+        for species in self.species_map.values():
+            path = []
+            for rank, name in taxonomy_path(species):
+                path.append(name)
+                node_id = taxon_node_id(path)
+                if node_id not in taxa:
+                    taxa[node_id] = (rank, name, node_id, None)
+                    docs[node_id] = [name]
+            # 循环结束时 node_id 为种节点
+            taxa[node_id] = ("species", path[-1], node_id, species.id)
+            docs[node_id] = [species.chinese_name, species.scientific_name] + names_by_species.get(species.id, [])
+        self._taxon_search = NameSearchIndex(docs.values()), list(taxa.values())
+        return self._taxon_search
+
+    def _search_directories(self, tokens: List[str], directories: List[str]) -> List[Tuple[int, str]]:
+        """[(等级, 目录路径)]，只保留仍有照片的目录"""
+        first = tokens[0]
+        # 首个词不含分隔符，目录名去掉开头的分隔符后比较即可，不必完整分词
+        items = [
+            (0 if directory.rpartition(os.sep)[2].lower().lstrip(SEPARATORS).startswith(first) else 1, directory)
+            for directory in directories if self._files.get(self.dir_ids.get(directory, -1))
         ]
+        items.sort()
+        return items
+
+    def _search_photos(self, index: PhotoSearchIndex, tokens: List[str], name_dirs: List[str],
+                       path_dirs: List[str]) -> Tuple[List[Tuple[int, str, str]], bool]:
+        """在候选目录中核对文件名，返回 ([(等级, 目录路径, 文件名)], 是否完整)
+
+        索引不随删除更新，命中的文件名须仍在本注册中心中。
+        """
+        first = tokens[0]
+        hits = []
+        for directory in name_dirs:
+            files = self._files.get(self.dir_ids.get(directory, -1), ())
+            for name, low in index.matching_names(directory, tokens):
+                if name not in files:
+                    continue
+                hits.append((0 if low.startswith(first) else 1, directory, name))
+                if len(hits) >= MAX_PHOTO_HITS:
+                    hits.sort()
+                    return hits, False
+        for directory in path_dirs:
+            low_dir = directory.lower()
+            # 目录路径中没有的词须出现在文件名中；全部词都在文件名中的已在上一轮计入
+            needed = [t for t in tokens if t not in low_dir]
+            files = self._files.get(self.dir_ids.get(directory, -1), ())
+            for name, low in index.matching_names(directory, needed):
+                if name in files and not all(t in low for t in tokens):
+                    hits.append((2, directory, name))
+                    if len(hits) >= MAX_PHOTO_HITS:
+                        hits.sort()
+                        return hits, False
+        hits.sort()
+        return hits, True
 
+    def _taxon_hit(self, item: tuple) -> SearchHit:
+        tier, count, _, name, doc = item
+        rank, _, node_id, species_id = self._taxon_search[1][doc]
+        return SearchHit("taxon", name, tier, rank=rank, node_id=node_id, species_id=species_id, photo_count=-count)
+
+    def _directory_hit(self, item: Tuple[int, str]) -> SearchHit:
+        tier, directory = item
+        return SearchHit("directory", directory, tier, path=directory,
+                         photo_count=len(self.directory_names(directory)))
+
+    def _photo_hit(self, item: Tuple[int, str, str]) -> SearchHit:
+        tier, directory, name = item
+        path = os.path.join(directory, name)
+        photo = self.get_photo(path)
+        return SearchHit("photo", name, tier, path=path,
+                         species_id=photo.matched_species_id if photo else None)
+
+    def _count(self, absolute_path: str, delta: int):
+        """沿已注册照片的分类路径调整子树计数，调用方需持有 _lock"""
+        directory, name = os.path.split(absolute_path)
+        d = self.dir_ids.get(directory)
+        species = self._files.get(d, {}).get(name) if d is not None else None
+        if species is None:
+            return
+        for node in self._species_path(self.species_map[self.species_ids[species]], create=False) or ():
+            node.photo_count += delta
+
+    def _release_duplicate(self, absolute_path: str):
+        """照片即将摘除时解除其重复登记，调用方需持有 _lock"""
+        kept = self._duplicate_of.pop(absolute_path, None)
+        if kept is not None:
+            # 恢复副本的计数，随后由 _detach 按普通照片摘除
+            self._count(absolute_path, 1)
+            copies = self._copies[kept]
+            copies.remove(absolute_path)
+            if not copies:
+                del self._copies[kept]
+        copies = self._copies.pop(absolute_path, None)
+        if copies:
+            # 保留的照片被移除：由第一个副本接替计数
+            successor, rest = copies[0], copies[1:]
+            del self._duplicate_of[successor]
+            self._count(successor, 1)
+            for path in rest:
+                self._duplicate_of[path] = successor
+            if rest:
+                self._copies[successor] = rest
+
+    def _dir_id(self, directory: str) -> int:
+        """目录路径 -> 目录序号，首次出现时登记"""
+        d = self.dir_ids.get(directory)
+        if d is None:
+            d = self.dir_ids[directory] = len(self.dirs)
+            self.dirs.append(directory)
+        return d
+
+    def _attach_photo(self, photo: PhotoIndex):
+        """调用方需持有 _lock"""
+        directory, name = os.path.split(photo.absolute_path)
+        self._attach(self._dir_id(directory), name, self.species_index[photo.matched_species_id])
+
+    def _attach(self, d: int, name: str, species: int):
+        """登记照片并挂载到分类树，调用方需持有 _lock"""
+        files = self._files.get(d)
+        old = files.get(name) if files else None
+        if old is not None:
+            # 重复扫描同一文件：匹配结果一致则不做任何变更
+            if old == species:
+                return
+            self._detach(os.path.join(self.dirs[d], name))
+        self._files.setdefault(d, {})[name] = species
+        # 递归更新分类树节点
+        self._update_tree(d, name, species)
+        if old is None and self.search_index is not None:
+            self.search_index.add(self.dirs[d], [name])
+
+    def _detach(self, absolute_path: str,
+                pending: Optional[Dict[int, Set[Tuple[int, str]]]] = None) -> Optional[PhotoIndex]:
+        """注销路径并从物种节点摘除，调用方需持有 _lock
+
+        传入 pending 时只注销，按物种序号收集 (目录序号, 文件名)，由调用方批量从节点摘除并递减计数。
+        """
+        if self._duplicate_of:
+            self._release_duplicate(absolute_path)
+        directory, name = os.path.split(absolute_path)
+        d = self.dir_ids.get(directory)
+        files = self._files.get(d) if d is not None else None
+        species = files.pop(name, None) if files else None
+        if species is None:
+            return None
+        if not files:
+            del self._files[d]
+        species_id = self.species_ids[species]
+        if pending is not None:
+            pending.setdefault(species, set()).add((d, name))
+            return PhotoIndex(name, absolute_path, species_id)
+        nodes = self._species_path(self.species_map[species_id], create=False)
+        if nodes and nodes[-1].photos is not None and nodes[-1].photos.remove(d, name):
+            # 沿路径递减子树计数
+            for node in nodes:
+                node.photo_count -= 1
+        return PhotoIndex(name, absolute_path, species_id)
+
+    def _species_path(self, species: BirdSpecies, create: bool = True) -> Optional[List[TaxonNode]]:
+        """沿 目 -> 科 -> 属 -> 种 返回从根到物种节点的路径，create 为 False 时不存在则返回 None"""
         # 递归挂载到树节点
         node = self.tree_root
-        for rank, name in path:
+        nodes = [node]
+        names = []
+        for rank, name in taxonomy_path(species):
+            names.append(name)
             if name not in node.children:
-                node.children[name] = TaxonNode(rank=rank, name=name)
+                if not create:
+                    return None
+                child = TaxonNode(rank=rank, name=name, node_id=taxon_node_id(names))
+                self.node_by_id[child.node_id] = child
+                node.children[name] = child
             node = node.children[name]
-        # 此时已抵达最深处的 Genus 节点
-        species_key = f"{species.chinese_name} {species.scientific_name}"
-        # 如果发现该种还未挂载到 Genus 节点下，创建一个新节点
-        if species_key not in node.children:
-            node.children[species_key] = TaxonNode(rank="species", name=species_key)
-        # 最后再移动到种节点
-        node = node.children[species_key]
-
+            nodes.append(node)
+        return nodes
 
-        # 挂载到最末端的 Genus 节点
-        node.photo_indices.append(photo)
+    def _update_tree(self, d: int, name: str, species: int):
+        """将照片挂载到分类树节点，并沿路径递增子树计数"""
+        nodes = self._species_path(self.species_map[self.species_ids[species]])
+        # 挂载到最末端的种节点
+        leaf = nodes[-1]
+        if leaf.photos is None:
+            leaf.photos = PhotoColumns(self.dirs, self._lock)
+        leaf.photos.append(d, name)
+        for node in nodes:
+            node.photo_count += 1
 
     def show_tree(self):
         """info级, 递归打印分类树"""
@@ -156,11 +881,7 @@ class DataRegistry:
     def show_photos(self, node: TaxonNode, indent: str = ""):
         """info级, 递归打印节点照片"""
         print(f"{indent}{node.rank} {node.name} (Photos: {node.total_photos})")
-        for photo in node.photo_indices:
-            if photo.matched_species_id and photo.matched_species_id in self.species_map:
-                species = self.species_map[photo.matched_species_id]
-                print(f"{indent}  {photo.file_name} -> {species.chinese_name} ({species.scientific_name})")
-            else:
-                print(f"{indent}  {photo.file_name} -> {photo.matched_species_id}")
+        for name, _ in node.photos.page() if node.photos is not None else []:
+            print(f"{indent}  {name} -> {node.name}")
         for child in node.children.values():
             self.show_photos(child, indent + "  ")
\ No newline at end of file
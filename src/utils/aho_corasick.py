@@ -0,0 +1,86 @@
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 关键字命中后返回的值：(物种 ID, 关键字的语言标签)
+Hit = Tuple[str, Optional[str]]
+
+
+class AhoCorasickMatcher:
+    """多模式字符串匹配自动机 (Aho-Corasick)
+
+    一次遍历文件名即可找出所有命中的关键字，代替逐个关键字做子串判断。
+
+    匹配策略 (确定性，与字典插入顺序无关):
+        1. 最长关键字优先 ("小白鹭" 优先于 "白鹭")
+        2. 长度相同时取最靠左出现的关键字
+
+    成员变量:
+        _goto: List[Dict[str, int]]             # 状态转移表：状态 -> {字符: 下一状态}
+        _fail: List[int]                        # 失配指针
+        _best: List[Optional[Tuple[int, Hit]]]  # 每个状态可输出的最长关键字 (长度, 值)
+    """
+    def __init__(self, patterns: Iterable[Tuple[str, Hit]] = ()):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._best: List[Optional[Tuple[int, Hit]]] = [None]
+        self._built = False
+        for key, value in patterns:
+            self.add(key, value)
+
+    def __len__(self) -> int:
+        """状态数量 (含根节点)"""
+        return len(self._goto)
+
+    def add(self, key: str, value: Hit) -> None:
+        """插入关键字，value 为命中后返回的值 (物种 ID, 语言标签)"""
+        if not key:
+            return
+        state = 0
+        for ch in key:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._best.append(None)
+                self._goto[state][ch] = nxt
+            state = nxt
+        self._best[state] = (len(key), value)
+        self._built = False
+
+    def build(self) -> "AhoCorasickMatcher":
+        """广度优先计算失配指针，并把最长输出沿失配链向下传递"""
+        queue = deque(self._goto[0].values())
+        for state in queue:
+            self._fail[state] = 0
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                # 自身未终止时，以失配状态上的最长关键字作为输出
+                if self._best[nxt] is None:
+                    self._best[nxt] = self._best[self._fail[nxt]]
+        self._built = True
+        return self
+
+    def search(self, text: str) -> Optional[Hit]:
+        """扫描一遍 text，返回最长命中关键字对应的值，无命中时返回 None"""
+        if not self._built:
+            self.build()
+        goto, fail, best = self._goto, self._fail, self._best
+        state = 0
+        found: Optional[Tuple[int, Hit]] = None
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            hit = best[state]
+            # 严格大于：长度相同时保留更靠左的命中
+            if hit is not None and (found is None or hit[0] > found[0]):
+                found = hit
+        return found[1] if found else None
@@ -1,32 +1,110 @@
 import json
-from src.models.birds import TaxonNode
+from typing import Callable, List, Optional
+from src.models.birds import TaxonNode, Classification, SearchHit, taxonomy_path, taxon_node_id
 
 class DataConverter:
     @staticmethod
-    def to_el_tree_json(node: TaxonNode):
-        """递归将 TaxonNode 转换为 ElementTree 的数据结构"""
-        # 1. 基础信息：ID 和 label
+    def to_el_tree_node(node: TaxonNode) -> dict:
+        """单个节点的 el-tree 数据 (不含子节点与照片)"""
         count = node.total_photos
-        label = f"{node.name} ({count})"
-
-        # 构造当前节点的字典
-        # 使用节点名称和级别组合作为唯一标识，因为 TaxonNode 没有独立的 id 属性
-        item = {
-            "id": f"{node.rank}-{node.name.replace(' ', '_')}",
-            "label": label,
+        return {
+            "id": node.node_id,
+            "label": f"{node.name} ({count})",
             "rank": node.rank,
-            "photocount": count
+            "photocount": count,
+            # el-tree 懒加载模式用 isLeaf 判断是否还能展开
+            "isLeaf": not node.children,
         }
 
+    @staticmethod
+    def to_el_tree_json(node: TaxonNode):
+        """递归将 TaxonNode 转换为 ElementTree 的数据结构
+
+        total_photos 为缓存计数 (O(1))，整棵树只需一次线性遍历
+        """
+        # 1. 基础信息：ID 和 label
+        item = DataConverter.to_el_tree_node(node)
+
         # 2. 如果到了种级别，附带文件路径方便前端查询
         if node.rank == "species":
             item["photo"] = [
-                {"name":p.file_name, "path":p.absolute_path} for p in node.photo_indices
+                {"name": name, "path": path} for name, path in (node.photos.page() if node.photos else [])
             ]
 
         if node.children:
             item["children"] = [
-                DataConverter.to_el_tree_json(child) for child in node.children.values() if child.total_photos > 0
+                DataConverter.to_el_tree_json(child) for child in list(node.children.values()) if child.total_photos > 0
             ]
-        
-        return item
\ No newline at end of file
+
+        return item
+
+    @staticmethod
+    def to_el_tree_children(node: TaxonNode) -> List[dict]:
+        """懒加载：只返回有照片的直接子节点"""
+        return [
+            DataConverter.to_el_tree_node(child)
+            for child in list(node.children.values()) if child.total_photos > 0
+        ]
+
+    @staticmethod
+    def to_photo_page(node: TaxonNode, offset: int, limit: int,
+                      duplicate_of: Optional[Callable[[str], Optional[str]]] = None) -> dict:
+        """分页返回节点直接关联的照片
+
+        total 是可分页列出的照片数，包含重复副本；photocount 与分类树一致，不含副本。
+        duplicate_of 给出副本对应的保留照片路径，结果中非副本为 None。
+        """
+        photos = node.photos.page(offset, limit) if node.photos else []
+        return {
+            "id": node.node_id,
+            "total": node.direct_photos,
+            "photocount": node.total_photos,
+            "offset": offset,
+            "limit": limit,
+            "items": [
+                {"name": name, "path": path, "duplicate_of": duplicate_of(path) if duplicate_of else None}
+                for name, path in photos
+            ],
+        }
+
+    @staticmethod
+    def to_classifications(results: List[Classification]) -> List[dict]:
+        """批量分类结果：物种 ID、分类路径 (目/科/属/种)、对应分类树节点 ID 与置信度
+
+        同一物种的分类路径与节点 ID 在一批中只计算一次。
+        """
+        taxa = {}
+        items = []
+        for result in results:
+            species = result.species
+            if species is None:
+                items.append({"name": result.name, "species_id": None, "confidence": 0.0})
+                continue
+            taxon = taxa.get(species.id)
+            if taxon is None:
+                path = [name for _, name in taxonomy_path(species)]
+                taxon = taxa[species.id] = {
+                    "species_id": species.id,
+                    "chinese_name": species.chinese_name,
+                    "taxonomy": path,
+                    "node_id": taxon_node_id(path),
+                }
+            items.append({"name": result.name, **taxon, "language": result.language, "confidence": result.confidence})
+        return items
+
+    @staticmethod
+    def to_search_hits(hits: List[SearchHit]) -> List[dict]:
+        """搜索结果：各类别字段相同，不适用的字段为 None"""
+        return [
+            {
+                "kind": hit.kind,
+                "name": hit.name,
+                "rank": hit.rank,
+                "node_id": hit.node_id,
+                "path": hit.path,
+                "species_id": hit.species_id,
+                "photo_count": hit.photo_count,
+                "tier": hit.tier,
+            }
+            for hit in hits
+        ]
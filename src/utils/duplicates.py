@@ -0,0 +1,122 @@
+import hashlib
+import mmap
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+from src.utils.metrics import METRICS
+
+# 快速哈希读取的首尾块大小 (字节)；不超过两块的文件快速哈希即完整哈希
+EDGE_CHUNK_SIZE = 64 * 1024
+
+# (路径, 字节数, 快速哈希, 完整哈希)，哈希未知时为 None (如 PhotoIndexStore.duplicate_candidates 的结果)
+Candidate = Tuple[str, int, Optional[bytes], Optional[bytes]]
+
+
+def _digest(data) -> bytes:
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def edge_hash(path: str, size: int, chunk_size: int = EDGE_CHUNK_SIZE) -> bytes:
+    """只读取首尾各 chunk_size 字节的快速哈希 (mmap 读取)；文件大小已变化时抛出 OSError"""
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if len(mm) != size:
+            raise OSError(f"File changed since it was indexed: {path}")
+        if size <= 2 * chunk_size:
+            return _digest(mm)
+        h = hashlib.blake2b(digest_size=16)
+        h.update(mm[:chunk_size])
+        h.update(mm[size - chunk_size:])
+        return h.digest()
+
+
+def content_hash(path: str) -> bytes:
+    """完整内容哈希；直接对 mmap 求哈希，不复制文件内容 (hashlib 计算时释放 GIL)"""
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return _digest(mm)
+
+
+class DuplicateFinder:
+    """内容相同的照片查找 (逐级筛选，尽量少读文件)
+
+        1. 按字节数分组，大小唯一的文件不可能重复，不读取
+        2. 同大小的文件只读首尾块求快速哈希
+        3. 快速哈希也相同时才读取整个文件求完整哈希，完整哈希相同即为重复
+
+    已知的哈希 (如持久化索引中文件未变化时保存的结果) 直接沿用，重复扫描几乎不产生 I/O；
+    新计算的哈希记录在 computed 中，供调用方写回。哈希在线程池中计算。
+
+    成员变量:
+        workers: int                            # 哈希线程数
+        computed: List[Tuple[bytes, Optional[bytes], str]]  # 本次新计算的 (快速哈希, 完整哈希, 路径)
+        stats: Dict[str, int]                   # candidates / edge_hashed / full_hashed / bytes_read / groups
+
+    方法:
+        find(candidates)                        # 返回重复组 [[路径, ...]]
+    """
+    def __init__(self, workers: int = 4, chunk_size: int = EDGE_CHUNK_SIZE):
+        self.workers = max(1, workers)
+        self.chunk_size = chunk_size
+        self.computed: List[Tuple[bytes, Optional[bytes], str]] = []
+        self._changed: Dict[str, list] = {}
+        self.stats = {"candidates": 0, "edge_hashed": 0, "full_hashed": 0, "bytes_read": 0, "groups": 0}
+
+    def find(self, candidates: Iterable[Candidate]) -> List[List[str]]:
+        started = time.perf_counter()
+        by_size: Dict[int, List[list]] = defaultdict(list)
+        for path, size, edge, full in candidates:
+            # 空文件不参与
+            if size > 0:
+                by_size[size].append([path, size, edge, full])
+        rows = [row for group in by_size.values() if len(group) > 1 for row in group]
+        self.stats["candidates"] = len(rows)
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="dedupe") as pool:
+            self._fill(pool, [row for row in rows if row[2] is None], 2)
+            by_edge: Dict[Tuple[int, bytes], List[list]] = defaultdict(list)
+            for row in rows:
+                if row[2] is not None:
+                    by_edge[(row[1], row[2])].append(row)
+            rows = [row for group in by_edge.values() if len(group) > 1 for row in group]
+            for row in rows:
+                # 小文件的快速哈希已覆盖全部内容
+                if row[3] is None and row[1] <= 2 * self.chunk_size:
+                    row[3] = row[2]
+                    self._changed[row[0]] = row
+            self._fill(pool, [row for row in rows if row[3] is None], 3)
+
+        by_full: Dict[bytes, List[str]] = defaultdict(list)
+        for path, _, _, full in rows:
+            if full is not None:
+                by_full[full].append(path)
+        groups = [sorted(paths) for paths in by_full.values() if len(paths) > 1]
+        self.stats["groups"] = len(groups)
+        self.computed = [(row[2], row[3], path) for path, row in self._changed.items()]
+        METRICS.inc("bird_dedupe_bytes_read_total", self.stats["bytes_read"])
+        METRICS.observe("bird_dedupe_seconds", time.perf_counter() - started)
+        return groups
+
+    def _fill(self, pool: ThreadPoolExecutor, rows: List[list], column: int):
+        """为 rows 计算快速哈希 (column=2) 或完整哈希 (column=3)，读取失败的文件保持 None"""
+        if not rows:
+            return
+        if column == 2:
+            work = lambda row: edge_hash(row[0], row[1], self.chunk_size)
+            self.stats["bytes_read"] += sum(min(row[1], 2 * self.chunk_size) for row in rows)
+            self.stats["edge_hashed"] += len(rows)
+        else:
+            work = lambda row: content_hash(row[0])
+            self.stats["bytes_read"] += sum(row[1] for row in rows)
+            self.stats["full_hashed"] += len(rows)
+
+        def safe(row):
+            try:
+                return work(row)
+            except (OSError, ValueError):
+                # 文件已删除或被截断 (mmap 空文件抛出 ValueError)
+                return None
+
+        for row, digest in zip(rows, pool.map(safe, rows)):
+            row[column] = digest
+            if digest is not None:
+                self._changed[row[0]] = row
@@ -0,0 +1,173 @@
+import os
+import stat
+from email.utils import formatdate, parsedate_to_datetime
+from mimetypes import guess_type
+from typing import Mapping, Optional, Tuple
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+# 无零拷贝扩展时逐块读取的块大小
+CHUNK_SIZE = 256 * 1024
+
+
+class RangeNotSatisfiable(ValueError):
+    """Range 起点超出文件大小"""
+
+
+def file_etag(stat_result: os.stat_result) -> str:
+    """由 mtime 与 size 生成强 ETag，原图被编辑后随之变化"""
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
+def is_not_modified(headers: Headers, etag: str, mtime: float) -> bool:
+    """按 RFC 9110 判断条件请求：If-None-Match 优先，其次 If-Modified-Since"""
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or etag in tags
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def parse_range(value: str, size: int) -> Optional[Tuple[int, int]]:
+    """解析单个字节区间，返回闭区间 (start, end)
+
+    格式错误或多区间请求返回 None (按 RFC 忽略 Range，返回整个文件)；
+    起点超出文件大小时抛出 RangeNotSatisfiable。
+    """
+    unit, _, spec = value.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+    first, last = first.strip(), last.strip()
+    if not (first or last) or not all(part.isdigit() for part in (first, last) if part):
+        return None
+    if first:
+        start = int(first)
+        if start >= size:
+            raise RangeNotSatisfiable(value)
+        end = int(last) if last else size - 1
+        if end < start:
+            return None
+    else:
+        # 后缀区间 "-N"：最后 N 个字节
+        suffix = int(last)
+        if suffix == 0:
+            raise RangeNotSatisfiable(value)
+        start, end = max(size - suffix, 0), size - 1
+    return start, min(end, size - 1)
+
+
+class ConditionalFileResponse(Response):
+    """支持 ETag/Last-Modified/304 与单区间 Range 的文件响应
+
+    与 starlette.FileResponse 相比 (当前依赖的版本两者都不支持)：
+    - 客户端携带的 ETag 或修改时间未变化时返回 304，不发送任何正文；
+    - Range 请求返回 206 (不满足时 416)，浏览器可以只取所需部分；
+    - 服务器提供 ASGI http.response.zerocopysend 扩展时交给 sendfile 发送，
+      其次使用 http.response.pathsend (仅整文件)，都不支持时在线程池中分块读取，
+      客户端断开后立即停止读取。
+
+    成员变量:
+        path: str                               # 文件路径
+        stat_result: Optional[os.stat_result]   # 已有的 stat 结果，缺省在发送前 stat
+    """
+    chunk_size = CHUNK_SIZE
+
+    def __init__(self, path: str, media_type: Optional[str] = None,
+                 headers: Optional[Mapping[str, str]] = None,
+                 stat_result: Optional[os.stat_result] = None):
+        self.path = str(path)
+        self.status_code = 200
+        self.media_type = media_type or guess_type(self.path)[0] or "application/octet-stream"
+        self.background = None
+        self.stat_result = stat_result
+        self.init_headers(headers)
+        self.headers.setdefault("accept-ranges", "bytes")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        stat_result = self.stat_result or await anyio.to_thread.run_sync(os.stat, self.path)
+        if not stat.S_ISREG(stat_result.st_mode):
+            raise RuntimeError(f"File at path {self.path} is not a file.")
+        size = stat_result.st_size
+        etag = file_etag(stat_result)
+        self.headers["etag"] = etag
+        self.headers["last-modified"] = formatdate(stat_result.st_mtime, usegmt=True)
+
+        request_headers = Headers(scope=scope)
+        if is_not_modified(request_headers, etag, stat_result.st_mtime):
+            del self.headers["content-type"]
+            await self._send_empty(send, 304)
+            return
+
+        start, end = 0, size - 1
+        range_header = request_headers.get("range")
+        if_range = request_headers.get("if-range")
+        if range_header and size and (if_range is None or if_range.strip() == etag):
+            try:
+                parsed = parse_range(range_header, size)
+            except RangeNotSatisfiable:
+                self.headers["content-range"] = f"bytes */{size}"
+                await self._send_empty(send, 416)
+                return
+            if parsed is not None:
+                start, end = parsed
+                self.status_code = 206
+                self.headers["content-range"] = f"bytes {start}-{end}/{size}"
+        count = end - start + 1
+        self.headers["content-length"] = str(count)
+
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"].upper() == "HEAD" or count <= 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        extensions = scope.get("extensions") or {}
+        if "http.response.zerocopysend" in extensions:
+            with open(self.path, "rb") as f:
+                await send({"type": "http.response.zerocopysend", "file": f,
+                            "offset": start, "count": count, "more_body": False})
+        elif "http.response.pathsend" in extensions and self.status_code == 200:
+            await send({"type": "http.response.pathsend", "path": os.path.abspath(self.path)})
+        else:
+            async with anyio.create_task_group() as task_group:
+                async def stream():
+                    await self._stream(send, start, count)
+                    task_group.cancel_scope.cancel()
+
+                task_group.start_soon(stream)
+                while (await receive())["type"] != "http.disconnect":
+                    pass
+                task_group.cancel_scope.cancel()
+
+    async def _send_empty(self, send: Send, status_code: int):
+        self.headers["content-length"] = "0"
+        await send({"type": "http.response.start", "status": status_code, "headers": self.raw_headers})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    async def _stream(self, send: Send, start: int, count: int):
+        f = await anyio.to_thread.run_sync(open, self.path, "rb")
+        try:
+            await anyio.to_thread.run_sync(f.seek, start)
+            remaining = count
+            while remaining > 0:
+                chunk = await anyio.to_thread.run_sync(f.read, min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                # 文件在发送过程中被截断：结束响应，客户端会看到长度不足
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            await anyio.to_thread.run_sync(f.close)
@@ -1,61 +1,299 @@
+import logging
 import os
+import threading
+import time
 from concurrent.futures import ThreadPoolExecutor
-from typing import List
+from typing import List, Optional
 from src.models.birds import DataRegistry, PhotoIndex
+from src.data.photo_store import PhotoIndexStore
+from src.utils.metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+# 支持的图片扩展名
+SUPPORTED_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.raw', '.arw', '.cr2', '.nef')
 
 class FileScanner:
-    def __init__(self, registry: DataRegistry):
+    def __init__(self, registry: DataRegistry, workers: int = 1, store: Optional[PhotoIndexStore] = None,
+                 progress_interval: float = 0.25):
         self.registry = registry
-        self.supported_extensions = ('.jpg', '.jpeg', '.png', '.raw', '.arw', '.cr2', '.nef')       # 支持的图片扩展名
+        self.supported_extensions = SUPPORTED_EXTENSIONS       # 支持的图片扩展名
         self.progress_callback = None
+        # 新注册照片的回调 (如缩略图预热)，参数为本批 PhotoIndex 列表
+        self.photo_callback = None
+        # 并发扫描的线程数，1 表示沿用单线程递归扫描
+        self.workers = max(1, workers)
+        # 持久化索引，设置后只处理新增、变化和已删除的文件
+        self.store = store
+        # 单次扫描期间的增量状态：上次索引的快照与本次见到的路径
+        self._snapshot = {}
+        self._seen = set()
+        # 本次扫描中无法列出的目录 (权限、网络盘掉线等)，其下的已索引文件不视为删除
+        self._unlisted: List[str] = []
+        # 进度按固定时间间隔上报 (秒)，而不是每个目录项都回调
+        self.progress_interval = progress_interval
+        # 单批匹配/注册的最大文件数
+        self.batch_size = 1000
+        self._progress_lock = threading.Lock()
+        self._totals = {"scanned": 0, "matched": 0}
+        self._last_report = 0.0
+        # 取消标志：置位后遍历在下一个目录处停止，且不做删除检测
+        self.cancelled = threading.Event()
 
     def set_progress_callback(self, callback):
-        """设置进度回调函数"""
+        """设置进度回调函数
+
+        回调参数为 (scanned, matched, current_dir)，计数为该扫描器自创建以来的累计值，
+        至多每 progress_interval 秒调用一次，每次 scan_directory 结束时再强制调用一次。
+        """
         self.progress_callback = callback
 
-    def scan_directory(self, root_path: str) -> tuple[int, int]:
+    def set_photo_callback(self, callback):
+        """设置新照片注册后的回调函数，在扫描线程中调用"""
+        self.photo_callback = callback
+
+    def cancel(self):
+        """请求取消扫描 (线程安全)"""
+        self.cancelled.set()
+
+    def scan_directory(self, root_path: str, workers: int = None) -> tuple[int, int]:
         """递归扫描目录，将符合条件的文件路径注册到 DataRegistry
-        
+
+        设置了 store 时为增量扫描：未变化的文件沿用已保存的匹配结果 (匹配配置变化时
+        先由 PhotoIndexStore.sync_matches 重新匹配)，磁盘上已不存在的文件从索引和分类树中移除。
+
+        参数：
+            workers: 并发线程数，缺省使用构造时的设置；大于 1 时启用并发扫描
+
         返回值：
             tuple[int, int]: (扫描的文件数量, 匹配的文件数量)
         """
-        # info 级别，上线 prd 前记得注释掉 print
-        print(f"Scanning directory: {root_path}")
-        
+        root_path = os.path.abspath(root_path)
+        workers = max(1, workers or self.workers)
+
+        if self.store:
+            self.store.sync_matches(self.registry)
+        self._snapshot = self.store.snapshot(root_path) if self.store else {}
+        self._seen = set()
+        self._unlisted = []
+
+        if workers > 1:
+            result = self._scan_parallel(root_path, workers)
+        else:
+            result = self._scan_serial(root_path)
+
+        if self.store and os.path.isdir(root_path) and not self.cancelled.is_set():
+            # 快照中有而本次未见到的文件即为已删除 (根目录不可访问时不做删除)；
+            # 未能列出的目录下的文件状态未知，保留索引记录与分类树中的照片
+            unlisted = tuple(os.path.join(path, "") for path in self._unlisted)
+            gone = [path for path in self._snapshot if path not in self._seen and not path.startswith(unlisted)]
+            if gone:
+                started = time.perf_counter()
+                self.registry.remove_photos(gone)
+                tree_done = time.perf_counter()
+                self.store.delete(gone)
+                self._record_phases(tree=tree_done - started, store=time.perf_counter() - tree_done)
+                logger.info("Removed %d deleted files under %s", len(gone), root_path)
+        self._snapshot, self._seen, self._unlisted = {}, set(), []
+        self._add_progress(0, 0, root_path, force=True)
+
+        return result
+
+    def _add_progress(self, scanned: int, matched: int, current_dir: str, force: bool = False):
+        """累加进度计数，距上次上报超过 progress_interval 时调用进度回调"""
+        with self._progress_lock:
+            self._totals["scanned"] += scanned
+            self._totals["matched"] += matched
+            now = time.monotonic()
+            if not force and now - self._last_report < self.progress_interval:
+                return
+            self._last_report = now
+            totals = (self._totals["scanned"], self._totals["matched"])
+        if self.progress_callback:
+            self.progress_callback(totals[0], totals[1], current_dir)
+
+    def _list_failed(self, path: str, error: OSError):
+        """目录无法列出 (已不存在的除外)：记录下来，本次扫描不对其下的文件做删除检测"""
+        logger.warning("Cannot list directory %s: %s", path, error)
+        self._unlisted.append(path)
+
+    @staticmethod
+    def _record_phases(**seconds: float):
+        """按阶段累加扫描耗时 (list / stat / match / tree / store)"""
+        for phase, value in seconds.items():
+            if value:
+                METRICS.inc("bird_scan_phase_seconds_total", value, phase=phase)
+
+    def _scan_serial(self, root_path: str) -> tuple[int, int]:
+        """单线程递归扫描"""
+        if self.cancelled.is_set():
+            return 0, 0
+        logger.debug("Scanning directory: %s", root_path)
+
         scanned_count = 0
         matched_count = 0
-        
+        # 本目录的图片文件整批匹配，增量模式下也只写一次索引
+        files: List[os.DirEntry] = []
+
+        # 先列出整个目录再处理，列目录 (I/O) 与匹配 (CPU) 的耗时分开统计
+        started = time.perf_counter()
         try:
-            for entry in os.scandir(root_path):
-                if entry.is_dir():
-                    # 递归扫描子目录
-                    sub_scanned, sub_matched = self.scan_directory(entry.path)
-                    scanned_count += sub_scanned
-                    matched_count += sub_matched
-                elif entry.is_file():
-                    if entry.name.lower().endswith(self.supported_extensions):
-                        scanned_count += 1
-                        # 注册到 DataRegistry
-                        if any(ext in entry.name.lower() for ext in self.supported_extensions):
-                            self._process_file(entry.name, entry.path)
-                            matched_count += 1
-                
-                # 调用进度回调
-                if self.progress_callback:
-                    self.progress_callback(scanned_count, matched_count)
+            entries = list(os.scandir(root_path))
         except FileNotFoundError:
-            print(f"Directory not found: {root_path}")
-        
+            logger.warning("Directory not found: %s", root_path)
+            entries = []
+        except OSError as e:
+            # 与并发扫描一致：记录后跳过该目录，不中断整个扫描
+            self._list_failed(root_path, e)
+            entries = []
+        self._record_phases(list=time.perf_counter() - started)
+        METRICS.inc("bird_scan_directories_total")
+
+        for entry in entries:
+            if entry.is_dir():
+                # 递归扫描子目录
+                sub_scanned, sub_matched = self._scan_serial(entry.path)
+                scanned_count += sub_scanned
+                matched_count += sub_matched
+            elif entry.is_file():
+                if entry.name.lower().endswith(self.supported_extensions):
+                    scanned_count += 1
+                    files.append(entry)
+                    if len(files) >= self.batch_size:
+                        # 超大目录分批处理，进度不必等整个目录处理完
+                        matched = self._process_batch(files)
+                        matched_count += matched
+                        self._add_progress(len(files), matched, root_path)
+                        files = []
+
+        # 注册到 DataRegistry
+        matched = self._process_batch(files)
+        matched_count += matched
+        # 调用进度回调 (按时间节流)
+        self._add_progress(len(files), matched, root_path)
+
         return scanned_count, matched_count
-                    
-    def _process_file(self, file_name: str, full_path: str) -> None:
-        """执行匹配并注册文件路径"""
-        species_id = self.registry.match_file(file_name)
-        if species_id:
-            photo = PhotoIndex(
-                file_name = file_name,
-                absolute_path = full_path,
-                matched_species_id = species_id
-            )
-
-            self.registry.add_photo(photo)
\ No newline at end of file
+
+    def _scan_parallel(self, root_path: str, workers: int) -> tuple[int, int]:
+        """并发扫描：每个目录作为一个任务提交到线程池，子目录由发现它的线程继续提交
+
+        空闲线程从线程池的共享队列中领取任务，慢速磁盘 (NAS/USB) 上的
+        os.scandir 等待可以相互重叠。每个目录的文件名整批匹配、整批注册。
+        """
+        logger.debug("Scanning directory: %s (workers=%d)", root_path, workers)
+
+        lock = threading.Lock()
+        done = threading.Event()
+        counts = {"scanned": 0, "matched": 0, "pending": 0}
+
+        # 工作线程沿用当前线程名作前缀，便于按扫描任务采样分析
+        prefix = f"{threading.current_thread().name}-worker"
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=prefix) as pool:
+            def submit(path: str):
+                with lock:
+                    counts["pending"] += 1
+                pool.submit(visit, path)
+
+            def visit(path: str):
+                try:
+                    if self.cancelled.is_set():
+                        return
+                    files: List[os.DirEntry] = []
+                    started = time.perf_counter()
+                    try:
+                        with os.scandir(path) as it:
+                            for entry in it:
+                                if entry.is_dir():
+                                    submit(entry.path)
+                                elif entry.is_file() and entry.name.lower().endswith(self.supported_extensions):
+                                    files.append(entry)
+                    except FileNotFoundError:
+                        logger.warning("Directory not found: %s", path)
+                    except OSError as e:
+                        self._list_failed(path, e)
+                    self._record_phases(list=time.perf_counter() - started)
+                    METRICS.inc("bird_scan_directories_total")
+
+                    matched = self._process_batch(files)
+                    with lock:
+                        counts["scanned"] += len(files)
+                        counts["matched"] += matched
+                    self._add_progress(len(files), matched, path)
+                except Exception:
+                    logger.exception("Error scanning %s", path)
+                finally:
+                    with lock:
+                        counts["pending"] -= 1
+                        if counts["pending"] == 0:
+                            done.set()
+
+            submit(root_path)
+            done.wait()
+
+        return counts["scanned"], counts["matched"]
+
+    def _process_batch(self, entries: List[os.DirEntry]) -> int:
+        """批量匹配 (无锁) 后一次性注册到 DataRegistry，返回匹配数量
+
+        增量模式下签名未变的文件跳过匹配，直接沿用已保存的结果 (含未匹配)；
+        匹配模式、语言或物种表变化时，扫描开始前 sync_matches 已按新配置重新匹配过
+        已保存的记录。保存的物种 ID 不在当前物种表中时 (sync_matches 之后物种表又被替换)
+        仍会重新匹配。
+        """
+        photos = []
+        rows = []
+        matched = 0
+        species_map = self.registry.species_map
+        perf = time.perf_counter
+        stat_seconds = match_seconds = 0.0
+        for entry in entries:
+            signature = None
+            if self.store:
+                started = perf()
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    # 列目录与取属性之间文件被移走，留给删除检测处理
+                    continue
+                finally:
+                    stat_seconds += perf() - started
+                signature = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+                self._seen.add(entry.path)
+                previous = self._snapshot.get(entry.path)
+                if previous and previous[0] == signature and (previous[1] is None or previous[1] in species_map):
+                    if previous[1] is None:
+                        if self.registry.has_photo(entry.path):
+                            self.registry.remove_photo(entry.path)
+                    else:
+                        matched += 1
+                        if not self.registry.has_photo(entry.path):
+                            photos.append(PhotoIndex(entry.name, entry.path, previous[1]))
+                    continue
+
+            started = perf()
+            species_id = self.registry.match_file(entry.name)
+            match_seconds += perf() - started
+            if signature and previous != (signature, species_id):
+                rows.append((entry.path, entry.name, species_id, *signature))
+            if species_id:
+                matched += 1
+                photos.append(PhotoIndex(
+                    file_name = entry.name,
+                    absolute_path = entry.path,
+                    matched_species_id = species_id
+                ))
+            elif self.registry.has_photo(entry.path):
+                self.registry.remove_photo(entry.path)
+        started = perf()
+        if photos:
+            self.registry.add_photos(photos)
+        tree_done = perf()
+        if rows:
+            self.store.upsert(rows)
+        self._record_phases(stat=stat_seconds, match=match_seconds,
+                            tree=tree_done - started, store=perf() - tree_done)
+        METRICS.inc("bird_scan_files_total", len(entries))
+        METRICS.inc("bird_scan_matched_total", matched)
+        if photos and self.photo_callback:
+            self.photo_callback(photos)
+        return matched
@@ -0,0 +1,212 @@
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+from src.models.birds import PhotoIndex
+from src.data.photo_store import PhotoIndexStore
+from src.utils.file_scanner import SUPPORTED_EXTENSIONS
+from src.utils.scan_jobs import ScanJobManager
+
+logger = logging.getLogger(__name__)
+
+
+class FolderWatcher:
+    """监视目录并增量更新索引 (基于目录 mtime 快照的轮询，无第三方依赖)
+
+    每轮只对已知目录各做一次 stat：目录中新增/删除/重命名文件都会改变目录 mtime，
+    变化的目录进入待处理集合。连续 debounce 秒无新变化 (或距首次变化超过
+    max_delay 秒) 后才统一处理，一次插卡导入的大量事件只合并应用一次。
+    处理时重新列出变化的目录，与已知文件集合比较得到新增与删除，再通过
+    ScanJobManager.apply_changes 增量更新分类树与计数，并同步持久化索引。
+
+    _lock 只保护内存中的目录状态，列目录、stat、匹配与读写索引库都在锁外进行，
+    请求线程调用 watch/unwatch/watched 不会被一次大目录的处理阻塞；
+    轮询本身由 _poll_lock 串行化。
+
+    方法:
+        watch(root) / unwatch(root)             # 添加/移除监视目录
+        watched()                               # 当前监视的目录
+        poll_once(force)                        # 执行一轮轮询 (force 忽略防抖)
+        start() / stop()                        # 启动/停止后台轮询线程
+    """
+    def __init__(self, jobs: ScanJobManager, store: Optional[PhotoIndexStore] = None,
+                 interval: float = 2.0, debounce: float = 1.0, max_delay: float = 10.0):
+        self.jobs = jobs
+        self.store = store
+        self.interval = interval
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self._roots: Set[str] = set()
+        # 已知目录 -> mtime_ns；已知目录 -> 其中受支持图片的文件名集合
+        self._dir_mtimes: Dict[str, int] = {}
+        self._dir_files: Dict[str, Set[str]] = {}
+        # 待处理的变化目录及首次/最近一次发现变化的时间
+        self._pending: Set[str] = set()
+        self._first_change = 0.0
+        self._last_change = 0.0
+        self._lock = threading.Lock()
+        self._poll_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def watch(self, root: str):
+        """开始监视 root；首轮处理会与持久化索引比对，补上监视开始前的变化"""
+        root = os.path.abspath(root)
+        with self._lock:
+            if root in self._roots:
+                return
+        known: Dict[str, Set[str]] = {}
+        if self.store:
+            for path in self.store.snapshot(root):
+                known.setdefault(os.path.dirname(path), set()).add(os.path.basename(path))
+        with self._lock:
+            if root in self._roots:
+                return
+            self._roots.add(root)
+            for directory, names in known.items():
+                # 已在监视中的目录以内存状态为准
+                if directory not in self._dir_mtimes:
+                    self._dir_files.setdefault(directory, set()).update(names)
+            self._mark(root, time.monotonic())
+        logger.info("Watching directory: %s", root)
+
+    def unwatch(self, root: str):
+        """停止监视 root (已索引的照片保持不变)"""
+        root = os.path.abspath(root)
+        with self._lock:
+            self._roots.discard(root)
+            prefix = os.path.join(root, "")
+            for d in [d for d in self._dir_files if d == root or d.startswith(prefix)]:
+                if not self._under_root(d):
+                    self._dir_files.pop(d, None)
+                    self._dir_mtimes.pop(d, None)
+                    self._pending.discard(d)
+
+    def watched(self) -> List[str]:
+        with self._lock:
+            return sorted(self._roots)
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="folder-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll_once()
+            except Exception:
+                logger.exception("Folder watcher error")
+
+    def _under_root(self, path: str) -> bool:
+        return any(path == r or path.startswith(os.path.join(r, "")) for r in self._roots)
+
+    def _mark(self, directory: str, now: float):
+        """调用方需持有 _lock"""
+        if not self._pending:
+            self._first_change = now
+        self._pending.add(directory)
+        self._last_change = now
+
+    def poll_once(self, force: bool = False) -> Tuple[int, int]:
+        """stat 所有已知目录，防抖期满后处理变化；返回 (新增照片数, 移除照片数)"""
+        with self._poll_lock:
+            return self._poll(force)
+
+    def _poll(self, force: bool) -> Tuple[int, int]:
+        now = time.monotonic()
+        with self._lock:
+            known = list(self._dir_mtimes.items())
+        for directory, mtime in known:
+            try:
+                current = os.stat(directory).st_mtime_ns
+            except OSError:
+                current = None
+            if current != mtime:
+                with self._lock:
+                    # 记下本轮看到的 mtime，之后只有再次变化才会推迟防抖
+                    if directory in self._dir_mtimes:
+                        self._dir_mtimes[directory] = current
+                    self._mark(directory, now)
+
+        with self._lock:
+            if not self._pending:
+                return 0, 0
+            quiet = now - self._last_change >= self.debounce
+            overdue = now - self._first_change >= self.max_delay
+            if not (force or quiet or overdue):
+                return 0, 0
+            pending, self._pending = self._pending, set()
+        added, removed, rows = [], [], []
+        # 倒序弹出：父目录先于子目录处理
+        queue = sorted(pending, reverse=True)
+        while queue:
+            queue.extend(reversed(self._refresh(queue.pop(), added, removed, rows)))
+
+        if added or removed:
+            self.jobs.apply_changes(added, removed)
+        if self.store:
+            if rows:
+                self.store.upsert(rows)
+            if removed:
+                self.store.delete(removed)
+        if added or removed:
+            logger.info("Watch update: +%d -%d", len(added), len(removed))
+        return len(added), len(removed)
+
+    def _refresh(self, directory: str, added: List[PhotoIndex], removed: List[str], rows: list) -> List[str]:
+        """重新列出目录并与已知文件比较，返回需要继续处理的新子目录
+
+        列目录、stat 与匹配在锁外进行，只有读取/更新已知状态时持有 _lock。
+        """
+        with self._lock:
+            if not self._under_root(directory):
+                return []
+            before = set(self._dir_files.get(directory, ()))
+        try:
+            entries = list(os.scandir(directory))
+            mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            # 目录已被删除：移除其下所有已知文件与子目录
+            prefix = os.path.join(directory, "")
+            with self._lock:
+                for d in [d for d in self._dir_files if d == directory or d.startswith(prefix)]:
+                    removed.extend(os.path.join(d, name) for name in self._dir_files.pop(d))
+                for d in [d for d in self._dir_mtimes if d == directory or d.startswith(prefix)]:
+                    del self._dir_mtimes[d]
+            return []
+
+        current: Dict[str, os.DirEntry] = {}
+        subdirs = []
+        for entry in entries:
+            if entry.is_dir():
+                subdirs.append(entry.path)
+            elif entry.is_file() and entry.name.lower().endswith(SUPPORTED_EXTENSIONS):
+                current[entry.name] = entry
+
+        registry = self.jobs.registry
+        for name in current.keys() - before:
+            entry = current[name]
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            species_id = registry.match_file(name)
+            rows.append((entry.path, name, species_id, stat.st_mtime_ns, stat.st_size, stat.st_ino))
+            if species_id:
+                added.append(PhotoIndex(file_name=name, absolute_path=entry.path, matched_species_id=species_id))
+        removed.extend(os.path.join(directory, name) for name in before - current.keys())
+
+        with self._lock:
+            # 处理期间被 unwatch 的目录不再记录
+            if not self._under_root(directory):
+                return []
+            self._dir_mtimes[directory] = mtime
+            self._dir_files[directory] = set(current)
+            # 新出现的子目录 (含监视开始时尚未处理的子目录) 继续处理
+            return [sub for sub in subdirs if sub not in self._dir_mtimes]
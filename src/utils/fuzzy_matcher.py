@@ -0,0 +1,159 @@
+import os
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from src.utils.aho_corasick import AhoCorasickMatcher
+
+# 文件名中常见的分隔符 (下划线、连字符、点、括号等) 统一视为空格
+_SEPARATORS = re.compile(r"[\s_\-.,;+~#()\[\]{}]+")
+# 文件名中的拉丁词 (纯字母，数字/分隔符/汉字均视为词边界)
+_LATIN_WORD = re.compile(r"[a-z]+")
+# 模糊匹配命中学名时返回的语言标签
+LATIN = "la"
+
+
+def normalize_name(text: str) -> str:
+    """转小写并把连续分隔符折叠为单个空格：'Egretta_garzetta-001' -> 'egretta garzetta 001'"""
+    return _SEPARATORS.sub(" ", text.lower()).strip()
+
+
+def trigrams(phrase: str) -> Set[str]:
+    """首尾补空格后的字符三元组集合"""
+    padded = f" {phrase} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class FuzzyNameMatcher:
+    """容错的物种名匹配器
+
+    两级匹配，结果附带置信度 (0~1):
+        1. 规范化后的精确匹配：关键字与文件名都经 normalize_name 处理，
+           'Egretta_garzetta_001.jpg'、'egretta-garzetta.jpg' 都能命中，置信度 1.0
+        2. 模糊匹配：精确匹配失败时，取文件名 (去掉扩展名) 中相邻的两个拉丁词
+           组成候选二名法短语，以其与学名三元组集合的 Dice 系数
+           2|A∩B|/(|A|+|B|) 作为置信度，不低于 min_score 才采纳。
+           候选学名先从词索引中取 (属名或种加词完全一致，单词拼写错误最常见)，
+           都不够相似时再用三元组倒排索引统计共有三元组数。
+
+    倒排索引中出现在过多学名里的三元组 (如 'us ') 区分度低，不参与候选统计，
+    以控制每个文件的匹配开销。
+
+    精确匹配自动机中每个关键字带有语言标签，所有语言共用一个自动机，
+    单个文件的匹配开销与启用的语言数量无关；模糊匹配只针对学名 (标签 'la')。
+
+    成员变量:
+        min_score: float                        # 模糊匹配的最低置信度
+        _exact: AhoCorasickMatcher              # 规范化关键字 -> (物种 ID, 语言标签) 的精确匹配自动机
+        _ids: List[str]                         # 学名序号 -> 物种 ID
+        _grams: List[frozenset]                 # 学名序号 -> 三元组集合
+        _by_word: Dict[str, List[int]]          # 学名中的单词 -> 学名序号列表
+        _index: Dict[str, List[int]]            # 三元组 -> 包含它的学名序号列表
+        _by_phrase: Dict[str, int]              # 规范化学名 -> 学名序号
+
+    方法:
+        match(file_name)                        # 返回 (物种 ID, 置信度)，未命中时为 (None, 0.0)
+        match_tagged(file_name)                 # 返回 (物种 ID, 语言标签, 置信度)
+    """
+    def __init__(self, keys: Iterable[Tuple[str, str]], latin_names: Iterable[Tuple[str, str]],
+                 min_score: float = 0.55, max_posting: int = 500,
+                 languages: Optional[Dict[str, str]] = None):
+        """
+        参数：
+            keys: (匹配键, 物种 ID)，如 DataRegistry.match_lookup 的条目
+            latin_names: (拉丁学名, 物种 ID)，用于构建三元组索引
+            min_score: 模糊匹配的最低置信度
+            max_posting: 倒排列表长度上限，超过的三元组不参与候选统计
+            languages: 匹配键 -> 语言标签，如 DataRegistry.key_languages
+        """
+        self.min_score = min_score
+        languages = languages or {}
+        self._exact = AhoCorasickMatcher(
+            (normalize_name(key), (species_id, languages.get(key))) for key, species_id in keys
+        ).build()
+
+        self._ids: List[str] = []
+        self._grams: List[frozenset] = []
+        self._by_phrase: Dict[str, int] = {}
+        self._by_word: Dict[str, List[int]] = defaultdict(list)
+        index: Dict[str, List[int]] = defaultdict(list)
+        for name, species_id in latin_names:
+            words = _LATIN_WORD.findall(name.lower())
+            phrase = " ".join(words)
+            if not phrase or phrase in self._by_phrase:
+                continue
+            grams = frozenset(trigrams(phrase))
+            idx = len(self._ids)
+            self._ids.append(species_id)
+            self._grams.append(grams)
+            self._by_phrase[phrase] = idx
+            for word in set(words):
+                self._by_word[word].append(idx)
+            for gram in grams:
+                index[gram].append(idx)
+        self._by_word = dict(self._by_word)
+        self._index = {gram: ids for gram, ids in index.items() if len(ids) <= max_posting}
+
+    def match(self, file_name: str) -> Tuple[Optional[str], float]:
+        """返回 (物种 ID, 置信度)；未命中或低于 min_score 时返回 (None, 0.0)"""
+        species_id, _, score = self.match_tagged(file_name)
+        return species_id, score
+
+    def match_tagged(self, file_name: str) -> Tuple[Optional[str], Optional[str], float]:
+        """返回 (物种 ID, 命中关键字的语言标签, 置信度)；未命中时为 (None, None, 0.0)"""
+        hit = self._exact.search(normalize_name(file_name))
+        if hit:
+            return hit[0], hit[1], 1.0
+
+        words = _LATIN_WORD.findall(normalize_name(os.path.splitext(file_name)[0]))
+        best_id, best_score = None, 0.0
+        seen = set()
+        for first, second in zip(words, words[1:]):
+            # 过短的词 (如 'a'、'of') 组不成学名
+            if len(first) < 3 or len(second) < 3:
+                continue
+            phrase = f"{first} {second}"
+            if phrase in seen:
+                continue
+            seen.add(phrase)
+            species_id, score = self._score(phrase, first, second)
+            if score > best_score:
+                best_id, best_score = species_id, score
+                if score == 1.0:
+                    break
+        if best_score < self.min_score:
+            return None, None, 0.0
+        return best_id, LATIN, round(best_score, 3)
+
+    def _score(self, phrase: str, first: str, second: str) -> Tuple[Optional[str], float]:
+        """短语与最相似学名的 (物种 ID, Dice 系数)"""
+        idx = self._by_phrase.get(phrase)
+        if idx is not None:
+            return self._ids[idx], 1.0
+        grams = trigrams(phrase)
+        n = len(grams)
+        all_grams = self._grams
+
+        # 一个词拼对了：只需比较共用该词的少量学名
+        best_idx, best_score = -1, 0.0
+        for i in self._by_word.get(first, []) + self._by_word.get(second, []):
+            other = all_grams[i]
+            score = 2.0 * len(grams & other) / (n + len(other))
+            if score > best_score:
+                best_idx, best_score = i, score
+        if best_score >= self.min_score:
+            return self._ids[best_idx], best_score
+
+        # 两个词都有出入：按倒排索引统计共有三元组
+        shared: Dict[int, int] = {}
+        for gram in grams:
+            ids = self._index.get(gram)
+            if ids:
+                for i in ids:
+                    shared[i] = shared.get(i, 0) + 1
+        for i, common in shared.items():
+            score = 2.0 * common / (n + len(all_grams[i]))
+            if score > best_score:
+                best_idx, best_score = i, score
+        if best_idx < 0:
+            return None, 0.0
+        return self._ids[best_idx], best_score
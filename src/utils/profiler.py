@@ -0,0 +1,77 @@
+import collections
+import os
+import sys
+import threading
+from typing import Counter, Dict, List, Optional, Tuple
+
+
+class SamplingProfiler:
+    """采样分析器：定期抓取目标线程的调用栈并按栈计数
+
+    通过 sys._current_frames() 读取线程栈，不需要 sys.setprofile，
+    被测线程不受逐调用钩子的拖累，开销只与采样频率有关。
+    目标线程为名称以 thread_prefix 开头的所有线程 (扫描任务线程及其并发扫描工作线程)。
+    采样线程与读取方 (任务运行中的 /api/scan/jobs/{id}/profile) 通过 _lock 互斥，
+    读取方只在锁内复制计数，之后在锁外汇总。
+
+    方法:
+        start() / stop()                        # 开始/结束采样
+        folded()                                # 折叠栈文本 ("a;b;c 计数")，可直接生成火焰图
+        top(limit)                              # 自身耗时最多的函数 [(函数, 样本数)]
+    """
+    def __init__(self, thread_prefix: str, interval: float = 0.005, max_depth: int = 64):
+        self.thread_prefix = thread_prefix
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = 0
+        self._stacks: Counter[str] = collections.Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if not names.get(ident, "").startswith(self.thread_prefix):
+                    continue
+                stack: List[str] = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                key = ";".join(reversed(stack))
+                with self._lock:
+                    self._stacks[key] += 1
+                    self.samples += 1
+
+    def _snapshot(self) -> Tuple[Counter[str], int]:
+        """(栈计数副本, 样本数)，采样仍在进行时也可安全遍历"""
+        with self._lock:
+            return self._stacks.copy(), self.samples
+
+    def folded(self) -> str:
+        stacks, _ = self._snapshot()
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+    def top(self, limit: int = 20) -> List[Dict]:
+        stacks, samples = self._snapshot()
+        own: Counter[str] = collections.Counter()
+        for stack, count in stacks.items():
+            own[stack.rsplit(";", 1)[-1]] += count
+        total = max(samples, 1)
+        return [
+            {"function": func, "samples": count, "ratio": round(count / total, 4)}
+            for func, count in own.most_common(limit)
+        ]
@@ -0,0 +1,179 @@
+import os
+import struct
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+# TIFF 字段类型 -> 单个值的字节数
+TIFF_TYPE_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 6: 1, 7: 1, 8: 2, 9: 4, 10: 8, 11: 4, 12: 8, 13: 4}
+# 用到的 TIFF 标签
+TAG_COMPRESSION = 0x0103
+TAG_STRIP_OFFSETS = 0x0111
+TAG_STRIP_BYTE_COUNTS = 0x0117
+TAG_SUB_IFDS = 0x014A
+TAG_JPEG_OFFSET = 0x0201
+TAG_JPEG_LENGTH = 0x0202
+# 可被 PIL 解码的 JPEG 帧类型 (基线/扩展/渐进)；无损 JPEG (SOF3，CR2 原始数据) 不在其列
+DECODABLE_SOF = {0xC0, 0xC1, 0xC2}
+OTHER_SOF = {0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+# 防御畸形文件：IFD 最多遍历数量与预览图最大字节数
+MAX_IFDS = 32
+MAX_PREVIEW_BYTES = 64 * 1024 * 1024
+
+# (宽, 高, 绝对偏移, 字节数)
+Preview = Tuple[int, int, int, int]
+
+
+def extract_preview(path: str, min_size: Tuple[int, int] = (0, 0), allow_smaller: bool = True) -> Optional[bytes]:
+    """读取文件内嵌的 JPEG 预览图，不解码原图
+
+    支持 TIFF 结构的 RAW (ARW/CR2/NEF/DNG 等) 以及 JPEG 的 APP1/EXIF 缩略图。
+    只做 seek + 小块读取：先遍历 IFD 收集候选预览，再读取每个候选 JPEG 的 SOF
+    得到尺寸，返回能覆盖 min_size 的最小预览；都不够大时，allow_smaller 为真
+    则返回最大的一张，否则返回 None。没有可用预览时返回 None。
+    """
+    try:
+        with open(path, "rb") as f:
+            previews = find_previews(f)
+            if not previews:
+                return None
+            large_enough = [p for p in previews if p[0] >= min_size[0] and p[1] >= min_size[1]]
+            if large_enough:
+                chosen = min(large_enough, key=lambda p: p[0] * p[1])
+            elif allow_smaller:
+                chosen = max(previews, key=lambda p: p[0] * p[1])
+            else:
+                return None
+            f.seek(chosen[2])
+            return f.read(chosen[3])
+    except (OSError, struct.error):
+        return None
+
+
+def find_previews(f: BinaryIO) -> List[Preview]:
+    """返回文件中所有可解码的内嵌 JPEG 预览 (宽, 高, 偏移, 字节数)"""
+    file_size = os.fstat(f.fileno()).st_size
+    f.seek(0)
+    head = f.read(4)
+    if head[:2] == b"\xff\xd8":
+        candidates = _exif_candidates(f)
+    elif head in (b"II*\x00", b"MM\x00*"):
+        candidates = _tiff_candidates(f, 0)
+    else:
+        return []
+
+    previews = []
+    seen = set()
+    for offset, length in candidates:
+        if (offset, length) in seen or length <= 0 or length > MAX_PREVIEW_BYTES:
+            continue
+        seen.add((offset, length))
+        if offset + length > file_size:
+            continue
+        size = _jpeg_size(f, offset, length)
+        if size:
+            previews.append((size[0], size[1], offset, length))
+    return previews
+
+
+def _exif_candidates(f: BinaryIO) -> List[Tuple[int, int]]:
+    """在 JPEG 的 APP1 Exif 段中查找 IFD1 缩略图"""
+    f.seek(2)
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF or marker[1] == 0xDA:
+            return []
+        (seg_len,) = struct.unpack(">H", f.read(2))
+        seg_start = f.tell()
+        if marker[1] == 0xE1 and f.read(6) == b"Exif\x00\x00":
+            # Exif 中的偏移相对于 TIFF 头 (即 "Exif\0\0" 之后)
+            return _tiff_candidates(f, seg_start + 6)
+        f.seek(seg_start + seg_len - 2)
+
+
+def _tiff_candidates(f: BinaryIO, base: int) -> List[Tuple[int, int]]:
+    """遍历 IFD 链及 SubIFD，收集 JPEG 预览的 (绝对偏移, 字节数)"""
+    f.seek(base)
+    order = f.read(2)
+    if order == b"II":
+        endian = "<"
+    elif order == b"MM":
+        endian = ">"
+    else:
+        return []
+    magic, first_ifd = struct.unpack(endian + "HI", f.read(6))
+    if magic != 42:
+        return []
+
+    candidates = []
+    pending = [first_ifd]
+    visited = set()
+    while pending and len(visited) < MAX_IFDS:
+        ifd_offset = pending.pop(0)
+        if not ifd_offset or ifd_offset in visited:
+            continue
+        visited.add(ifd_offset)
+        entries, next_ifd = _read_ifd(f, base, ifd_offset, endian)
+        pending.append(next_ifd)
+        pending.extend(entries.get(TAG_SUB_IFDS, []))
+
+        if TAG_JPEG_OFFSET in entries and TAG_JPEG_LENGTH in entries:
+            candidates.append((base + entries[TAG_JPEG_OFFSET][0], entries[TAG_JPEG_LENGTH][0]))
+        # CR2 IFD0 等以单条带存放的 JPEG (Compression 6/7)
+        strips = entries.get(TAG_STRIP_OFFSETS, [])
+        counts = entries.get(TAG_STRIP_BYTE_COUNTS, [])
+        if entries.get(TAG_COMPRESSION, [0])[0] in (6, 7) and len(strips) == 1 and len(counts) == 1:
+            candidates.append((base + strips[0], counts[0]))
+    return candidates
+
+
+def _read_ifd(f: BinaryIO, base: int, offset: int, endian: str) -> Tuple[Dict[int, List[int]], int]:
+    """读取一个 IFD，只解析整数类型的字段值；返回 (标签 -> 值列表, 下一个 IFD 偏移)"""
+    f.seek(base + offset)
+    (count,) = struct.unpack(endian + "H", f.read(2))
+    raw = f.read(12 * count)
+    tail = f.read(4)
+    next_ifd = struct.unpack(endian + "I", tail)[0] if len(tail) == 4 else 0
+
+    entries = {}
+    for i in range(len(raw) // 12):
+        tag, typ, n, value = struct.unpack(endian + "HHI4s", raw[i * 12:i * 12 + 12])
+        if typ not in (3, 4, 13) or n == 0 or n > 1024:
+            continue
+        fmt = endian + ("H" if typ == 3 else "I") * n
+        size = TIFF_TYPE_SIZES[typ] * n
+        if size <= 4:
+            data = value[:size]
+        else:
+            # 值超过 4 字节时存放在别处，字段中是其偏移
+            here = f.tell()
+            f.seek(base + struct.unpack(endian + "I", value)[0])
+            data = f.read(size)
+            f.seek(here)
+        if len(data) == size:
+            entries[tag] = list(struct.unpack(fmt, data))
+    return entries, next_ifd
+
+
+def _jpeg_size(f: BinaryIO, offset: int, length: int) -> Optional[Tuple[int, int]]:
+    """读取内嵌 JPEG 的 SOF 段得到 (宽, 高)；不是可解码的 JPEG 时返回 None"""
+    end = offset + length
+    f.seek(offset)
+    if f.read(2) != b"\xff\xd8":
+        return None
+    pos = offset + 2
+    while pos + 4 <= end:
+        f.seek(pos)
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        if marker[1] == 0xFF:
+            # 填充字节
+            pos += 1
+            continue
+        if marker[1] in DECODABLE_SOF:
+            _, _, height, width = struct.unpack(">HBHH", f.read(7))
+            return (width, height) if width and height else None
+        if marker[1] in OTHER_SOF or marker[1] == 0xDA:
+            return None
+        (seg_len,) = struct.unpack(">H", f.read(2))
+        pos += 2 + seg_len
+    return None
@@ -0,0 +1,383 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+from src.models.birds import DataRegistry, PhotoIndex
+from src.data.photo_store import PhotoIndexStore
+from src.utils.file_scanner import FileScanner
+from src.utils.duplicates import DuplicateFinder
+from src.utils.search_index import PhotoSearchIndex
+from src.utils.metrics import METRICS
+from src.utils.profiler import SamplingProfiler
+
+logger = logging.getLogger(__name__)
+
+# 搜索索引登记的文件名超过实际照片数两倍 (且至少为此数量) 时重建
+STALE_INDEX_MIN_PHOTOS = 10000
+
+
+@dataclass
+class ScanJob:
+    """扫描任务
+
+    成员变量:
+        job_id: str                             # 任务 ID
+        paths: List[str]                        # 扫描根目录 (绝对路径)
+        status: str                             # queued / scanning / completed / cancelled / failed
+        scanned / matched: int                  # 累计扫描/匹配数量
+        total: int                              # 预计总数 (上次索引中这些目录下的文件数)
+        files_per_second / current_dir / eta_seconds  # 实时进度
+        error: Optional[str]                    # 失败原因
+        profile: bool                           # 是否对该任务做采样分析
+        profiler: Optional[SamplingProfiler]    # 采样结果 (任务开始运行后可用)
+        dedupe: bool                            # 扫描后是否运行重复检测
+        duplicates: Optional[int]               # 任务生效后注册中心中被折叠的重复副本数量
+        changes: List[Tuple[List[PhotoIndex], List[str]]]  # 运行期间落在任务目录下的外部变化 (新增, 移除)
+    """
+    job_id: str
+    paths: List[str]
+    status: str = "queued"
+    scanned: int = 0
+    matched: int = 0
+    total: int = 0
+    files_per_second: float = 0.0
+    current_dir: str = ""
+    eta_seconds: Optional[float] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    # 新照片登记后的回调，参数为 (任务 ID, 本批照片)
+    photo_callback: Optional[Callable[[str, List[PhotoIndex]], None]] = field(default=None, repr=False)
+    scanner: Optional[FileScanner] = field(default=None, repr=False)
+    cancel_requested: bool = False
+    profile: bool = False
+    profiler: Optional[SamplingProfiler] = field(default=None, repr=False)
+    dedupe: bool = False
+    duplicates: Optional[int] = None
+    changes: List[Tuple[List[PhotoIndex], List[str]]] = field(default_factory=list, repr=False)
+
+    @property
+    def active(self) -> bool:
+        return self.status in ("queued", "scanning")
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "paths": self.paths,
+            "status": self.status,
+            "scanned": self.scanned,
+            "matched": self.matched,
+            "total": self.total,
+            "files_per_second": self.files_per_second,
+            "current_dir": self.current_dir,
+            "eta_seconds": self.eta_seconds,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "profile": self.profile,
+            "dedupe": self.dedupe,
+            "duplicates": self.duplicates,
+        }
+
+
+def _roots_overlap(a: str, b: str) -> bool:
+    """两个目录是否相同或互为祖先"""
+    a, b = os.path.join(a, ""), os.path.join(b, "")
+    return a.startswith(b) or b.startswith(a)
+
+
+def _within(path: str, root: str) -> bool:
+    return os.path.join(path, "").startswith(os.path.join(root, ""))
+
+
+class ScanJobManager:
+    """扫描任务调度器
+
+    - 每个任务在独立的暂存注册中心 (DataRegistry.clone_species) 中构建，
+      完成后与当前注册中心合并为新对象并整体替换，读者不会看到半成品分类树
+    - 新任务的根目录全部落在某个进行中任务的根目录内时直接复用该任务；
+      部分重叠的任务排队，等重叠任务结束后再运行
+    - 同时运行的任务数不超过 max_concurrent
+    - 任务可选在扫描后运行重复检测 (DuplicateFinder，覆盖整个照片库)，
+      重复组在替换前登记到新注册中心；未检测时沿用当前注册中心的重复组
+    - 照片路径搜索索引随注册中心沿用，任务只把新出现的文件名登记进去
+
+    成员变量:
+        registry: DataRegistry                  # 当前对外提供查询的注册中心 (整体替换)
+        ready: threading.Event                  # 持久化索引已恢复到注册中心 (见 start_restore)
+
+    方法:
+        start_restore(then)                     # 后台从持久化索引恢复照片
+        submit(paths, photo_callback, profile, dedupe)  # 提交任务，返回 (任务, 是否为复用的已有任务)
+        get(job_id) / jobs() / latest()         # 查询任务
+        cancel(job_id)                          # 取消任务
+        apply_changes(added, removed)           # 增量应用外部变化 (如目录监视)
+    """
+    def __init__(self, registry: DataRegistry, store: Optional[PhotoIndexStore] = None,
+                 max_concurrent: int = 2, workers: int = 1, max_history: int = 50, hash_workers: int = 4):
+        self.registry = registry
+        self.store = store
+        self.max_concurrent = max(1, max_concurrent)
+        self.workers = workers
+        self.hash_workers = hash_workers
+        self.max_history = max_history
+        self._jobs: Dict[str, ScanJob] = {}
+        self._lock = threading.Lock()
+        # 串行化合并替换，保证每次合并基于最新的注册中心
+        self._swap_lock = threading.Lock()
+        self.ready = threading.Event()
+        self.ready.set()
+
+    def start_restore(self, then: Optional[Callable[[DataRegistry], None]] = None) -> threading.Thread:
+        """在后台线程中把持久化索引恢复到当前注册中心，完成前 ready 未置位
+
+        恢复期间持有替换锁：任务合并与增量更新等到恢复完成后再基于完整的注册中心进行；
+        查询照常响应，分类树按批逐步补全。then 在恢复完成后以当前注册中心调用 (如建立搜索索引)。
+        """
+        self.ready.clear()
+
+        def run():
+            started = time.perf_counter()
+            try:
+                with self._swap_lock:
+                    if self.store:
+                        self.store.restore(self.registry)
+                METRICS.observe("bird_index_restore_seconds", time.perf_counter() - started)
+            except Exception:
+                logger.exception("Restoring the photo index failed")
+            finally:
+                self.ready.set()
+            if then is not None:
+                then(self.registry)
+
+        thread = threading.Thread(target=run, name="index-restore", daemon=True)
+        thread.start()
+        return thread
+
+    def submit(self, paths: List[str], photo_callback=None, profile: bool = False,
+               dedupe: bool = False) -> Tuple[ScanJob, bool]:
+        """提交扫描任务；与进行中任务重复时返回已有任务 (本次的 photo_callback 等参数不生效)
+
+        photo_callback 以 (任务 ID, 本批新登记的照片) 调用；
+        profile 为真时任务运行期间启用采样分析器，结果见 ScanJob.profiler；
+        dedupe 为真时扫描后对整个照片库运行重复检测。
+        """
+        roots = [os.path.abspath(p) for p in paths]
+        with self._lock:
+            for job in self._jobs.values():
+                if job.active and not job.cancel_requested and all(
+                    any(_within(root, existing) for existing in job.paths) for root in roots
+                ):
+                    return job, True
+            job = ScanJob(job_id=uuid.uuid4().hex[:12], paths=roots, photo_callback=photo_callback,
+                          profile=profile, dedupe=dedupe)
+            if self.store:
+                job.total = sum(self.store.count(root) for root in roots)
+            self._jobs[job.job_id] = job
+            self._trim_history()
+        self._schedule()
+        return job, False
+
+    def get(self, job_id: str) -> Optional[ScanJob]:
+        return self._jobs.get(job_id)
+
+    def jobs(self) -> List[ScanJob]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def latest(self) -> Optional[ScanJob]:
+        """最近提交的任务"""
+        with self._lock:
+            return next(reversed(self._jobs.values()), None)
+
+    def cancel(self, job_id: str) -> Optional[ScanJob]:
+        """取消任务：排队中的直接取消，运行中的在下一个目录处停止且结果不生效"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or not job.active:
+                return job
+            job.cancel_requested = True
+            if job.status == "queued":
+                job.status = "cancelled"
+                job.finished_at = time.time()
+            elif job.scanner is not None:
+                job.scanner.cancel()
+        return job
+
+    def apply_changes(self, added: List[PhotoIndex], removed: List[str]):
+        """就地增量更新当前注册中心；与任务合并互斥，避免变化在替换时丢失
+
+        落在运行中任务目录下的变化另记到该任务 (ScanJob.changes)：扫描器可能在变化发生前
+        已列出对应目录，任务合并时用暂存区替换这些目录，需在其上重放这些变化。
+        """
+        with self._swap_lock:
+            registry = self.registry
+            registry.remove_photos(removed)
+            registry.add_photos(added)
+            with self._lock:
+                running = [job for job in self._jobs.values() if job.status == "scanning"]
+            for job in running:
+                job_added = [p for p in added if any(_within(p.absolute_path, root) for root in job.paths)]
+                job_removed = [path for path in removed if any(_within(path, root) for root in job.paths)]
+                if job_added or job_removed:
+                    job.changes.append((job_added, job_removed))
+
+    def _trim_history(self):
+        """调用方需持有 _lock；只保留最近 max_history 个已结束任务"""
+        finished = [job_id for job_id, job in self._jobs.items() if not job.active]
+        for job_id in finished[:max(0, len(finished) - self.max_history)]:
+            del self._jobs[job_id]
+
+    def _schedule(self):
+        """启动可运行的排队任务：未超并发上限且与运行中任务无目录重叠"""
+        with self._lock:
+            running = [job for job in self._jobs.values() if job.status == "scanning"]
+            for job in self._jobs.values():
+                if len(running) >= self.max_concurrent:
+                    break
+                if job.status != "queued":
+                    continue
+                if any(_roots_overlap(a, b) for other in running for a in job.paths for b in other.paths):
+                    continue
+                job.status = "scanning"
+                job.started_at = time.time()
+                running.append(job)
+                threading.Thread(target=self._run, args=(job,), name=f"scan-{job.job_id}", daemon=True).start()
+
+    def _run(self, job: ScanJob):
+        staging = self.registry.clone_species()
+        scanner = FileScanner(staging, workers=self.workers, store=self.store)
+        started = time.monotonic()
+
+        def update_progress(scanned, matched, current_dir):
+            elapsed = max(time.monotonic() - started, 1e-6)
+            rate = scanned / elapsed
+            job.scanned, job.matched, job.current_dir = scanned, matched, current_dir
+            job.files_per_second = round(rate, 1)
+            job.eta_seconds = round((job.total - scanned) / rate, 1) if rate and job.total > scanned else None
+
+        scanner.set_progress_callback(update_progress)
+        if job.photo_callback:
+            scanner.set_photo_callback(lambda photos: job.photo_callback(job.job_id, photos))
+        with self._lock:
+            job.scanner = scanner
+            if job.cancel_requested:
+                scanner.cancel()
+
+        if job.profile:
+            # 采样本线程及其并发扫描工作线程 (线程名以本线程名为前缀)
+            job.profiler = SamplingProfiler(threading.current_thread().name)
+            job.profiler.start()
+        try:
+            for path in job.paths:
+                scanner.scan_directory(path)
+            duplicates = None
+            if job.dedupe and not scanner.cancelled.is_set():
+                job.current_dir = ""
+                duplicates = self._find_duplicates(job, staging)
+            if scanner.cancelled.is_set() or job.cancel_requested:
+                job.status = "cancelled"
+            else:
+                indexed = self._index_new_photos(staging)
+                self._commit(job, staging, duplicates, indexed)
+                job.status = "completed"
+        except Exception as e:
+            logger.exception("Scan job %s failed", job.job_id)
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            if job.profiler is not None:
+                job.profiler.stop()
+            job.eta_seconds = None
+            job.finished_at = time.time()
+            job.scanner = None
+            METRICS.inc("bird_scan_jobs_total", status=job.status)
+            METRICS.observe("bird_scan_job_seconds", time.monotonic() - started)
+            logger.info("Scan job %s %s: %d scanned, %d matched in %.1fs",
+                        job.job_id, job.status, job.scanned, job.matched, time.monotonic() - started)
+            self._schedule()
+
+    def _find_duplicates(self, job: ScanJob, staging: DataRegistry) -> List[List[str]]:
+        """对整个照片库 (任务目录以外的现有照片 + 暂存区) 运行重复检测，不持有替换锁
+
+        有持久化索引时按索引中的大小分组并沿用已保存的哈希，新算的哈希写回索引；
+        否则对每张照片 stat 一次取得大小。
+        """
+        finder = DuplicateFinder(workers=self.hash_workers)
+        if self.store:
+            groups = finder.find(self.store.duplicate_candidates())
+            self.store.save_hashes(finder.computed)
+        else:
+            prefixes = tuple(os.path.join(root, "") for root in job.paths)
+            paths = [p.absolute_path for p in self.registry.iter_photos() if not p.absolute_path.startswith(prefixes)]
+            paths.extend(p.absolute_path for p in staging.iter_photos())
+            candidates = []
+            for path in paths:
+                try:
+                    candidates.append((path, os.stat(path).st_size, None, None))
+                except OSError:
+                    continue
+            groups = finder.find(candidates)
+        logger.info("Duplicate detection for job %s: %s", job.job_id, finder.stats)
+        return groups
+
+    def _index_new_photos(self, staging: DataRegistry) -> Optional[PhotoSearchIndex]:
+        """把暂存区中当前注册中心没有的文件名登记到搜索索引，返回所用的索引
+
+        在替换前、不持有替换锁时调用；此时登记的照片尚未生效，查询核对时会被过滤。
+        """
+        live = self.registry
+        index = live.search_index
+        if index is not None:
+            for directory, names in staging.iter_directories():
+                known = set(live.directory_names(directory))
+                new = [name for name in names if name not in known]
+                if new:
+                    index.add(directory, new)
+        return index
+
+    def _replay(self, job: ScanJob, merged: DataRegistry):
+        """在合并结果上重放任务运行期间的外部变化，调用方需持有 _swap_lock
+
+        扫描器可能在文件删除前已写回其索引记录，最终被删除的路径也从持久化索引中删除。
+        """
+        final: Dict[str, Optional[PhotoIndex]] = {}
+        for added, removed in job.changes:
+            # 与 apply_changes 一致：同一批先移除再新增
+            final.update(dict.fromkeys(removed))
+            final.update((photo.absolute_path, photo) for photo in added)
+        gone = [path for path, photo in final.items() if photo is None]
+        merged.remove_photos(gone)
+        merged.add_photos(photo for photo in final.values() if photo is not None)
+        if self.store and gone:
+            self.store.delete(gone)
+        logger.info("Scan job %s: replayed %d changes made while it was running", job.job_id, len(final))
+
+    def _commit(self, job: ScanJob, staging: DataRegistry, duplicates: Optional[List[List[str]]] = None,
+                indexed: Optional[PhotoSearchIndex] = None):
+        """新注册中心 = 当前注册中心中任务目录以外的照片 + 暂存区照片，然后整体替换
+
+        任务运行期间记录的外部变化 (ScanJob.changes) 在暂存区之上重放，每个路径取最后一次变化。
+        duplicates 为 None 时沿用当前注册中心的重复组 (不存在的路径自动忽略)。
+        搜索索引随注册中心沿用；暂存区未登记到该索引 (期间索引刚建立)，
+        或索引登记的文件名已远多于实际照片 (大量删除/移动) 时重建。
+        """
+        with self._swap_lock:
+            live = self.registry
+            merged = live.clone_species()
+            merged.merge_photos(live, exclude_roots=job.paths)
+            merged.merge_photos(staging)
+            if job.changes:
+                self._replay(job, merged)
+            merged.set_duplicates(live.duplicate_groups() if duplicates is None else duplicates)
+            merged.search_index = index = live.search_index
+            job.duplicates = merged.duplicate_count
+            self.registry = merged
+        if index is not None and (index is not indexed or index.indexed > 2 * max(
+                merged.photo_count + merged.duplicate_count, STALE_INDEX_MIN_PHOTOS)):
+            merged.build_search_index()
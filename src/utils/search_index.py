@@ -0,0 +1,296 @@
+import string
+import threading
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+# 分词时视为分隔符的字符：ASCII 标点与空白、常用中文标点与全角空格
+SEPARATORS = string.punctuation + string.whitespace + "，。、；：？！“”‘’（）【】《》…·～　"
+_SEPARATOR_TABLE = str.maketrans(dict.fromkeys(SEPARATORS, " "))
+
+# 单次查询最多收集的分类阶元与照片命中数，超出后停止 (结果标记为不完整)
+MAX_TAXON_HITS = 1000
+MAX_PHOTO_HITS = 1000
+# 单个查询词匹配的词表项超过此数量时不再展开倒排表，视为所有目录都是候选
+MAX_EXPANDED_TERMS = 1024
+# 尚未并入词表文本的新词超过此数量时，查询前重建词表文本
+VOCABULARY_REBUILD_THRESHOLD = 4096
+
+
+def tokenize(text: str) -> List[str]:
+    """转小写并按分隔符切分；中文连续字符、字母与数字的组合各为一个词"""
+    return text.lower().translate(_SEPARATOR_TABLE).split()
+
+
+def normalize(text: str) -> str:
+    """分词后以单个空格连接 ('Egretta_garzetta' -> 'egretta garzetta')"""
+    return " ".join(tokenize(text))
+
+
+def _matching_lines(names: List[str], text: str, tokens: List[str]) -> Iterator[Tuple[str, str]]:
+    """text 为 names 转小写后以换行连接的文本；生成包含全部 tokens 的 (文件名, 小写文件名)
+
+    用最长的词 str.find 定位候选行，不逐个文件名做 Python 比较。
+    """
+    if not tokens:
+        yield from zip(names, text.split("\n"))
+        return
+    anchor = max(tokens, key=len)
+    others = [t for t in tokens if t != anchor]
+    line, last = 0, 0
+    pos = text.find(anchor)
+    while pos != -1:
+        start = text.rfind("\n", 0, pos) + 1
+        end = text.find("\n", pos)
+        if end == -1:
+            end = len(text)
+        low = text[start:end]
+        if all(t in low for t in others):
+            line += text.count("\n", last, start)
+            last = start
+            yield names[line], low
+        pos = text.find(anchor, end)
+
+
+class NameSearchIndex:
+    """名称的子串搜索索引 (物种与分类阶元，数量级为万)
+
+    所有名称规范化后以换行连接成一个字符串，查询时用 str.find 在 C 层定位，
+    只对命中位置做 Python 处理。每个文档可以有多个名称 (中文名、学名、各语言名称)。
+
+    匹配等级 (越小越好):
+        0 某个名称与查询完全相同
+        1 某个名称以查询开头
+        2 查询是某个名称中一个单词的开头
+        3 查询是某个名称的子串
+        4 查询的每个词分别是该文档某个名称的子串
+
+    按等级顺序收集命中的文档 (名称开头 -> 单词开头 -> 任意位置)，达到上限后停止，
+    单个字母这类宽泛查询也只处理前一部分命中，且保留的是等级最好的那些。
+
+    方法:
+        search(query, limit)                    # 返回 ({文档序号: 匹配等级}, 是否完整)
+    """
+    def __init__(self, docs: Iterable[Iterable[str]]):
+        names: List[str] = []
+        self._owners = array("I")
+        # 每个文档的全部名称 (换行连接)，多词查询逐文档核对
+        self._doc_texts: List[str] = []
+        for i, doc in enumerate(docs):
+            doc_names = [name for name in dict.fromkeys(normalize(n) for n in doc) if name]
+            names.extend(doc_names)
+            self._owners.extend([i] * len(doc_names))
+            self._doc_texts.append("\n".join(doc_names))
+        # 开头与结尾各有一个换行，名称 k 从 _starts[k] 开始
+        self._blob = "\n" + "\n".join(names) + "\n"
+        self._starts = array("I", accumulate((len(n) + 1 for n in names[:-1]), initial=1))
+
+    def search(self, query: str, limit: int = MAX_TAXON_HITS) -> Tuple[Dict[int, int], bool]:
+        q = normalize(query)
+        if not q:
+            return {}, True
+        blob, starts, owners = self._blob, self._starts, self._owners
+        tiers: Dict[int, int] = {}
+        # 换行 + 查询：名称开头；空格 + 查询：单词开头；其余位置为一般子串
+        for prefix in ("\n", " ", ""):
+            pattern = prefix + q
+            pos = blob.find(pattern)
+            while pos != -1:
+                hit = pos + len(prefix)
+                if prefix:
+                    tier = (0 if blob[hit + len(q)] == "\n" else 1) if prefix == "\n" else 2
+                elif blob[hit - 1] in "\n ":
+                    # 已在前两轮计入
+                    pos = blob.find(pattern, pos + 1)
+                    continue
+                else:
+                    tier = 3
+                doc = owners[bisect_right(starts, hit) - 1]
+                current = tiers.get(doc)
+                if current is None:
+                    if len(tiers) >= limit:
+                        return tiers, False
+                    tiers[doc] = tier
+                elif tier < current:
+                    tiers[doc] = tier
+                pos = blob.find(pattern, pos + 1)
+
+        tokens = q.split()
+        if len(tokens) > 1:
+            # 各词分别命中：用最长的词定位候选文档，再核对其余的词
+            anchor = max(tokens, key=len)
+            others = [t for t in tokens if t != anchor]
+            doc_texts = self._doc_texts
+            seen: Set[int] = set()
+            pos = blob.find(anchor)
+            while pos != -1:
+                doc = owners[bisect_right(starts, pos) - 1]
+                if doc not in seen and doc not in tiers:
+                    seen.add(doc)
+                    if all(t in doc_texts[doc] for t in others):
+                        if len(tiers) >= limit:
+                            return tiers, False
+                        tiers[doc] = 4
+                pos = blob.find(anchor, pos + 1)
+        return tiers, True
+
+
+class PhotoSearchIndex:
+    """照片路径的倒排索引：词 -> 包含该词的目录
+
+    倒排表只记录到目录一级 (每个词每个目录一项)，查询先由词表得到候选目录，再在
+    候选目录的小写文件名文本 (每个目录一个字符串，登记时生成) 中用 str.find 核对，
+    不在查询时逐个文件名转小写、比较。文件名列表与注册中心共用字符串对象。
+
+    词表所有词以换行连接成文本 (含数字的词另有一份，供纯数字查询)，子串查询用
+    str.find 在 C 层扫描词表而不是扫描全部文件名；查询词匹配的词过多 (如单个数字)
+    时不展开倒排表，直接把全部目录作为候选，由核对阶段按需提前结束。
+
+    增量更新：新照片追加到所在目录并登记其中的词 (add)；删除照片不修改索引，
+    调用方 (DataRegistry.search) 核对命中的照片是否仍已登记，登记次数远超实际
+    照片数时由调用方重建。
+    目录序号只属于本索引，与注册中心的目录序号无关，因此同一索引可以在扫描任务
+    替换注册中心后继续使用。
+
+    成员变量:
+        dirs: List[str]                         # 索引目录序号 -> 目录路径
+        indexed: int                            # 累计登记的文件名数量 (含已删除的)
+
+    方法:
+        add(directory, names)                   # 登记目录下新增的文件名
+        lookup(tokens)                          # 返回 (文件名候选目录, 路径参与匹配的候选目录, 路径匹配全部词的目录)
+        matching_names(directory, tokens)       # 目录中小写后包含全部词的 (文件名, 小写文件名)
+        stats()                                 # 目录/词表规模
+    """
+    def __init__(self):
+        self.dirs: List[str] = []
+        self.indexed = 0
+        self._dir_ids: Dict[str, int] = {}
+        self._lower_dirs: List[str] = []
+        # 每个索引目录的文件名与其小写文本 (换行连接，第 i 行对应第 i 个文件名)
+        self._names: List[List[str]] = []
+        self._texts: List[str] = []
+        # 词 -> 目录序号 (只出现在一个目录时) 或目录序号数组
+        self._postings: Dict[str, Union[int, array]] = {}
+        # 词表文本：全部词 / 含数字等非字母字符的词；_new_terms 为之后新增、尚未并入的词
+        self._terms_text = ""
+        self._digit_terms_text = ""
+        self._new_terms: List[str] = []
+        self._lock = threading.Lock()
+
+    def add(self, directory: str, names: List[str]):
+        with self._lock:
+            d = self._dir_ids.get(directory)
+            if d is None:
+                d = self._dir_ids[directory] = len(self.dirs)
+                self.dirs.append(directory)
+                self._lower_dirs.append(directory.lower())
+                self._names.append([])
+                self._texts.append("")
+            known = self._names[d]
+            if known:
+                # 删除后重新出现的文件仍在索引中
+                existing = set(known)
+                names = [name for name in names if name not in existing]
+            if not names:
+                return
+            lowered = "\n".join(names).lower()
+            known.extend(names)
+            self._texts[d] = self._texts[d] + "\n" + lowered if self._texts[d] else lowered
+            self.indexed += len(names)
+            terms = set(lowered.translate(_SEPARATOR_TABLE).split())
+            postings = self._postings
+            for term in terms:
+                p = postings.get(term)
+                if p is None:
+                    postings[term] = d
+                    self._new_terms.append(term)
+                elif type(p) is int:
+                    if p != d:
+                        postings[term] = array("I", (p, d))
+                elif p[-1] != d and d not in p:
+                    p.append(d)
+
+    def lookup(self, tokens: List[str]) -> Tuple[List[str], List[str], List[str]]:
+        """查询词 (tokenize 的结果) -> 三组候选目录，均按登记顺序排列
+
+            name_dirs   每个词都出现在该目录的某些文件名中 (可能已过期)
+            path_dirs   每个词出现在目录路径或文件名中，且至少一个词出现在目录路径中
+            dir_matches 目录路径包含全部词
+        """
+        with self._lock:
+            self._refresh_vocabulary()
+            n_dirs = len(self.dirs)
+            lower_dirs = self._lower_dirs
+            name_sets = [self._dirs_with(token) for token in tokens]
+            path_sets = [{d for d, path in enumerate(lower_dirs) if token in path} for token in tokens]
+            dirs = self.dirs
+
+        def intersect(sets: List[Optional[Set[int]]], universe: Iterable[int]) -> List[int]:
+            bounded = sorted((s for s in sets if s is not None), key=len)
+            if not bounded:
+                return list(universe)
+            return sorted(bounded[0].intersection(*bounded[1:]))
+
+        name_dirs = intersect(name_sets, range(n_dirs))
+        in_path = set().union(*path_sets)
+        either = [None if names is None else names | paths for names, paths in zip(name_sets, path_sets)]
+        path_dirs = intersect(either + [in_path], ())
+        dir_matches = intersect(path_sets, ())
+        return [dirs[d] for d in name_dirs], [dirs[d] for d in path_dirs], [dirs[d] for d in dir_matches]
+
+    def matching_names(self, directory: str, tokens: List[str]) -> Iterator[Tuple[str, str]]:
+        with self._lock:
+            d = self._dir_ids.get(directory)
+            if d is None:
+                return iter(())
+            names, text = self._names[d], self._texts[d]
+        return _matching_lines(names, text, tokens)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"directories": len(self.dirs), "terms": len(self._postings), "indexed": self.indexed}
+
+    def _refresh_vocabulary(self):
+        """新词较多时把全部词重新拼成词表文本，调用方需持有 _lock"""
+        if len(self._new_terms) <= VOCABULARY_REBUILD_THRESHOLD:
+            return
+        terms = list(self._postings)
+        self._terms_text = "\n".join(terms)
+        self._digit_terms_text = "\n".join(t for t in terms if not t.isalpha())
+        self._new_terms = []
+
+    def _matching_terms(self, token: str) -> Iterable[str]:
+        """包含 token 的词，调用方需持有 _lock"""
+        # 纯数字的查询词只可能出现在含数字的词中
+        text = self._digit_terms_text if token.isdigit() else self._terms_text
+        pos = text.find(token)
+        while pos != -1:
+            start = text.rfind("\n", 0, pos) + 1
+            end = text.find("\n", pos)
+            if end == -1:
+                end = len(text)
+            yield text[start:end]
+            pos = text.find(token, end)
+        for term in self._new_terms:
+            if token in term:
+                yield term
+
+    def _dirs_with(self, token: str) -> Optional[Set[int]]:
+        """文件名中含 token 的目录序号；匹配的词过多时返回 None (全部目录)，调用方需持有 _lock"""
+        # 先在 C 层计数 (出现次数不少于匹配的词数)，避免逐个展开大量的词
+        text = self._digit_terms_text if token.isdigit() else self._terms_text
+        if text.count(token) > MAX_EXPANDED_TERMS:
+            return None
+        postings = self._postings
+        dirs: Set[int] = set()
+        for i, term in enumerate(self._matching_terms(token)):
+            if i >= MAX_EXPANDED_TERMS:
+                return None
+            p = postings[term]
+            if type(p) is int:
+                dirs.add(p)
+            else:
+                dirs.update(p)
+        return dirs
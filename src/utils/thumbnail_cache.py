@@ -0,0 +1,112 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Tuple
+
+# 写入中途崩溃遗留的临时文件 (*.tmp) 超过该时长 (秒) 后在启动时删除；
+# 更新的临时文件可能属于共用缓存目录的其他 worker 进程，保留不动
+STALE_TMP_SECONDS = 600
+
+
+class ThumbnailCache:
+    """有容量上限的缩略图缓存索引 (LRU)
+
+    缓存键由原图路径、mtime 与 size 共同生成，原图被编辑后自动换用新键；
+    命中判断只查内存索引，不再为每次请求调用 Path.exists。超出字节预算时
+    按最近最少使用顺序删除缓存文件。启动时顺带清理写入中途崩溃遗留的临时文件。
+
+    成员变量:
+        cache_dir: Path                         # 缓存目录
+        max_bytes: int                          # 缓存总字节预算
+        _index: OrderedDict[str, int]           # 缓存文件名 -> 字节数，末尾为最近使用
+
+    方法:
+        path_for_source(src_path)               # 原图对应的缓存路径 (会 stat 原图)
+        lookup(src_path)                        # 返回 (缓存路径, 是否命中)
+        record(cache_path)                      # 登记新生成的缓存文件并按预算淘汰
+        stats()                                 # 命中/未命中/淘汰/清理的临时文件统计
+    """
+    def __init__(self, cache_dir: Path, max_bytes: int = 512 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._counts = {"hits": 0, "misses": 0, "evictions": 0, "stale_tmp_removed": 0}
+        self._load_index()
+
+    def _load_index(self):
+        """启动时扫描一次缓存目录，按访问时间从旧到新建立 LRU 顺序，并删除过期的临时文件"""
+        entries = []
+        stale_before = time.time() - STALE_TMP_SECONDS
+        for entry in os.scandir(self.cache_dir):
+            if not entry.is_file():
+                continue
+            if entry.name.endswith(".jpg"):
+                stat = entry.stat()
+                entries.append((max(stat.st_atime, stat.st_mtime), entry.name, stat.st_size))
+            elif entry.name.endswith(".tmp"):
+                try:
+                    if entry.stat().st_mtime < stale_before:
+                        os.remove(entry.path)
+                        self._counts["stale_tmp_removed"] += 1
+                except OSError:
+                    pass
+        for _, name, size in sorted(entries):
+            self._index[name] = size
+            self._total_bytes += size
+        with self._lock:
+            self._evict()
+
+    def path_for_source(self, src_path: str) -> Path:
+        """根据原图路径与 mtime/size 生成缓存路径，原图不存在时抛出 OSError"""
+        stat = os.stat(src_path)
+        key = hashlib.md5(f"{src_path}|{stat.st_mtime_ns}|{stat.st_size}".encode()).hexdigest()
+        return self.cache_dir / f"{key}.jpg"
+
+    def lookup(self, src_path: str) -> Tuple[Path, bool]:
+        """查询缓存：返回 (缓存路径, 是否命中)，命中时刷新 LRU 顺序"""
+        cache_path = self.path_for_source(src_path)
+        with self._lock:
+            if cache_path.name in self._index:
+                self._index.move_to_end(cache_path.name)
+                self._counts["hits"] += 1
+                return cache_path, True
+            self._counts["misses"] += 1
+            return cache_path, False
+
+    def record(self, cache_path: Path):
+        """登记新生成的缓存文件，超出预算时淘汰最久未用的文件"""
+        cache_path = Path(cache_path)
+        try:
+            size = cache_path.stat().st_size
+        except OSError:
+            return
+        with self._lock:
+            self._total_bytes += size - self._index.pop(cache_path.name, 0)
+            self._index[cache_path.name] = size
+            self._evict()
+
+    def _evict(self):
+        """调用方需持有 _lock；最新登记的文件不会被淘汰"""
+        while self._total_bytes > self.max_bytes and len(self._index) > 1:
+            name, size = self._index.popitem(last=False)
+            self._total_bytes -= size
+            self._counts["evictions"] += 1
+            try:
+                os.remove(self.cache_dir / name)
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(
+                self._counts,
+                entries=len(self._index),
+                bytes=self._total_bytes,
+                max_bytes=self.max_bytes,
+            )
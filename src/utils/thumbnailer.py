@@ -0,0 +1,264 @@
+import asyncio
+import io
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+from PIL import Image
+from src.utils.thumbnail_cache import ThumbnailCache
+from src.utils.raw_preview import extract_preview
+from src.utils.metrics import METRICS
+
+# 缩略图默认尺寸
+THUMBNAIL_SIZE = (200, 200)
+# PIL 无法直接解码、只能使用内嵌预览的 RAW 格式
+RAW_EXTENSIONS = ('.raw', '.arw', '.cr2', '.nef', '.dng')
+
+
+def open_source_image(src_path: str, size: Tuple[int, int]) -> Image.Image:
+    """打开用于生成缩略图的图像，优先使用内嵌预览
+
+    RAW 使用内嵌 JPEG 预览 (不论大小)；JPEG 仅在 EXIF 缩略图足够大时使用；
+    其余情况回退到 Image.open 原图。
+    """
+    name = src_path.lower()
+    if name.endswith(RAW_EXTENSIONS):
+        data = extract_preview(src_path, size)
+    elif name.endswith(('.jpg', '.jpeg')):
+        data = extract_preview(src_path, size, allow_smaller=False)
+    else:
+        data = None
+    if data:
+        return Image.open(io.BytesIO(data))
+    return Image.open(src_path)
+
+
+def generate_thumbnail(src_path: str, cache_path: str, size: Tuple[int, int] = THUMBNAIL_SIZE) -> str:
+    """生成 JPEG 缩略图并写入 cache_path，在工作进程中执行
+
+    RAW/JPEG 优先读取内嵌预览；之后用 draft() 让 JPEG 解码器按 1/2~1/8 比例
+    直接缩小解码，再由 thumbnail() 的 reducing_gap 走 reduce() 快速降采样，
+    最后才转换色彩模式，避免全尺寸解码。
+    """
+    with open_source_image(src_path, size) as img:
+        img.draft("RGB", (size[0] * 2, size[1] * 2))
+        img.thumbnail(size, reducing_gap=2.0)
+        # RGB
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        # 先写临时文件再替换，读者不会看到写了一半的缓存
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            img.save(tmp_path, "JPEG", quality=85)
+        except BaseException:
+            # 编码失败时不留下临时文件；进程崩溃遗留的由 ThumbnailCache 启动时清理
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+    os.replace(tmp_path, cache_path)
+    return cache_path
+
+
+class ThumbnailService:
+    """缩略图生成服务：进程池 + 有界队列 + 同路径请求合并
+
+    成员变量:
+        max_pending: int                        # 同时排队/执行的任务上限，超出时提交方阻塞等待
+        stats: Dict[str, int]                   # generated / failed / collapsed 计数
+        cache: Optional[ThumbnailCache]         # 生成成功后登记到该缓存索引
+
+    方法:
+        submit(src_path, cache_path)            # 线程安全提交任务，返回 concurrent Future
+        generate(src_path, cache_path)          # 异步等待缩略图生成，不阻塞事件循环
+        shutdown()                              # 关闭进程池
+    """
+    def __init__(self, max_workers: Optional[int] = None, max_pending: int = 64,
+                 size: Tuple[int, int] = THUMBNAIL_SIZE, executor: Optional[Executor] = None,
+                 cache: Optional[ThumbnailCache] = None):
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.max_pending = max_pending
+        self.size = size
+        self.cache = cache
+        self.stats = {"generated": 0, "failed": 0, "collapsed": 0}
+        self._executor = executor
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.RLock()
+
+    def _pool(self) -> Executor:
+        """首次使用时才启动进程池"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    def submit(self, src_path: str, cache_path: str) -> Future:
+        """提交缩略图任务；同一 cache_path 正在生成时直接复用该任务
+
+        队列已满时阻塞直到有空位，因此不要在事件循环线程中直接调用。
+        """
+        cache_path = str(cache_path)
+        with self._lock:
+            future = self._inflight.get(cache_path)
+            if future is not None:
+                self.stats["collapsed"] += 1
+                return future
+
+        self._slots.acquire()
+        try:
+            with self._lock:
+                # 等待空位期间可能已有相同任务被提交
+                future = self._inflight.get(cache_path)
+                if future is not None:
+                    self._slots.release()
+                    self.stats["collapsed"] += 1
+                    return future
+                future = self._pool().submit(generate_thumbnail, src_path, cache_path, self.size)
+                self._inflight[cache_path] = future
+        except Exception:
+            self._slots.release()
+            raise
+        started = time.perf_counter()
+        future.add_done_callback(lambda f, key=cache_path: self._done(key, f, started))
+        return future
+
+    def _done(self, cache_path: str, future: Future, started: float):
+        with self._lock:
+            if self._inflight.get(cache_path) is future:
+                del self._inflight[cache_path]
+            failed = future.cancelled() or future.exception() is not None
+            self.stats["failed" if failed else "generated"] += 1
+        self._slots.release()
+        METRICS.observe("bird_thumbnail_seconds", time.perf_counter() - started,
+                        result="failed" if failed else "generated")
+        if not failed and self.cache is not None:
+            self.cache.record(Path(cache_path))
+
+    async def generate(self, src_path: str, cache_path: Path) -> Path:
+        """异步生成缩略图，排队等待在默认线程池中进行，事件循环保持空闲"""
+        loop = asyncio.get_running_loop()
+        future = await loop.run_in_executor(None, self.submit, src_path, str(cache_path))
+        await asyncio.wrap_future(future)
+        return Path(cache_path)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+class ThumbnailPrewarmer:
+    """扫描期间在后台预生成缩略图 (低优先级)
+
+    后台线程从队列中取出照片，同一时刻最多只占用 concurrency 个
+    ThumbnailService 任务位，用户浏览时触发的缩略图请求不会被长时间挤占。
+    缓存路径与命中判断由 ThumbnailCache 提供，与 /api/thumbnail 保持一致。
+    进度按 key (扫描任务 ID) 分别统计，并发或重复提交的任务互不影响；
+    只保留最近 max_tracked 个 key 的进度。
+
+    方法:
+        enqueue(paths, key)                     # 加入待预热的原图路径，计入 key 的进度
+        cancel()                                # 丢弃队列中尚未开始的任务
+        progress(key)                           # 返回 key 的 prewarm_total / prewarmed / prewarm_failed
+    """
+    def __init__(self, service: ThumbnailService, cache: ThumbnailCache, concurrency: int = 1,
+                 max_tracked: int = 64):
+        self.service = service
+        self.cache = cache
+        self.max_tracked = max_tracked
+        self._queue: "queue.Queue[Tuple[str, str]]" = queue.Queue()
+        self._slots = threading.BoundedSemaphore(max(1, concurrency))
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._cancelled = threading.Event()
+        self._counts: "OrderedDict[str, Dict[str, int]]" = OrderedDict()
+
+    def enqueue(self, paths: Iterable[str], key: str = ""):
+        """加入待预热路径，计入 key 的进度，必要时启动后台线程"""
+        paths = list(paths)
+        if not paths:
+            return
+        with self._lock:
+            self._cancelled.clear()
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = {"prewarm_total": 0, "prewarmed": 0, "prewarm_failed": 0}
+                while len(self._counts) > self.max_tracked:
+                    self._counts.popitem(last=False)
+            counts["prewarm_total"] += len(paths)
+            for path in paths:
+                self._queue.put((key, path))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="thumbnail-prewarm", daemon=True)
+                self._thread.start()
+
+    def cancel(self) -> int:
+        """取消预热：清空队列 (正在生成的任务会继续完成)，返回丢弃的数量"""
+        self._cancelled.set()
+        dropped: Dict[str, int] = {}
+        while True:
+            try:
+                key, _ = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            dropped[key] = dropped.get(key, 0) + 1
+        with self._lock:
+            for key, count in dropped.items():
+                if key in self._counts:
+                    self._counts[key]["prewarm_total"] -= count
+        return sum(dropped.values())
+
+    def progress(self, key: Optional[str] = "") -> Dict[str, int]:
+        """key 的预热进度，未预热过的 key 为全 0"""
+        with self._lock:
+            counts = self._counts.get(key)
+            return dict(counts) if counts else {"prewarm_total": 0, "prewarmed": 0, "prewarm_failed": 0}
+
+    def _run(self):
+        while True:
+            try:
+                key, path = self._queue.get(timeout=1.0)
+            except queue.Empty:
+                with self._lock:
+                    # 持锁确认队列为空后再退出，避免与 enqueue 竞争导致任务滞留
+                    if self._queue.empty():
+                        self._thread = None
+                        return
+                continue
+            if self._cancelled.is_set():
+                continue
+            try:
+                cache_path, hit = self.cache.lookup(path)
+            except OSError:
+                # 原图在扫描后已被移走
+                self._finish(key, failed=True)
+                continue
+            if hit:
+                self._finish(key, failed=False)
+                continue
+            self._slots.acquire()
+            try:
+                future = self.service.submit(path, str(cache_path))
+            except Exception:
+                self._slots.release()
+                self._finish(key, failed=True)
+                continue
+            future.add_done_callback(lambda f, key=key: self._job_done(key, f))
+
+    def _job_done(self, key: str, future: Future):
+        self._slots.release()
+        self._finish(key, failed=future.cancelled() or future.exception() is not None)
+
+    def _finish(self, key: str, failed: bool):
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is not None:
+                counts["prewarm_failed" if failed else "prewarmed"] += 1
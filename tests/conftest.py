@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+from typing import Iterable, Tuple
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models.birds import BirdSpecies, DataRegistry
+
+# (目, 科, 学名, 中文名)
+SPECIES = [
+    ("Pelecaniformes", "Ardeidae", "Egretta garzetta", "小白鹭"),
+    ("Pelecaniformes", "Ardeidae", "Ardea alba", "大白鹭"),
+    ("Passeriformes", "Pycnonotidae", "Pycnonotus sinensis", "白头鹎"),
+]
+
+
+def make_registry(species: Iterable[Tuple[str, str, str, str]] = SPECIES, match_mode: str = "exact") -> DataRegistry:
+    """按 (目, 科, 学名, 中文名) 建立注册中心，与 IOCDataLoader 的登记方式一致"""
+    registry = DataRegistry()
+    registry.match_mode = match_mode
+    for order, family, latin, chinese in species:
+        registry.add_species(BirdSpecies(
+            id=latin, order=order, family=family, genus=latin.split()[0],
+            scientific_name=latin, chinese_name=chinese, search_keys=[chinese, latin.lower()],
+        ))
+    return registry
+
+
+# Multiling IOC 表的行 (目, 科, 学名, 中文名, 英文名, 德文名)，含一个空行与需要 strip 的中文名
+IOC_ROWS = [
+    ("PELECANIFORMES", "Ardeidae", "Egretta garzetta", "小白鹭", "Little Egret", "Seidenreiher"),
+    ("PELECANIFORMES", "Ardeidae", "Ardea alba", "大白鹭", "Great Egret", "Silberreiher"),
+    (None, None, None, None, None, None),
+    ("PASSERIFORMES", "Pycnonotidae", "Pycnonotus sinensis", " 白头鹎 ", "Light-vented Bulbul", None),
+]
+
+
+def write_ioc_xlsx(path, rows=IOC_ROWS):
+    """写出只含 List 表的 Multiling IOC Excel (需要 pandas 与 openpyxl)"""
+    pd = pytest.importorskip("pandas")
+    pytest.importorskip("openpyxl")
+    columns = ["Order", "Family", "IOC_15.1", "Chinese", "English", "German"]
+    pd.DataFrame(rows, columns=columns).to_excel(path, sheet_name="List", index=False)
+    return path
+
+
+def touch(path, data: bytes = b"x") -> str:
+    """写入文件 (含上级目录)，返回字符串路径"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    return str(path)
+
+
+@pytest.fixture
+def registry() -> DataRegistry:
+    return make_registry()
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+from src.utils.aho_corasick import AhoCorasickMatcher
+
+
+def make_matcher(*keys):
+    return AhoCorasickMatcher((key, (species_id, "zh")) for key, species_id in keys)
+
+
+def test_longest_keyword_wins_regardless_of_insertion_order():
+    keys = [("白鹭", "egret"), ("小白鹭", "little-egret")]
+    for ordered in (keys, keys[::-1]):
+        matcher = make_matcher(*ordered)
+        assert matcher.search("2024_小白鹭_001.jpg") == ("little-egret", "zh")
+        assert matcher.search("2024_白鹭_001.jpg") == ("egret", "zh")
+
+
+def test_longer_match_later_in_text_wins():
+    matcher = make_matcher(("白鹭", "egret"), ("白头鹎", "bulbul"))
+    assert matcher.search("白鹭 与 白头鹎.jpg") == ("bulbul", "zh")
+
+
+def test_leftmost_match_wins_on_equal_length():
+    matcher = make_matcher(("白鹭", "egret"), ("苍鹭", "heron"))
+    assert matcher.search("苍鹭和白鹭.jpg") == ("heron", "zh")
+    assert matcher.search("白鹭和苍鹭.jpg") == ("egret", "zh")
+
+
+def test_suffix_of_partial_match_is_found():
+    # "小白" 失配后需沿失配指针落到 "白鹭"
+    matcher = make_matcher(("小白鹭", "little-egret"), ("白鹭", "egret"))
+    assert matcher.search("小白白鹭.jpg") == ("egret", "zh")
+    assert matcher.search("no match.jpg") is None
+
+
+def test_patterns_added_after_search_are_used():
+    matcher = make_matcher(("白鹭", "egret"))
+    assert matcher.search("大白鹭.jpg") == ("egret", "zh")
+    matcher.add("大白鹭", ("great-egret", "zh"))
+    assert matcher.search("大白鹭.jpg") == ("great-egret", "zh")
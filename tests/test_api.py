@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+import importlib
+
+from fastapi.testclient import TestClient
+
+
+def load_api(tmp_path, monkeypatch):
+    """在空的临时目录中重新导入 API 模块 (缓存与索引库都相对于当前目录)"""
+    monkeypatch.chdir(tmp_path)
+    import src.api.main as api
+    return importlib.reload(api)
+
+
+def test_import_builds_no_state(tmp_path, monkeypatch):
+    """spawn 出的工作进程会重新导入主模块：导入时不应加载物种表、打开索引库或创建缓存目录"""
+    api = load_api(tmp_path, monkeypatch)
+    assert api.scan_jobs is None
+    assert api.thumbnail_service is None
+    assert not (tmp_path / ".bird_cache").exists()
+
+
+def test_startup_builds_state(tmp_path, monkeypatch):
+    api = load_api(tmp_path, monkeypatch)
+    with TestClient(api.app) as client:
+        assert client.get("/api/status").json()["status"] == "idle"
+        assert api.scan_jobs is not None
+    assert (tmp_path / ".bird_cache" / "index.db").exists()
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+import importlib
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from conftest import write_ioc_xlsx
+from src.models.birds import taxon_node_id
+
+ROOT = Path(__file__).resolve().parents[1]
+EXCEL_NAME = "Multiling IOC 15.1_d.xlsx"
+
+NAMES = [
+    "/photos/2024/小白鹭_1.jpg",
+    "Little Egret 02.jpg",
+    r"C:\photos\Seidenreiher.NEF",
+    "egreta garzeta.jpg",
+    "unknown.jpg",
+    "/photos/2024/小白鹭_1.jpg",
+]
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    """在临时目录中启动 API (物种表取自当前目录下的 Excel)"""
+    write_ioc_xlsx(tmp_path / EXCEL_NAME)
+    monkeypatch.chdir(tmp_path)
+    import src.api.main as api
+    api = importlib.reload(api)
+    with TestClient(api.app) as client:
+        api.client = client
+        yield api
+
+
+def check_items(items):
+    assert [item["name"] for item in items] == NAMES
+    assert [item["species_id"] for item in items] == [
+        "Egretta garzetta", "Egretta garzetta", "Egretta garzetta", "Egretta garzetta", None, "Egretta garzetta",
+    ]
+    # 各项标注命中名称的语言：中文名、英文名、德文名、模糊匹配的学名
+    assert [item.get("language") for item in items] == ["zh", "en", "de", "la", None, "zh"]
+    assert [item["confidence"] for item in items[:3]] == [1.0, 1.0, 1.0]
+    assert 0.55 <= items[3]["confidence"] < 1.0
+    assert items[4] == {"name": "unknown.jpg", "species_id": None, "confidence": 0.0}
+    taxonomy = ["PELECANIFORMES", "Ardeidae", "Egretta", "小白鹭 Egretta garzetta"]
+    assert items[0]["taxonomy"] == taxonomy
+    assert items[0]["node_id"] == taxon_node_id(taxonomy)
+    assert items[0]["chinese_name"] == "小白鹭"
+
+
+def test_classify_batch(api):
+    response = api.client.post("/api/classify", json={"names": NAMES})
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["total"], body["matched"]) == (6, 5)
+    check_items(body["items"])
+
+
+def test_classify_batch_limit(api, monkeypatch):
+    monkeypatch.setattr(api, "MAX_CLASSIFY_NAMES", 2)
+    assert api.client.post("/api/classify", json={"names": NAMES[:3]}).status_code == 413
+    assert api.client.post("/api/classify", json={"names": NAMES[:2]}).status_code == 200
+
+
+def test_classify_stream_framing(api, monkeypatch):
+    # 小批量：结果跨多个批次输出
+    monkeypatch.setattr(api, "CLASSIFY_BATCH_SIZE", 4)
+    lines = [
+        json.dumps(NAMES[0], ensure_ascii=False),
+        json.dumps({"name": NAMES[1]}),
+        "",
+        json.dumps({"path": NAMES[2]}),
+        NAMES[3],                                       # 不是 JSON 的纯文本行
+        "   ",
+        "[1, 2]",                                       # 无法识别的 JSON 行被跳过
+        NAMES[4],
+    ]
+    body = "\r\n".join(lines) + "\n" + json.dumps(NAMES[5], ensure_ascii=False)  # 末行没有换行符
+    response = api.client.post("/api/classify/stream", content=body.encode("utf-8"),
+                               headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    text = response.text
+    assert text.endswith("\n")
+    items = [json.loads(line) for line in text.split("\n")[:-1]]
+    check_items(items)
+
+
+def test_classify_stream_empty(api):
+    response = api.client.post("/api/classify/stream", content=b"\n\n")
+    assert response.status_code == 200 and response.text == ""
+
+
+def test_cli_reads_stdin(tmp_path):
+    excel = write_ioc_xlsx(tmp_path / "ioc.xlsx")
+    command = [sys.executable, str(ROOT / "classify.py"), "--excel", str(excel), "--languages", "zh,en,de"]
+    stdin = "\n".join(NAMES) + "\r\n\n"
+    result = subprocess.run(command, input=stdin, cwd=tmp_path, capture_output=True, text=True,
+                            encoding="utf-8", check=True)
+    lines = result.stdout.split("\n")
+    assert lines[-1] == ""
+    check_items([json.loads(line) for line in lines[:-1]])
+
+    matched_only = subprocess.run(command + ["--matched-only", "--mode", "exact"], input=stdin, cwd=tmp_path,
+                                  capture_output=True, text=True, encoding="utf-8", check=True)
+    items = [json.loads(line) for line in matched_only.stdout.splitlines()]
+    # exact 模式不识别拼错的学名；未匹配的行不输出
+    assert [item["name"] for item in items] == [NAMES[0], NAMES[1], NAMES[2], NAMES[5]]
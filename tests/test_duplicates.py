@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+import time
+
+from conftest import make_registry, touch
+from src.data.photo_store import PhotoIndexStore
+from src.utils.data_converter import DataConverter
+from src.utils.duplicates import DuplicateFinder
+from src.utils.scan_jobs import ScanJobManager
+
+
+def species_node(registry, path):
+    """照片所在的种级节点"""
+    return next(node for node in registry.node_by_id.values()
+                if node.photos and any(p == path for _, p in node.photos.page(0, len(node.photos))))
+
+
+def test_finder_groups_identical_content(tmp_path):
+    a = touch(tmp_path / "a.jpg", b"same bytes")
+    b = touch(tmp_path / "b.jpg", b"same bytes")
+    c = touch(tmp_path / "c.jpg", b"diff bytes")
+    d = touch(tmp_path / "d.jpg", b"unique size")
+    finder = DuplicateFinder(workers=2)
+    candidates = [(path, len(open(path, "rb").read()), None, None) for path in (a, b, c, d)]
+
+    assert sorted(map(sorted, finder.find(candidates))) == [[a, b]]
+    # 大小唯一的文件不计算哈希
+    assert d not in {path for _, _, path in finder.computed}
+
+
+def test_dedupe_job_stages_duplicates_into_tree(tmp_path):
+    kept = touch(tmp_path / "photos" / "小白鹭_1.jpg", b"egret")
+    copy = touch(tmp_path / "photos" / "小白鹭_2.jpg", b"egret")  # 按路径排序在后，为副本
+    other = touch(tmp_path / "photos" / "大白鹭_1.jpg", b"great")
+    store = PhotoIndexStore(tmp_path / "index.db")
+    manager = ScanJobManager(make_registry(), store=store)
+
+    job, _ = manager.submit([str(tmp_path / "photos")], dedupe=True)
+    while job.active:
+        time.sleep(0.01)
+
+    live = manager.registry
+    assert job.status == "completed" and job.duplicates == 1
+    assert live.duplicate_groups() == [[kept, copy]]
+    assert live.duplicate_of(copy) == kept and live.duplicate_of(kept) is None
+    assert live.get_photo(other) is not None and live.duplicate_of(other) is None
+    assert store.sizes([kept, other, str(tmp_path / "missing.jpg")]) == {kept: 5, other: 5}
+
+    # 副本仍列在物种节点下 (total)，但不计入分类树计数 (photocount)
+    node = species_node(live, kept)
+    page = DataConverter.to_photo_page(node, 0, 10, live.duplicate_of)
+    assert (page["total"], page["photocount"]) == (2, 1)
+    assert {item["path"]: item["duplicate_of"] for item in page["items"]} == {kept: None, copy: kept}
+    assert live.tree_root.total_photos == 2
+
+    # 保留的照片被删除后由副本接替计数
+    live.remove_photo(kept)
+    assert live.duplicate_groups() == [] and live.duplicate_of(copy) is None
+    assert species_node(live, copy).total_photos == 1
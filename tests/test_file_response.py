@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.utils.file_response import ConditionalFileResponse, RangeNotSatisfiable, file_etag, parse_range
+
+DATA = bytes(range(256)) * 4  # 1024 字节
+
+
+@pytest.fixture
+def client(tmp_path):
+    path = tmp_path / "photo.jpg"
+    path.write_bytes(DATA)
+    app = FastAPI()
+
+    @app.get("/file")
+    def get_file():
+        return ConditionalFileResponse(str(path))
+
+    with TestClient(app) as client:
+        client.etag = file_etag(os.stat(path))
+        yield client
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=1000-", (1000, 1023)),             # 开放区间
+    ("bytes=-24", (1000, 1023)),               # 后缀区间
+    ("bytes=-5000", (0, 1023)),                # 后缀长于文件
+    ("bytes=1000-5000", (1000, 1023)),         # 终点截断到文件末尾
+    ("bytes=0-9,20-29", None),                 # 多区间：忽略 Range
+    ("bytes=9-0", None),
+    ("items=0-9", None),
+    ("bytes=a-b", None),
+    ("bytes=-", None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, len(DATA)) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=1024-", "bytes=2000-3000", "bytes=-0"])
+def test_parse_range_unsatisfiable(header):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range(header, len(DATA))
+
+
+def test_full_response_with_validators(client):
+    response = client.get("/file")
+    assert response.status_code == 200
+    assert response.content == DATA
+    assert response.headers["etag"] == client.etag
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["content-length"] == str(len(DATA))
+
+
+@pytest.mark.parametrize("header, start, end", [
+    ("bytes=-24", 1000, 1023),
+    ("bytes=1000-", 1000, 1023),
+    ("bytes=10-19", 10, 19),
+])
+def test_partial_content(client, header, start, end):
+    response = client.get("/file", headers={"Range": header})
+    assert response.status_code == 206
+    assert response.content == DATA[start:end + 1]
+    assert response.headers["content-range"] == f"bytes {start}-{end}/{len(DATA)}"
+    assert response.headers["content-length"] == str(end - start + 1)
+
+
+def test_multi_range_returns_whole_file(client):
+    response = client.get("/file", headers={"Range": "bytes=0-9,20-29"})
+    assert response.status_code == 200
+    assert response.content == DATA
+
+
+def test_unsatisfiable_range(client):
+    response = client.get("/file", headers={"Range": "bytes=5000-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(DATA)}"
+    assert response.content == b""
+
+
+def test_if_range(client):
+    current = client.get("/file", headers={"Range": "bytes=0-9", "If-Range": client.etag})
+    assert current.status_code == 206 and current.content == DATA[:10]
+    # 过期的 ETag 或弱 ETag (If-Range 只做强比较)：返回整个文件
+    for validator in ('"stale"', "W/" + client.etag):
+        stale = client.get("/file", headers={"Range": "bytes=0-9", "If-Range": validator})
+        assert stale.status_code == 200 and stale.content == DATA
+
+
+@pytest.mark.parametrize("validator", ["{etag}", "W/{etag}", '"other", W/{etag}', "*"])
+def test_if_none_match_weak_comparison(client, validator):
+    response = client.get("/file", headers={"If-None-Match": validator.format(etag=client.etag)})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == client.etag
+
+
+def test_if_none_match_mismatch_ignores_if_modified_since(client):
+    last_modified = client.get("/file").headers["last-modified"]
+    response = client.get("/file", headers={"If-None-Match": '"other"', "If-Modified-Since": last_modified})
+    assert response.status_code == 200
+    assert client.get("/file", headers={"If-Modified-Since": last_modified}).status_code == 304
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+
+from conftest import SPECIES, make_registry, touch
+from src.data.photo_store import PhotoIndexStore
+from src.utils.file_scanner import FileScanner
+
+
+def scan(registry, root, store, workers=1):
+    return FileScanner(registry, workers=workers, store=store).scan_directory(str(root))
+
+
+def deny_listing(monkeypatch, denied):
+    """让 os.scandir 对 denied 目录抛出 PermissionError"""
+    scandir = os.scandir
+
+    def guarded(path="."):
+        if os.path.abspath(path) == str(denied):
+            raise PermissionError(13, "Permission denied", str(path))
+        return scandir(path)
+
+    monkeypatch.setattr(os, "scandir", guarded)
+
+
+def test_rescan_reuses_unchanged_matches(tmp_path):
+    touch(tmp_path / "photos" / "小白鹭_1.jpg")
+    touch(tmp_path / "photos" / "unknown.jpg")
+    store = PhotoIndexStore(tmp_path / "index.db")
+
+    assert scan(make_registry(), tmp_path / "photos", store) == (2, 1)
+    registry = make_registry()
+    assert scan(registry, tmp_path / "photos", store) == (2, 1)
+    assert [p.matched_species_id for p in registry.iter_photos()] == ["Egretta garzetta"]
+
+
+def test_rescan_with_species_removed_from_table(tmp_path):
+    """保存的物种 ID 已不在新物种表中：重新匹配，而不是登记不存在的物种"""
+    egret = touch(tmp_path / "photos" / "小白鹭_1.jpg")
+    bulbul = touch(tmp_path / "photos" / "白头鹎_1.jpg")
+    store = PhotoIndexStore(tmp_path / "index.db")
+    scan(make_registry(), tmp_path / "photos", store)
+
+    registry = make_registry([s for s in SPECIES if s[2] != "Egretta garzetta"])
+    assert scan(registry, tmp_path / "photos", store) == (2, 1)
+    assert not registry.has_photo(egret)
+    assert registry.get_photo(bulbul).matched_species_id == "Pycnonotus sinensis"
+    assert store.snapshot(str(tmp_path / "photos"))[egret][1] is None
+
+
+def test_rescan_with_species_renamed_in_table(tmp_path):
+    """学名变更后，沿用旧 ID 的文件按新表重新匹配到新 ID"""
+    egret = touch(tmp_path / "photos" / "小白鹭_1.jpg")
+    store = PhotoIndexStore(tmp_path / "index.db")
+    scan(make_registry(), tmp_path / "photos", store)
+
+    renamed = [("Pelecaniformes", "Ardeidae", "Egretta nigripes", "小白鹭")] + SPECIES[1:]
+    registry = make_registry(renamed)
+    scan(registry, tmp_path / "photos", store)
+    assert registry.get_photo(egret).matched_species_id == "Egretta nigripes"
+    assert registry.tree_root.photo_count == 1
+
+
+def test_rescan_after_language_disabled(tmp_path):
+    """通过德语名称匹配的文件在停用 'de' 后，重新扫描与启动恢复都不再归类"""
+    heron = touch(tmp_path / "photos" / "Seidenreiher_1.jpg")
+    store = PhotoIndexStore(tmp_path / "index.db")
+    with_de = make_registry()
+    with_de.add_names("de", [("Seidenreiher", "Egretta garzetta")])
+    scan(with_de, tmp_path / "photos", store)
+    assert with_de.has_photo(heron)
+
+    restored = make_registry()
+    assert store.restore(restored) == 0
+    assert not restored.has_photo(heron)
+
+    registry = make_registry()
+    assert scan(registry, tmp_path / "photos", store) == (1, 0)
+    assert store.snapshot(str(tmp_path / "photos"))[heron][1] is None
+
+
+def test_rescan_after_match_mode_switch(tmp_path):
+    """fuzzy 模式下的匹配在切换到 exact 后失效，切回 fuzzy 后恢复"""
+    egret = touch(tmp_path / "photos" / "egretta_garzetta_1.jpg")
+    store = PhotoIndexStore(tmp_path / "index.db")
+    fuzzy = make_registry(match_mode="fuzzy")
+    assert scan(fuzzy, tmp_path / "photos", store) == (1, 1)
+
+    exact = make_registry()
+    assert scan(exact, tmp_path / "photos", store) == (1, 0)
+    assert not exact.has_photo(egret)
+
+    # 指纹已记录在索引库中，重新打开后仍然有效
+    store.close()
+    store = PhotoIndexStore(tmp_path / "index.db")
+    assert store.match_fingerprint == exact.match_fingerprint()
+    restored = make_registry(match_mode="fuzzy")
+    assert store.restore(restored) == 1
+    assert restored.get_photo(egret).matched_species_id == "Egretta garzetta"
+
+
+def test_sync_matches_keeps_signatures_and_hashes(tmp_path):
+    touch(tmp_path / "photos" / "egretta_garzetta_1.jpg")
+    store = PhotoIndexStore(tmp_path / "index.db")
+    scan(make_registry(match_mode="fuzzy"), tmp_path / "photos", store)
+    path = str(tmp_path / "photos" / "egretta_garzetta_1.jpg")
+    store.save_hashes([(b"edge", b"full", path)])
+    before = store.snapshot(str(tmp_path / "photos"))[path][0]
+
+    assert store.sync_matches(make_registry()) == 1
+    assert store.sync_matches(make_registry()) == 0
+    assert store.snapshot(str(tmp_path / "photos"))[path] == (before, None)
+    assert store.sync_matches(make_registry(match_mode="fuzzy")) == 1
+    with store._lock:
+        assert store._conn.execute("SELECT edge_hash, content_hash FROM photos").fetchone() == (b"edge", b"full")
+
+
+def test_rescan_picks_up_species_added_to_table(tmp_path):
+    egret = touch(tmp_path / "photos" / "小白鹭_1.jpg")
+    store = PhotoIndexStore(tmp_path / "index.db")
+    assert scan(make_registry(SPECIES[1:]), tmp_path / "photos", store) == (1, 0)
+
+    registry = make_registry()
+    assert scan(registry, tmp_path / "photos", store) == (1, 1)
+    assert registry.get_photo(egret).matched_species_id == "Egretta garzetta"
+
+
+def test_rescan_picks_up_matches_after_switch_to_fuzzy(tmp_path):
+    egret = touch(tmp_path / "photos" / "egretta_garzetta_1.jpg")
+    store = PhotoIndexStore(tmp_path / "index.db")
+    assert scan(make_registry(), tmp_path / "photos", store) == (1, 0)
+
+    registry = make_registry(match_mode="fuzzy")
+    assert scan(registry, tmp_path / "photos", store) == (1, 1)
+    assert registry.get_photo(egret).matched_species_id == "Egretta garzetta"
+
+
+def test_rescan_without_changes_matches_nothing(tmp_path, monkeypatch):
+    touch(tmp_path / "photos" / "小白鹭_1.jpg")
+    touch(tmp_path / "photos" / "unknown.jpg")
+    store = PhotoIndexStore(tmp_path / "index.db")
+    scan(make_registry(), tmp_path / "photos", store)
+
+    registry = make_registry()
+    calls = []
+    monkeypatch.setattr(registry, "match_file", lambda name: calls.append(name))
+    assert scan(registry, tmp_path / "photos", store) == (2, 1)
+    assert calls == []
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_unlistable_directory_keeps_indexed_photos(tmp_path, monkeypatch, workers):
+    """子目录暂时无法列出时，其下已索引的照片不视为删除"""
+    kept = touch(tmp_path / "photos" / "nas" / "sub" / "小白鹭_1.jpg")
+    gone = touch(tmp_path / "photos" / "大白鹭_1.jpg")
+    store = PhotoIndexStore(tmp_path / "index.db")
+    scan(make_registry(), tmp_path / "photos", store, workers=workers)
+
+    os.remove(gone)
+    deny_listing(monkeypatch, tmp_path / "photos" / "nas")
+    registry = make_registry()
+    store.restore(registry)
+    assert scan(registry, tmp_path / "photos", store, workers=workers) == (0, 0)
+
+    assert registry.has_photo(kept)
+    assert not registry.has_photo(gone)
+    assert set(store.snapshot(str(tmp_path / "photos"))) == {kept}
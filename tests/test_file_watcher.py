@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+import time
+
+from conftest import make_registry, touch
+from src.data.photo_store import PhotoIndexStore
+from src.utils import file_watcher
+from src.utils.file_watcher import FolderWatcher
+from src.utils.scan_jobs import ScanJobManager
+
+
+def make_watcher(tmp_path, store=None):
+    jobs = ScanJobManager(make_registry(), store=store)
+    watcher = FolderWatcher(jobs, store=store, debounce=0.0)
+    watcher.watch(str(tmp_path / "photos"))
+    return jobs, watcher
+
+
+def test_watch_adds_and_removes_photos(tmp_path):
+    egret = touch(tmp_path / "photos" / "小白鹭_1.jpg")
+    store = PhotoIndexStore(tmp_path / "index.db")
+    jobs, watcher = make_watcher(tmp_path, store)
+    assert watcher.poll_once(force=True) == (1, 0)
+    assert jobs.registry.has_photo(egret)
+
+    bulbul = touch(tmp_path / "photos" / "card2" / "白头鹎_1.jpg")
+    os.remove(egret)
+    assert watcher.poll_once(force=True) == (1, 1)
+    assert jobs.registry.has_photo(bulbul)
+    assert not jobs.registry.has_photo(egret)
+    assert jobs.registry.photo_count == 1
+    assert set(store.snapshot(str(tmp_path / "photos"))) == {bulbul}
+
+
+def test_watch_rename_and_removed_directory(tmp_path):
+    egret = touch(tmp_path / "photos" / "card1" / "小白鹭_1.jpg")
+    jobs, watcher = make_watcher(tmp_path)
+    watcher.poll_once(force=True)
+
+    renamed = str(tmp_path / "photos" / "card1" / "大白鹭_1.jpg")
+    os.rename(egret, renamed)
+    assert watcher.poll_once(force=True) == (1, 1)
+    assert jobs.registry.get_photo(renamed).matched_species_id == "Ardea alba"
+
+    os.remove(renamed)
+    os.rmdir(tmp_path / "photos" / "card1")
+    assert watcher.poll_once(force=True) == (0, 1)
+    assert jobs.registry.photo_count == 0
+
+
+def test_watch_catches_up_with_store(tmp_path):
+    """监视开始前已在索引中的文件不重复登记，期间删除的文件被移除"""
+    kept = touch(tmp_path / "photos" / "小白鹭_1.jpg")
+    gone = touch(tmp_path / "photos" / "白头鹎_1.jpg")
+    store = PhotoIndexStore(tmp_path / "index.db")
+    jobs = ScanJobManager(make_registry(), store=store)
+    job, _ = jobs.submit([str(tmp_path / "photos")])
+    while job.active:
+        threading.Event().wait(0.01)
+    os.remove(gone)
+
+    watcher = FolderWatcher(jobs, store=store, debounce=0.0)
+    watcher.watch(str(tmp_path / "photos"))
+    assert watcher.poll_once(force=True) == (0, 1)
+    assert jobs.registry.has_photo(kept)
+
+
+def test_requests_not_blocked_while_listing(tmp_path, monkeypatch):
+    """处理大目录 (列目录、匹配) 期间 watched()/watch() 不等待"""
+    touch(tmp_path / "photos" / "小白鹭_1.jpg")
+    jobs, watcher = make_watcher(tmp_path)
+    listing, release = threading.Event(), threading.Event()
+    scandir = os.scandir
+
+    def slow_scandir(path):
+        listing.set()
+        release.wait(5)
+        return scandir(path)
+
+    monkeypatch.setattr(file_watcher.os, "scandir", slow_scandir)
+    poller = threading.Thread(target=watcher.poll_once, kwargs={"force": True})
+    poller.start()
+    assert listing.wait(5)
+    try:
+        started = time.monotonic()
+        assert watcher.watched() == [str(tmp_path / "photos")]
+        watcher.watch(str(tmp_path / "other"))
+        assert time.monotonic() - started < 1.0
+    finally:
+        release.set()
+        poller.join()
+    assert jobs.registry.photo_count == 1
+
+
+def test_changes_during_scan_survive_commit(tmp_path):
+    """扫描列出目录后监视器做出的变化，在任务合并替换注册中心后仍然有效"""
+    old = touch(tmp_path / "photos" / "小白鹭_1.jpg")
+    store = PhotoIndexStore(tmp_path / "index.db")
+    jobs, watcher = make_watcher(tmp_path, store)
+    watcher.poll_once(force=True)
+    new = str(tmp_path / "photos" / "白头鹎_1.jpg")
+
+    def change_after_listing(job_id, photos):
+        # 扫描器已列出目录并登记了 old，此时监视器看到新增与删除
+        touch(new)
+        os.remove(old)
+        assert watcher.poll_once(force=True) == (1, 1)
+
+    job, _ = jobs.submit([str(tmp_path / "photos")], photo_callback=change_after_listing)
+    while job.active:
+        time.sleep(0.01)
+    assert job.status == "completed"
+    assert jobs.registry.has_photo(new)
+    assert not jobs.registry.has_photo(old)
+    assert jobs.registry.photo_count == 1
+    assert set(store.snapshot(str(tmp_path / "photos"))) == {new}
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from src.utils.fuzzy_matcher import FuzzyNameMatcher, normalize_name, trigrams
+
+LATIN = [
+    ("Egretta garzetta", "EG"),
+    ("Egretta eulophotes", "EE"),
+    ("Ardea alba", "AA"),
+    ("Ardea cinerea", "AC"),
+    ("Pycnonotus sinensis", "PS"),
+    ("Passer montanus", "PM"),
+]
+KEYS = [("小白鹭", "EG"), ("大白鹭", "AA"), ("白头鹎", "PS"), ("Seidenreiher", "EG")] + LATIN
+LANGUAGES = {"小白鹭": "zh", "大白鹭": "zh", "白头鹎": "zh", "Seidenreiher": "de"}
+
+
+@pytest.fixture(scope="module")
+def matcher():
+    return FuzzyNameMatcher(KEYS, LATIN, languages=LANGUAGES)
+
+
+def test_normalize_name():
+    assert normalize_name("Egretta_garzetta-001") == "egretta garzetta 001"
+    assert normalize_name("  EGRETTA.Garzetta (2)[raw]  ") == "egretta garzetta 2 raw"
+    assert trigrams("ab") == {" ab", "ab "}
+
+
+@pytest.mark.parametrize("file_name, species_id, language", [
+    ("Egretta_garzetta-001.jpg", "EG", None),
+    ("EGRETTA.GARZETTA (2).jpg", "EG", None),
+    ("egretta~garzetta+crop.NEF", "EG", None),
+    ("2024 小白鹭 dsc.jpg", "EG", "zh"),
+    ("Seidenreiher_2.jpg", "EG", "de"),
+])
+def test_separator_and_case_normalisation_is_exact(matcher, file_name, species_id, language):
+    assert matcher.match_tagged(file_name) == (species_id, language, 1.0)
+
+
+@pytest.mark.parametrize("file_name, species_id", [
+    ("egreta garzeta.jpg", "EG"),             # 两个词都拼错
+    ("egretta garzeta_1.jpg", "EG"),          # 种加词少一个字母
+    ("Egretta garzzetta.jpg", "EG"),          # 多一个字母
+    ("egreta_garsetta.jpg", "EG"),
+    ("pycnonotus sinensys.nef", "PS"),
+    ("pycnonotis sinensis.jpg", "PS"),        # 属名拼错
+    ("Passer montanu.jpg", "PM"),
+    ("DSC_0012 garzetta egretta.jpg", "EG"),  # 词序颠倒
+])
+def test_misspellings_match_with_latin_tag(matcher, file_name, species_id):
+    found, language, score = matcher.match_tagged(file_name)
+    assert (found, language) == (species_id, "la")
+    assert matcher.min_score <= score < 1.0
+
+
+@pytest.mark.parametrize("file_name", [
+    "Passer domesticus.jpg",                   # 属名相同的另一物种
+    "Egretta sacra.jpg",
+    "Ardea purpurea.jpg",
+    "ardeola bacchus.jpg",
+    "egret garden.jpg",
+    "Anas platyrhynchos.jpg",
+    "holiday beach sunset.jpg",
+    "IMG_0001.jpg",
+    "ard alb.jpg",                             # 过短的词不组成候选短语
+    "egretta.jpg",                             # 只有属名
+])
+def test_unrelated_and_near_miss_names_are_rejected(matcher, file_name):
+    assert matcher.match(file_name) == (None, 0.0)
+    assert matcher.match_tagged(file_name) == (None, None, 0.0)
+
+
+def test_min_score_threshold():
+    loose = FuzzyNameMatcher(KEYS, LATIN, min_score=0.55)
+    strict = FuzzyNameMatcher(KEYS, LATIN, min_score=0.8)
+    species_id, score = loose.match("egreta_garsetta.jpg")
+    assert species_id == "EG" and 0.55 <= score < 0.8
+    assert strict.match("egreta_garsetta.jpg") == (None, 0.0)
+    # 精确匹配不受阈值影响
+    assert strict.match("egretta_garzetta.jpg") == ("EG", 1.0)
+
+
+def test_rare_trigram_candidates_without_shared_word():
+    """两个词都拼错 (不在词索引中) 时经三元组倒排索引找到候选"""
+    matcher = FuzzyNameMatcher([], LATIN, max_posting=1)
+    assert matcher.match("pycnonotis sinensys.jpg")[0] == "PS"
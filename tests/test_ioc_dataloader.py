@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+import marshal
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from conftest import IOC_ROWS, write_ioc_xlsx
+from src.data.IOC_dataloader import IOCDataLoader
+from src.models.birds import DataRegistry
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return write_ioc_xlsx(tmp_path / "ioc.xlsx"), tmp_path / "cache" / "species.bin"
+
+
+def load(paths, languages=("zh", "en")):
+    registry = DataRegistry()
+    IOCDataLoader(str(paths[0]), str(paths[1]), languages=languages).load_to_registry(registry)
+    return registry
+
+
+def no_excel(monkeypatch):
+    def fail(self):
+        raise AssertionError("Excel should not be parsed")
+    monkeypatch.setattr(IOCDataLoader, "compile", fail)
+
+
+def spy_compile(monkeypatch):
+    calls = []
+    original = IOCDataLoader.compile
+
+    def compile(self):
+        calls.append(self.excel_path)
+        return original(self)
+    monkeypatch.setattr(IOCDataLoader, "compile", compile)
+    return calls
+
+
+def test_compiled_round_trip(paths, monkeypatch):
+    built = load(paths)
+    assert paths[1].exists()
+    assert sorted(built.species_map) == ["Ardea alba", "Egretta garzetta", "Pycnonotus sinensis"]
+
+    no_excel(monkeypatch)
+    restored = load(paths, languages=("zh", "en", "de"))
+    assert sorted(restored.species_map) == sorted(built.species_map)
+    assert restored.species_map["Pycnonotus sinensis"].chinese_name == "白头鹎"
+    assert restored.species_map["Egretta garzetta"].order == "PELECANIFORMES"
+    # 切换语言不需要重新编译
+    assert restored.match_file_tagged("Little Egret 01.jpg")[:2] == ("Egretta garzetta", "en")
+    assert restored.match_file_tagged("Silberreiher.jpg")[:2] == ("Ardea alba", "de")
+    assert restored.species_source == built.species_source
+
+
+def test_touched_xlsx_triggers_rebuild(paths, monkeypatch):
+    load(paths)
+    calls = spy_compile(monkeypatch)
+    load(paths)
+    assert calls == []
+
+    stat = os.stat(paths[0])
+    os.utime(paths[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    load(paths)
+    assert len(calls) == 1
+    load(paths)
+    assert len(calls) == 1
+
+
+def test_replaced_xlsx_triggers_rebuild(paths, monkeypatch):
+    before = load(paths)
+    stat = os.stat(paths[0])
+    extra = ("PASSERIFORMES", "Passeridae", "Passer montanus", "麻雀", "Eurasian Tree Sparrow", "Feldsperling")
+    write_ioc_xlsx(paths[0], IOC_ROWS + [extra])
+    # 即便 mtime 恰好相同，大小变化也会使产物失效
+    os.utime(paths[0], ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    calls = spy_compile(monkeypatch)
+    after = load(paths)
+    assert len(calls) == 1
+    assert "Passer montanus" in after.species_map
+    assert after.species_source != before.species_source
+
+
+@pytest.mark.parametrize("damage", [
+    lambda data: data[:len(data) // 2],
+    lambda data: data[:7],
+    lambda data: b"",
+    lambda data: b"\x00garbage" * 10,
+    lambda data: marshal.dumps(["not", "a", "dict"]),
+])
+def test_corrupt_artifact_falls_back_to_excel(paths, monkeypatch, damage):
+    load(paths)
+    data = paths[1].read_bytes()
+    paths[1].write_bytes(damage(data))
+    calls = spy_compile(monkeypatch)
+    registry = load(paths)
+    assert len(calls) == 1
+    assert len(registry.species_map) == 3
+    # 重新编译后产物恢复完整
+    assert paths[1].read_bytes() == data
+
+
+def test_compiled_path_does_not_import_pandas(paths):
+    load(paths)
+    root = Path(__file__).resolve().parents[1]
+    script = (
+        "import sys\n"
+        "from src.data.IOC_dataloader import IOCDataLoader\n"
+        "from src.models.birds import DataRegistry\n"
+        "registry = DataRegistry()\n"
+        f"IOCDataLoader({str(paths[0])!r}, {str(paths[1])!r}).load_to_registry(registry)\n"
+        "assert len(registry.species_map) == 3, registry.species_map\n"
+        "print(sorted(m for m in ('pandas', 'openpyxl', 'numpy') if m in sys.modules))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script], cwd=root, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+import sys
+import threading
+import time
+
+from conftest import make_registry, touch
+from src.utils.profiler import SamplingProfiler
+from src.utils.scan_jobs import ScanJobManager
+
+
+def recurse(depth):
+    if depth:
+        return recurse(depth - 1)
+    time.sleep(0.0005)
+
+
+def test_reading_while_sampling():
+    """采样线程不断加入新的栈时，folded()/top() 不会因字典在遍历中改变而失败"""
+    stop = threading.Event()
+
+    def busy():
+        depth = 0
+        while not stop.is_set():
+            # 调用深度不断变化，采样得到的栈几乎都是新键
+            recurse(depth % 60)
+            depth += 1
+
+    worker = threading.Thread(target=busy, name="target-busy")
+    profiler = SamplingProfiler("target", interval=0)
+    # 缩短线程切换间隔，读取方更容易在遍历中途被采样线程打断
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    worker.start()
+    profiler.start()
+    try:
+        deadline = time.monotonic() + 0.5
+        while time.monotonic() < deadline:
+            profiler.folded()
+            profiler.top(5)
+    finally:
+        profiler.stop()
+        stop.set()
+        worker.join()
+        sys.setswitchinterval(interval)
+    assert profiler.samples > 0
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in profiler.folded().splitlines()) == profiler.samples
+
+
+def test_profile_readable_while_job_runs(tmp_path):
+    for i in range(3):
+        touch(tmp_path / "photos" / f"d{i}" / f"小白鹭_{i}.jpg")
+    manager = ScanJobManager(make_registry())
+    reads = []
+
+    def read_profile(job_id, photos):
+        job = manager.get(job_id)
+        time.sleep(0.05)
+        reads.append((job.profiler.folded(), job.profiler.top(5)))
+
+    job, _ = manager.submit([str(tmp_path / "photos")], photo_callback=read_profile, profile=True)
+    while job.active:
+        time.sleep(0.01)
+
+    assert job.status == "completed"
+    assert len(reads) == 3
+    folded, top = reads[-1]
+    assert "read_profile" in folded
+    assert top and all(0 < item["ratio"] <= 1 for item in top)
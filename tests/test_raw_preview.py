@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+import struct
+
+import pytest
+
+from src.utils.raw_preview import (
+    TAG_COMPRESSION, TAG_JPEG_LENGTH, TAG_JPEG_OFFSET, TAG_STRIP_BYTE_COUNTS, TAG_STRIP_OFFSETS, TAG_SUB_IFDS,
+    extract_preview, find_previews,
+)
+
+SHORT, LONG = 3, 4
+
+
+def jpeg(width, height, sof=0xC0, padding=b""):
+    """只有 SOF 段的最小 JPEG；padding 放在 SOF 之前 (模拟 APP 段等)"""
+    frame = bytes([0xFF, sof]) + struct.pack(">HBHHB", 17, 8, height, width, 3) + b"\x01\x11\x00" * 3
+    return b"\xff\xd8" + padding + frame + b"\xff\xd9"
+
+
+class Tiff:
+    """按写入顺序拼接 TIFF：先写数据块，再写引用它们的 IFD (子 IFD 先于父 IFD)"""
+    def __init__(self, endian):
+        self.endian = endian
+        self.buf = bytearray((b"II" if endian == "<" else b"MM") + struct.pack(endian + "HI", 42, 0))
+
+    def blob(self, data: bytes) -> int:
+        offset = len(self.buf)
+        self.buf += data
+        return offset
+
+    def ifd(self, entries, next_ifd: int = 0) -> int:
+        """entries: [(标签, 类型, 值列表)]；超过 4 字节的值写在 IFD 之前"""
+        fields = []
+        for tag, typ, values in entries:
+            data = struct.pack(self.endian + ("H" if typ == SHORT else "I") * len(values), *values)
+            value = struct.pack(self.endian + "I", self.blob(data)) if len(data) > 4 else data.ljust(4, b"\0")
+            fields.append(struct.pack(self.endian + "HHI", tag, typ, len(values)) + value)
+        return self.blob(struct.pack(self.endian + "H", len(fields)) + b"".join(fields)
+                         + struct.pack(self.endian + "I", next_ifd))
+
+    def finish(self, first_ifd: int) -> bytes:
+        struct.pack_into(self.endian + "I", self.buf, 4, first_ifd)
+        return bytes(self.buf)
+
+
+def jpeg_entries(offset, data):
+    return [(TAG_JPEG_OFFSET, LONG, [offset]), (TAG_JPEG_LENGTH, LONG, [len(data)])]
+
+
+def strip_entries(offset, data, compression=7):
+    return [(TAG_COMPRESSION, SHORT, [compression]), (TAG_STRIP_OFFSETS, LONG, [offset]),
+            (TAG_STRIP_BYTE_COUNTS, LONG, [len(data)])]
+
+
+SMALL, LARGE, LOSSLESS = jpeg(160, 120), jpeg(1600, 1200, padding=b"\xff\xff"), jpeg(4000, 3000, sof=0xC3)
+
+
+def raw_file(endian):
+    """IFD0 带小预览；两个 SubIFD (偏移数组存放在 IFD 外) 分别是大预览与无损 JPEG 原始数据"""
+    tiff = Tiff(endian)
+    small, large, lossless = tiff.blob(SMALL), tiff.blob(LARGE), tiff.blob(LOSSLESS)
+    sub_large = tiff.ifd(strip_entries(large, LARGE, compression=6))
+    sub_raw = tiff.ifd(strip_entries(lossless, LOSSLESS))
+    ifd0 = tiff.ifd(jpeg_entries(small, SMALL) + [(TAG_SUB_IFDS, LONG, [sub_large, sub_raw])])
+    return tiff.finish(ifd0)
+
+
+def exif_jpeg():
+    """APP1 Exif 中 IFD1 带缩略图的 JPEG"""
+    tiff = Tiff(">")
+    thumb = tiff.blob(SMALL)
+    ifd1 = tiff.ifd(jpeg_entries(thumb, SMALL))
+    ifd0 = tiff.ifd([(TAG_COMPRESSION, SHORT, [1])], next_ifd=ifd1)
+    payload = b"Exif\x00\x00" + tiff.finish(ifd0)
+    app0 = b"\xff\xe0" + struct.pack(">H", 6) + b"JFIF"
+    app1 = b"\xff\xe1" + struct.pack(">H", len(payload) + 2) + payload
+    return jpeg(4000, 3000, padding=app0 + app1)
+
+
+def write(tmp_path, data, name="photo.arw"):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+@pytest.mark.parametrize("endian", ["<", ">"])
+def test_tiff_previews_and_size_selection(tmp_path, endian):
+    path = write(tmp_path, raw_file(endian))
+    with open(path, "rb") as f:
+        sizes = sorted((w, h) for w, h, _, _ in find_previews(f))
+    # 无损 JPEG (SOF3) 不是可解码的预览
+    assert sizes == [(160, 120), (1600, 1200)]
+
+    assert extract_preview(path) == SMALL
+    assert extract_preview(path, min_size=(1000, 800)) == LARGE
+    assert extract_preview(path, min_size=(2000, 2000)) == LARGE
+    assert extract_preview(path, min_size=(2000, 2000), allow_smaller=False) is None
+
+
+def test_exif_thumbnail_in_jpeg(tmp_path):
+    path = write(tmp_path, exif_jpeg(), "photo.jpg")
+    assert extract_preview(path) == SMALL
+
+
+def test_lossless_only_is_rejected(tmp_path):
+    tiff = Tiff("<")
+    lossless = tiff.blob(LOSSLESS)
+    path = write(tmp_path, tiff.finish(tiff.ifd(strip_entries(lossless, LOSSLESS))))
+    assert extract_preview(path) is None
+
+
+def test_cyclic_ifd_chain_terminates(tmp_path):
+    tiff = Tiff("<")
+    small = tiff.blob(SMALL)
+    # IFD0 的下一个 IFD 与 SubIFD 都指回自身
+    ifd0 = len(tiff.buf)
+    tiff.ifd(jpeg_entries(small, SMALL) + [(TAG_SUB_IFDS, LONG, [ifd0])], next_ifd=ifd0)
+    path = write(tmp_path, tiff.finish(ifd0))
+    assert extract_preview(path) == SMALL
+
+
+@pytest.mark.parametrize("data", [
+    raw_file("<")[:8] + b"\x00" * 4,                                    # IFD 偏移越界
+    b"II*\x00" + struct.pack("<I", 0xFFFFFFF0),
+    b"II*\x00" + struct.pack("<I", 8) + struct.pack("<H", 1)            # 预览偏移/长度越界
+    + struct.pack("<HHII", TAG_JPEG_OFFSET, LONG, 1, 0xFFFFFF00) + struct.pack("<I", 0),
+    b"\xff\xd8\xff\xe1\x00\x00Exif",                                    # APP1 段长度为 0
+    b"\xff\xd8\xff\xe1\xff\xffExif\x00\x00II*\x00",                     # APP1 段长度超出文件
+    b"not an image",
+    b"",
+])
+def test_malformed_files_return_none(tmp_path, data):
+    assert extract_preview(write(tmp_path, data)) is None
+
+
+@pytest.mark.parametrize("make, expected", [(lambda: raw_file(">"), SMALL), (exif_jpeg, SMALL)])
+def test_truncated_files_never_raise(tmp_path, make, expected):
+    data = make()
+    for end in range(len(data)):
+        result = extract_preview(write(tmp_path, data[:end]))
+        assert result is None or result == expected
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import threading
+import time
+
+from src.models.birds import PhotoIndex
+
+
+def add(registry, root, names, species_id):
+    paths = [os.path.join(root, name) for name in names]
+    registry.add_photos(PhotoIndex(os.path.basename(p), p, species_id) for p in paths)
+    return paths
+
+
+def test_remove_photos_in_batch(registry):
+    egrets = add(registry, "/photos/a", [f"小白鹭_{i}.jpg" for i in range(6)], "Egretta garzetta")
+    # 同名文件位于不同目录，只移除指定目录下的
+    other = add(registry, "/photos/b", ["小白鹭_1.jpg"], "Egretta garzetta")
+    bulbuls = add(registry, "/photos/a", ["白头鹎_1.jpg", "白头鹎_2.jpg"], "Pycnonotus sinensis")
+    registry.set_duplicates([[egrets[0], egrets[5]]])
+
+    removed = egrets[:2] + [egrets[3], bulbuls[0], "/photos/a/unknown.jpg", egrets[3]]
+    assert registry.remove_photos(removed) == 4
+
+    remaining = sorted(p.absolute_path for p in registry.iter_photos())
+    assert remaining == sorted([egrets[2], egrets[4], egrets[5], other[0], bulbuls[1]])
+    # 保留的照片被移除，副本接替计数
+    assert registry.duplicate_groups() == []
+    assert registry.tree_root.total_photos == 5
+    nodes = {node.name: node for node in registry.node_by_id.values() if node.photos is not None}
+    egret_node = next(node for node in nodes.values() if len(node.photos) == 4)
+    assert egret_node.total_photos == 4
+    assert [path for _, path in egret_node.photos.page()] == [egrets[2], egrets[4], egrets[5], other[0]]
+    assert sum(node.total_photos for node in nodes.values()) == 5
+
+
+def test_remove_single_photo_keeps_counts(registry):
+    paths = add(registry, "/photos", ["小白鹭_1.jpg", "小白鹭_2.jpg"], "Egretta garzetta")
+    assert registry.remove_photos([paths[1]]) == 1
+    assert registry.remove_photo(paths[0]).matched_species_id == "Egretta garzetta"
+    assert registry.tree_root.total_photos == 0
+    assert not any(node.photos for node in registry.node_by_id.values())
+
+
+def test_page_never_mixes_columns_during_removal(registry):
+    """批量移除与分页并发时，每个文件名都与自己的目录配对"""
+    photos = [PhotoIndex(f"小白鹭_{d}_{i}.jpg", f"/p/d{d}/小白鹭_{d}_{i}.jpg", "Egretta garzetta")
+              for i in range(5000) for d in range(4)]
+    # 节点足够大，重建两列的耗时才足以让分页落在两次赋值之间
+    registry.add_photos(photos)
+    node = next(n for n in registry.node_by_id.values() if n.photos is not None)
+    stop = threading.Event()
+    errors = []
+
+    def churn():
+        while not stop.is_set():
+            # 移除开头的照片再重新登记 (追加到末尾)，其余照片整体前移；
+            # 前移量不是目录数的倍数，两列错位时目录必然对不上
+            head = [PhotoIndex(name, path, "Egretta garzetta") for name, path in node.photos.page(0, 99)]
+            registry.remove_photos([p.absolute_path for p in head])
+            registry.add_photos(head)
+
+    worker = threading.Thread(target=churn)
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    worker.start()
+    try:
+        deadline = time.monotonic() + 0.5
+        while time.monotonic() < deadline and not errors:
+            for name, path in node.photos.page(0, 50):
+                if os.path.dirname(path) != f"/p/d{name.split('_')[1]}":
+                    errors.append((name, path))
+    finally:
+        stop.set()
+        worker.join()
+        sys.setswitchinterval(interval)
+    assert errors == []
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+import os
+import time
+
+from conftest import make_registry, touch
+from src.data.photo_store import PhotoIndexStore
+from src.utils.file_scanner import FileScanner
+from src.utils.scan_jobs import ScanJobManager
+
+
+def test_restore_runs_in_background(tmp_path):
+    egret = touch(tmp_path / "photos" / "小白鹭_1.jpg")
+    store = PhotoIndexStore(tmp_path / "index.db")
+    FileScanner(make_registry(), store=store).scan_directory(str(tmp_path / "photos"))
+
+    manager = ScanJobManager(make_registry(), store=store)
+    built = []
+    # 恢复在替换锁下进行 (与任务合并互斥)；持锁期间恢复无法完成，ready 保持未置位
+    with manager._swap_lock:
+        thread = manager.start_restore(then=built.append)
+        assert not manager.ready.is_set()
+        assert not manager.registry.has_photo(egret)
+    thread.join()
+
+    assert manager.ready.is_set()
+    assert built == [manager.registry]
+    assert manager.registry.has_photo(egret)
+
+
+def wait(job):
+    while job.active:
+        time.sleep(0.01)
+    return job
+
+
+def test_commit_replaces_only_job_roots(tmp_path):
+    a_old = touch(tmp_path / "a" / "小白鹭_1.jpg")
+    b = touch(tmp_path / "b" / "大白鹭_1.jpg")
+    manager = ScanJobManager(make_registry(), store=PhotoIndexStore(tmp_path / "index.db"))
+    wait(manager.submit([str(tmp_path / "a"), str(tmp_path / "b")])[0])
+
+    os.remove(a_old)
+    a_new = touch(tmp_path / "a" / "白头鹎_1.jpg")
+    os.remove(b)  # 不在任务目录内，合并时沿用当前注册中心
+    before = manager.registry
+    job = wait(manager.submit([str(tmp_path / "a")])[0])
+
+    assert job.status == "completed"
+    assert manager.registry is not before
+    assert manager.registry.has_photo(a_new)
+    assert not manager.registry.has_photo(a_old)
+    assert manager.registry.has_photo(b)
+
+
+def test_cancelled_job_leaves_registry_untouched(tmp_path):
+    touch(tmp_path / "photos" / "小白鹭_1.jpg")
+    touch(tmp_path / "photos" / "sub" / "大白鹭_1.jpg")
+    manager = ScanJobManager(make_registry())
+    before = manager.registry
+
+    def cancel_self(job_id, photos):
+        manager.cancel(job_id)
+
+    job = wait(manager.submit([str(tmp_path / "photos")], photo_callback=cancel_self)[0])
+    assert job.status == "cancelled"
+    assert manager.registry is before
+    assert manager.registry.photo_count == 0
+
+
+def test_resubmit_returns_running_job(tmp_path):
+    touch(tmp_path / "photos" / "sub" / "小白鹭_1.jpg")
+    manager = ScanJobManager(make_registry())
+    resubmitted = []
+
+    def resubmit(job_id, photos):
+        resubmitted.append(manager.submit([str(tmp_path / "photos" / "sub")]))
+
+    job, deduplicated = manager.submit([str(tmp_path / "photos")], photo_callback=resubmit)
+    wait(job)
+    assert not deduplicated
+    assert resubmitted == [(job, True)]
+    assert len(manager.jobs()) == 1
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from conftest import make_registry
+from src.models.birds import PhotoIndex
+
+PHOTOS = [
+    ("/p/2024/小白鹭_1.jpg", "Egretta garzetta"),
+    ("/p/2024/海边 小白鹭.jpg", "Egretta garzetta"),
+    ("/p/小白鹭/IMG_1.jpg", "Egretta garzetta"),
+    ("/p/2024/大白鹭_1.jpg", "Ardea alba"),
+    ("/p/2024/大白鹭_2.jpg", "Ardea alba"),
+]
+
+
+@pytest.fixture
+def library():
+    registry = make_registry()
+    registry.add_photos(PhotoIndex(path.rsplit("/", 1)[1], path, species_id) for path, species_id in PHOTOS)
+    return registry
+
+
+def hits(registry, query, **kwargs):
+    return [(hit.kind, hit.path or hit.name, hit.tier) for hit in registry.search(query, **kwargs)[2]]
+
+
+def test_taxa_rank_exact_before_prefix_then_by_photo_count(library):
+    assert hits(library, "ardea", kinds=["taxon"]) == [
+        ("taxon", "Ardea", 0),
+        ("taxon", "大白鹭 Ardea alba", 1),
+    ]
+    # 同为子串命中时照片多的在前
+    assert hits(library, "白鹭", kinds=["taxon"]) == [
+        ("taxon", "小白鹭 Egretta garzetta", 3),
+        ("taxon", "大白鹭 Ardea alba", 3),
+    ]
+
+
+def test_directory_and_photo_tiers(library):
+    total, complete, page = library.search("小白鹭")
+    assert (total, complete) == (5, True)
+    assert [(hit.kind, hit.path or hit.name, hit.tier) for hit in page] == [
+        ("taxon", "小白鹭 Egretta garzetta", 0),
+        ("directory", "/p/小白鹭", 0),
+        ("photo", "/p/2024/小白鹭_1.jpg", 0),
+        ("photo", "/p/2024/海边 小白鹭.jpg", 1),
+        ("photo", "/p/小白鹭/IMG_1.jpg", 2),
+    ]
+    assert page[0].photo_count == 3 and page[1].photo_count == 1
+    assert page[2].species_id == "Egretta garzetta"
+    # 每个词都须命中，目录路径中的词也算
+    assert hits(library, "小白鹭 IMG") == [("photo", "/p/小白鹭/IMG_1.jpg", 2)]
+    assert hits(library, "苍鹭") == []
+
+
+def test_paging_spans_sections(library):
+    everything = hits(library, "小白鹭")
+    assert hits(library, "小白鹭", offset=1, limit=2) == everything[1:3]
+    assert hits(library, "小白鹭", offset=4, limit=10) == everything[4:]
+    assert library.search("小白鹭", kinds=["photo"], limit=1)[0] == 3
+
+
+def test_index_follows_added_and_removed_photos(library):
+    assert hits(library, "白头鹎") == [("taxon", "白头鹎 Pycnonotus sinensis", 0)]
+    library.add_photos([PhotoIndex("白头鹎_1.jpg", "/p/2025/白头鹎_1.jpg", "Pycnonotus sinensis")])
+    assert hits(library, "白头鹎", kinds=["photo", "directory"]) == [("photo", "/p/2025/白头鹎_1.jpg", 0)]
+
+    library.remove_photos(["/p/2025/白头鹎_1.jpg", "/p/小白鹭/IMG_1.jpg"])
+    assert hits(library, "白头鹎", kinds=["photo"]) == []
+    # 目录中已没有照片，不再作为目录结果
+    assert hits(library, "小白鹭", kinds=["directory", "photo"]) == [
+        ("photo", "/p/2024/小白鹭_1.jpg", 0),
+        ("photo", "/p/2024/海边 小白鹭.jpg", 1),
+    ]
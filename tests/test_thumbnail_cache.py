@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+import os
+import time
+
+import pytest
+from PIL import Image
+
+from conftest import touch
+from src.utils.thumbnail_cache import STALE_TMP_SECONDS, ThumbnailCache
+from src.utils.thumbnailer import generate_thumbnail
+
+
+def cached(cache, src, size):
+    """模拟生成缓存文件并登记，返回缓存路径"""
+    path, hit = cache.lookup(src)
+    assert not hit
+    path.write_bytes(b"t" * size)
+    cache.record(path)
+    return path
+
+
+def test_key_follows_source_mtime_and_size(tmp_path):
+    cache = ThumbnailCache(tmp_path / "cache")
+    src = touch(tmp_path / "a.jpg", b"original")
+    key = cache.path_for_source(src)
+    assert cache.path_for_source(src) == key
+
+    stat = os.stat(src)
+    os.utime(src, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    touched = cache.path_for_source(src)
+    assert touched != key
+
+    touch(src, b"edited, longer")
+    os.utime(src, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert cache.path_for_source(src) not in (key, touched)
+
+    with pytest.raises(OSError):
+        cache.path_for_source(str(tmp_path / "missing.jpg"))
+
+
+def test_edited_source_misses(tmp_path):
+    cache = ThumbnailCache(tmp_path / "cache")
+    src = touch(tmp_path / "a.jpg", b"original")
+    path = cached(cache, src, 10)
+    assert cache.lookup(src) == (path, True)
+
+    touch(src, b"edited, longer")
+    new_path, hit = cache.lookup(src)
+    assert not hit and new_path != path
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+
+def test_lru_eviction_by_byte_budget(tmp_path):
+    cache = ThumbnailCache(tmp_path / "cache", max_bytes=250)
+    sources = [touch(tmp_path / f"{i}.jpg", bytes([i])) for i in range(4)]
+    paths = [cached(cache, src, 100) for src in sources[:2]]
+    # 命中刷新顺序：0 成为最近使用，下次淘汰 1
+    assert cache.lookup(sources[0])[1]
+    paths.append(cached(cache, sources[2], 100))
+
+    assert [p.exists() for p in paths] == [True, False, True]
+    assert not cache.lookup(sources[1])[1]
+    stats = cache.stats()
+    assert (stats["entries"], stats["bytes"], stats["evictions"]) == (2, 200, 1)
+
+    # 超出整个预算的新文件也会保留 (其余全部淘汰)
+    big = cached(cache, sources[3], 1000)
+    assert big.exists() and not paths[0].exists() and not paths[2].exists()
+    assert cache.stats()["bytes"] == 1000
+
+
+def test_restart_rebuilds_lru_and_evicts(tmp_path):
+    cache_dir = tmp_path / "cache"
+    cache = ThumbnailCache(cache_dir)
+    sources = [touch(tmp_path / f"{i}.jpg", bytes([i])) for i in range(3)]
+    paths = [cached(cache, src, 100) for src in sources]
+    now = time.time()
+    for age, path in zip((300, 100, 200), paths):
+        os.utime(path, (now - age, now - age))
+
+    restarted = ThumbnailCache(cache_dir, max_bytes=250)
+    # 最久未访问的 (paths[0]) 在启动时被淘汰
+    assert [p.exists() for p in paths] == [False, True, True]
+    assert restarted.stats()["bytes"] == 200
+    assert restarted.lookup(sources[1])[1] and restarted.lookup(sources[2])[1]
+
+
+def test_startup_sweeps_stale_temp_files(tmp_path):
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    stale = touch(cache_dir / "abc.jpg.123.tmp", b"half")
+    fresh = touch(cache_dir / "def.jpg.456.tmp", b"writing")
+    old = time.time() - STALE_TMP_SECONDS - 60
+    os.utime(stale, (old, old))
+
+    cache = ThumbnailCache(cache_dir)
+    assert not os.path.exists(stale)
+    # 较新的临时文件可能正由其他 worker 写入
+    assert os.path.exists(fresh)
+    stats = cache.stats()
+    assert (stats["entries"], stats["bytes"], stats["stale_tmp_removed"]) == (0, 0, 1)
+
+
+def test_failed_write_leaves_no_temp_file(tmp_path, monkeypatch):
+    src = tmp_path / "src.png"
+    Image.new("RGB", (40, 30)).save(src)
+    target = tmp_path / "cache" / "out.jpg"
+    target.parent.mkdir()
+
+    def failing_save(self, fp, *args, **kwargs):
+        with open(fp, "wb") as f:
+            f.write(b"partial")
+        raise OSError("disk full")
+
+    monkeypatch.setattr(Image.Image, "save", failing_save)
+    with pytest.raises(OSError):
+        generate_thumbnail(str(src), str(target))
+    assert os.listdir(target.parent) == []
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from src.utils.thumbnail_cache import ThumbnailCache
+from src.utils.thumbnailer import ThumbnailPrewarmer, ThumbnailService
+
+
+def make_images(directory, count):
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i in range(count):
+        path = directory / f"{i}.jpg"
+        Image.new("RGB", (64, 48), (i * 40, 0, 0)).save(path)
+        paths.append(str(path))
+    return paths
+
+
+def test_prewarm_progress_is_per_job(tmp_path):
+    cache = ThumbnailCache(tmp_path / "cache")
+    service = ThumbnailService(executor=ThreadPoolExecutor(2), cache=cache)
+    prewarmer = ThumbnailPrewarmer(service, cache)
+
+    prewarmer.enqueue(make_images(tmp_path / "a", 3), key="job-a")
+    prewarmer.enqueue(make_images(tmp_path / "b", 2) + [str(tmp_path / "missing.jpg")], key="job-b")
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        a, b = prewarmer.progress("job-a"), prewarmer.progress("job-b")
+        if a["prewarmed"] + a["prewarm_failed"] == 3 and b["prewarmed"] + b["prewarm_failed"] == 3:
+            break
+        time.sleep(0.01)
+
+    assert prewarmer.progress("job-a") == {"prewarm_total": 3, "prewarmed": 3, "prewarm_failed": 0}
+    assert prewarmer.progress("job-b") == {"prewarm_total": 3, "prewarmed": 2, "prewarm_failed": 1}
+    assert prewarmer.progress(None) == {"prewarm_total": 0, "prewarmed": 0, "prewarm_failed": 0}
+    service.shutdown()